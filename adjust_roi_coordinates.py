@@ -9,6 +9,8 @@ import cv2
 import numpy as np
 from typing import Dict, List
 
+from roi_transform import apply_transform, compose, resize_matrix, roi_extent, transform_roi, translation
+
 def load_roi_data(roi_path: str) -> Dict:
     """ROI 데이터 로드"""
     with open(roi_path, 'r', encoding='utf-8') as f:
@@ -19,6 +21,10 @@ def save_roi_data(roi_data: Dict, output_path: str):
     with open(output_path, 'w', encoding='utf-8') as f:
         json.dump(roi_data, f, ensure_ascii=False, indent=4)
 
+def roi_adjust_matrix(original_size: tuple, target_size: tuple, y_offset: int = 0) -> np.ndarray:
+    """원본 이미지 크기 -> 대상 이미지 크기 비율 조정 후 y_offset만큼 위로 이동하는 변환 행렬"""
+    return compose(resize_matrix(original_size, target_size), translation(0, -y_offset))
+
 def adjust_coordinates(coords: List[List[int]], 
                       original_size: tuple, 
                       target_size: tuple,
@@ -32,26 +38,14 @@ def adjust_coordinates(coords: List[List[int]],
         target_size: 대상 이미지 크기 (width, height)
         y_offset: y축 오프셋 (위로 이동할 픽셀 수)
     """
-    adjusted_coords = []
-    
-    for coord in coords:
-        x, y = coord
-        
-        # 비율 조정
-        x_ratio = x / original_size[0]
-        y_ratio = y / original_size[1]
-        
-        # 새로운 크기에 맞게 조정
-        new_x = int(x_ratio * target_size[0])
-        new_y = int(y_ratio * target_size[1]) - y_offset
-        
-        # 좌표가 이미지 범위 내에 있는지 확인
-        new_x = max(0, min(new_x, target_size[0] - 1))
-        new_y = max(0, min(new_y, target_size[1] - 1))
-        
-        adjusted_coords.append([new_x, new_y])
-    
-    return adjusted_coords
+    adjusted = apply_transform(coords, roi_adjust_matrix(original_size, target_size, y_offset))
+    adjusted = np.trunc(adjusted.clip(0, (target_size[0] - 1, target_size[1] - 1))).astype(int)
+    return adjusted.tolist()
+
+def adjust_roi(roi_data: Dict, original_size: tuple, target_size: tuple, y_offset: int = 0) -> Dict:
+    """모든 ROI 키의 모든 슬롯 좌표를 한 번에 조정 (adjust_coordinates와 같은 결과)"""
+    return transform_roi(roi_data, roi_adjust_matrix(original_size, target_size, y_offset),
+                         clip_size=target_size, rounding="trunc")
 
 def visualize_roi_on_frame(frame: np.ndarray, roi_data: Dict, image_key: str = "test.png"):
     """프레임에 ROI를 시각화"""
@@ -106,18 +100,9 @@ def main():
     
     # 원본 이미지 크기 추정 (ROI 좌표 기반)
     image_key = list(roi_data.keys())[0]
-    slots = roi_data[image_key]
     
-    # ROI 좌표에서 최대/최소 값 찾기
-    all_x = []
-    all_y = []
-    for slot in slots:
-        for coord in slot['coords']:
-            all_x.append(coord[0])
-            all_y.append(coord[1])
-    
-    original_width = max(all_x)
-    original_height = max(all_y)
+    # ROI 좌표에서 최대 값 찾기
+    original_width, original_height = roi_extent(roi_data, [image_key])
     
     print(f"ROI 원본 크기 추정: {original_width}x{original_height}")
     
@@ -132,24 +117,7 @@ def main():
     if choice == "1":
         # 자동 조정
         print("\n🔄 자동 조정 중...")
-        adjusted_roi_data = {}
-        
-        for image_key, slots in roi_data.items():
-            adjusted_slots = []
-            
-            for slot in slots:
-                adjusted_coords = adjust_coordinates(
-                    slot['coords'], 
-                    (original_width, original_height), 
-                    (video_width, video_height)
-                )
-                
-                adjusted_slots.append({
-                    'slot_id': slot['slot_id'],
-                    'coords': adjusted_coords
-                })
-            
-            adjusted_roi_data[image_key] = adjusted_slots
+        adjusted_roi_data = adjust_roi(roi_data, (original_width, original_height), (video_width, video_height))
         
         # 저장
         output_path = "roi_adjusted_coords.json"
@@ -161,25 +129,7 @@ def main():
         y_offset = int(input("y축 오프셋 (위로 이동할 픽셀 수): "))
         
         print(f"\n🔄 y축 {y_offset}픽셀 위로 이동 중...")
-        adjusted_roi_data = {}
-        
-        for image_key, slots in roi_data.items():
-            adjusted_slots = []
-            
-            for slot in slots:
-                adjusted_coords = adjust_coordinates(
-                    slot['coords'], 
-                    (original_width, original_height), 
-                    (video_width, video_height),
-                    y_offset
-                )
-                
-                adjusted_slots.append({
-                    'slot_id': slot['slot_id'],
-                    'coords': adjusted_coords
-                })
-            
-            adjusted_roi_data[image_key] = adjusted_slots
+        adjusted_roi_data = adjust_roi(roi_data, (original_width, original_height), (video_width, video_height), y_offset)
         
         # 저장
         output_path = "roi_adjusted_coords.json"
@@ -205,25 +155,7 @@ def main():
             
             # 조정된 버전도 생성
             y_offset = 100  # 예시로 100픽셀 위로 이동
-            adjusted_roi_data = {}
-            
-            for image_key, slots in roi_data.items():
-                adjusted_slots = []
-                
-                for slot in slots:
-                    adjusted_coords = adjust_coordinates(
-                        slot['coords'], 
-                        (original_width, original_height), 
-                        (video_width, video_height),
-                        y_offset
-                    )
-                    
-                    adjusted_slots.append({
-                        'slot_id': slot['slot_id'],
-                        'coords': adjusted_coords
-                    })
-                
-                adjusted_roi_data[image_key] = adjusted_slots
+            adjusted_roi_data = adjust_roi(roi_data, (original_width, original_height), (video_width, video_height), y_offset)
             
             # 조정된 ROI 시각화
             adjusted_result = visualize_roi_on_frame(frame, adjusted_roi_data)
@@ -8,6 +8,8 @@ import json
 import cv2
 import numpy as np
 
+from roi_transform import compose, resize_matrix, roi_extent, transform_roi, translation
+
 def adjust_roi_with_offset():
     """큰 오프셋으로 ROI 조정"""
     
@@ -20,17 +22,7 @@ def adjust_roi_with_offset():
     
     # ROI 원본 크기 추정
     image_key = list(roi_data.keys())[0]
-    slots = roi_data[image_key]
-    
-    all_x = []
-    all_y = []
-    for slot in slots:
-        for coord in slot['coords']:
-            all_x.append(coord[0])
-            all_y.append(coord[1])
-    
-    original_width = max(all_x)
-    original_height = max(all_y)
+    original_width, original_height = roi_extent(roi_data, [image_key])
     
     print(f"원본 크기: {original_width}x{original_height}")
     print(f"영상 크기: {video_width}x{video_height}")
@@ -38,37 +30,11 @@ def adjust_roi_with_offset():
     # 큰 오프셋 적용 (300픽셀 위로)
     y_offset = 300
     
-    adjusted_roi_data = {}
-    
-    for image_key, slots in roi_data.items():
-        adjusted_slots = []
-        
-        for slot in slots:
-            adjusted_coords = []
-            
-            for coord in slot['coords']:
-                x, y = coord
-                
-                # 비율 조정
-                x_ratio = x / original_width
-                y_ratio = y / original_height
-                
-                # 새로운 크기에 맞게 조정
-                new_x = int(x_ratio * video_width)
-                new_y = int(y_ratio * video_height) - y_offset
-                
-                # 좌표가 이미지 범위 내에 있는지 확인
-                new_x = max(0, min(new_x, video_width - 1))
-                new_y = max(0, min(new_y, video_height - 1))
-                
-                adjusted_coords.append([new_x, new_y])
-            
-            adjusted_slots.append({
-                'slot_id': slot['slot_id'],
-                'coords': adjusted_coords
-            })
-        
-        adjusted_roi_data[image_key] = adjusted_slots
+    # 비율 조정 후 위로 이동 (모든 슬롯 한 번에, 이미지 범위로 자름)
+    matrix = compose(resize_matrix((original_width, original_height), (video_width, video_height)),
+                     translation(0, -y_offset))
+    adjusted_roi_data = transform_roi(roi_data, matrix, clip_size=(video_width, video_height), rounding="trunc")
+    adjusted_slots = adjusted_roi_data[image_key]
     
     # 저장
     with open("roi_adjusted_coords.json", 'w', encoding='utf-8') as f:
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+슬롯 점유 판단 규칙 보정 도구 (라벨링된 프레임 폴더 전체)
+프레임마다 슬롯별 최대 IoU / 중심점 판단을 한 번만 계산하고(프로세스 풀 병렬), 모든 프레임의 슬롯 점수를 모아
+정렬 + 누적합으로 모든 IoU 임계값의 정확도/정밀도/재현율을 한 번에 구함
+
+- 탐지: detect.py --save-txt --save-conf 결과 라벨 폴더 (프레임과 같은 이름의 .txt, conf 열이 없으면 1.0)
+- 정답: --slot-labels JSON ({프레임 이름: {slot_id: 1/0 또는 "occupied"/"free"}})이 있으면 사용,
+  없으면 프레임의 YOLO 라벨(사람이 그린 차량 박스)로 슬롯 라벨 결정 (slot_classifier.slot_labels_from_boxes, 애매한 슬롯 제외)
+- IoU 임계값 스윕은 --slot-labels가 있을 때만 계산 (박스 라벨은 스윕 대상인 IoU >= 0.17 규칙으로 정답을 만들고
+  0.05-0.17 구간 슬롯을 빼므로 결과가 그 임계값 쪽으로 치우침), 없으면 center 규칙만 평가하고 제외한 슬롯 수를 따로 보고
+- 규칙: iou (최대 IoU >= 임계값, 임계값 스윕), center (중심점이 슬롯 외접 사각형 안, compare_iou_vs_center.py와 같은 규칙),
+  center_polygon (중심점이 슬롯 다각형 안)
+
+Usage:
+    $ python detect.py --weights best_macos.pt --source custom_dataset/images/val --save-txt --save-conf
+    $ python calibrate_occupancy.py --roi roi_full_rect_coords.json --images custom_dataset/images/val \
+        --detections runs/detect/exp/labels --roi-key frame_30min.jpg --slot-labels slot_labels.json \
+        --out runs/calibration.csv
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from PIL import Image
+
+from parking_detector import VEHICLE_CLASSES
+from roi_registry import RoiRegistry
+from slot_classifier import slot_labels_from_boxes
+from slot_occupancy import SlotGeometry
+from utils.dataloaders import IMG_FORMATS, img2label_paths
+
+logger = logging.getLogger(__name__)
+
+RULES = ("iou", "center", "center_polygon")
+
+# 워커 프로세스별 상태 (initializer에서 설정, ROI 키별 SlotGeometry는 처음 사용할 때 생성)
+WORKER = {}
+
+
+def init_worker(roi_data: Dict, slot_labels: Optional[Dict], conf: float, classes: Optional[Sequence[int]]):
+    WORKER.update(roi_data=roi_data, slot_labels=slot_labels, conf=conf, classes=classes, geometry={})
+
+
+def load_boxes(path: str, width: int, height: int, classes: Optional[Sequence[int]], conf: float = 0.0) -> np.ndarray:
+    """YOLO 라벨 파일 → (N, 4) 픽셀 xyxy (class x y w h [conf], conf 미만/다른 클래스 제외)"""
+    if not os.path.isfile(path) or os.path.getsize(path) == 0:
+        return np.zeros((0, 4))
+    labels = np.loadtxt(path, ndmin=2)
+    keep = labels[:, 5] >= conf if labels.shape[1] > 5 else np.ones(len(labels), dtype=bool)
+    if classes is not None:
+        keep &= np.isin(labels[:, 0], classes)
+    labels = labels[keep]
+    xc, yc, w, h = labels[:, 1] * width, labels[:, 2] * height, labels[:, 3] * width, labels[:, 4] * height
+    return np.stack((xc - w / 2, yc - h / 2, xc + w / 2, yc + h / 2), axis=1)
+
+
+def frame_scores(task: tuple) -> Optional[Dict]:
+    """
+    한 프레임의 슬롯별 점수와 정답 (워커 프로세스에서 실행)
+
+    Returns:
+        {'iou': (S,) 최대 IoU, 'center': (S,) bool, 'center_polygon': (S,) bool, 'label': (S,) 1/0/-1}
+        ROI 키나 정답이 없으면 None
+    """
+    image_path, label_path, det_path, key = task
+    if key not in WORKER['roi_data']:
+        return None
+    if key not in WORKER['geometry']:
+        WORKER['geometry'][key] = SlotGeometry(WORKER['roi_data'][key])
+    geometry = WORKER['geometry'][key]
+    with Image.open(image_path) as image:
+        width, height = image.size  # 헤더만 읽음
+
+    name = os.path.basename(image_path)
+    if WORKER['slot_labels'] is not None:
+        if name not in WORKER['slot_labels']:
+            return None
+        values = WORKER['slot_labels'][name]
+        mapping = {1: 1, 0: 0, "occupied": 1, "free": 0}
+        label = np.array([mapping.get(values.get(slot_id), -1) for slot_id in geometry.slot_ids])
+    else:
+        if not os.path.isfile(label_path):
+            return None
+        label = slot_labels_from_boxes(geometry, load_boxes(label_path, width, height, VEHICLE_CLASSES))
+
+    boxes = load_boxes(det_path, width, height, WORKER['classes'], WORKER['conf'])
+    centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+    max_iou, _ = geometry.max_iou(boxes)
+    in_polygon = np.zeros(len(geometry), dtype=bool)
+    in_polygon[geometry.point_pairs(centers)[1]] = True
+    return {
+        'iou': max_iou,
+        'center': geometry.centers_in_bounds(centers).any(0),
+        'center_polygon': in_polygon,
+        'label': label
+    }
+
+
+def threshold_sweep(scores: np.ndarray, labels: np.ndarray, thresholds: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    점수 >= 임계값을 occupied로 판단할 때 임계값별 혼동 행렬 / 지표 (정렬 + 누적합, 임계값 수와 무관하게 O(N log N))
+
+    Args:
+        scores: (N,) 슬롯 점수, labels: (N,) 정답 1/0, thresholds: (K,)
+    """
+    order = np.argsort(scores, kind='stable')
+    sorted_scores, sorted_labels = scores[order], labels[order]
+    # 임계값 t 아래(free로 판단)에 있는 정답 occupied / free 수
+    below = np.searchsorted(sorted_scores, thresholds, side='left')
+    occupied_below = np.concatenate(([0], np.cumsum(sorted_labels)))[below]
+    positives = int(sorted_labels.sum())
+    negatives = len(sorted_labels) - positives
+    tp = positives - occupied_below
+    fn = occupied_below
+    tn = below - occupied_below
+    fp = negatives - tn
+    return metrics(tp, fp, tn, fn)
+
+
+def metrics(tp, fp, tn, fn) -> Dict[str, np.ndarray]:
+    """혼동 행렬 → 정확도 / 정밀도 / 재현율 / F1 (배열 또는 스칼라)"""
+    tp, fp, tn, fn = (np.asarray(v, dtype=np.float64) for v in (tp, fp, tn, fn))
+    total = tp + fp + tn + fn
+    precision = np.divide(tp, tp + fp, out=np.zeros_like(tp), where=tp + fp > 0)
+    recall = np.divide(tp, tp + fn, out=np.zeros_like(tp), where=tp + fn > 0)
+    return {
+        'accuracy': np.divide(tp + tn, total, out=np.zeros_like(tp), where=total > 0),
+        'precision': precision,
+        'recall': recall,
+        'f1': np.divide(2 * precision * recall, precision + recall, out=np.zeros_like(tp),
+                        where=precision + recall > 0),
+        'tp': tp, 'fp': fp, 'tn': tn, 'fn': fn
+    }
+
+
+def collect_tasks(images: str, detections: str, roi_data: Dict, roi_key: Optional[str]) -> List[tuple]:
+    """(이미지, 정답 라벨, 탐지 라벨, ROI 키) 목록 (프레임 이름이 ROI 키에 없으면 roi_key 사용)"""
+    files = sorted(str(p) for p in Path(images).rglob("*") if p.suffix[1:].lower() in IMG_FORMATS)
+    return [(f, label, os.path.join(detections, Path(f).stem + ".txt"),
+             Path(f).name if Path(f).name in roi_data else roi_key)
+            for f, label in zip(files, img2label_paths(files))]
+
+
+def calibrate(roi_path: str, images: str, detections: str, roi_key: Optional[str] = None,
+              slot_labels: Optional[str] = None, conf: float = 0.25, classes: Optional[Sequence[int]] = None,
+              thresholds: Optional[np.ndarray] = None, workers: Optional[int] = None) -> Dict:
+    """
+    폴더 전체에 대해 규칙/임계값별 슬롯 점유 판단 정확도 계산
+
+    Returns:
+        {'frames', 'slots', 'excluded_slots', 'label_source': 'slot_labels' | 'boxes', 'thresholds': (K,),
+         'iou': 임계값별 지표 배열 (slot_labels일 때만), 'center': 지표, 'center_polygon': 지표}
+    """
+    roi_data = RoiRegistry(roi_path).data  # 검증된 슬롯만 워커로 전달
+    labels_json = None
+    if slot_labels:
+        with open(slot_labels, 'r', encoding='utf-8') as f:
+            labels_json = json.load(f)
+    if thresholds is None:
+        thresholds = np.round(np.arange(0.01, 0.51, 0.01), 4)
+    tasks = collect_tasks(images, detections, roi_data, roi_key)
+    init_args = (roi_data, labels_json, conf, classes)
+
+    workers = os.cpu_count() if workers is None else workers
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=init_args) as pool:
+            results = list(pool.map(frame_scores, tasks, chunksize=max(len(tasks) // (workers * 4), 1)))
+    else:
+        init_worker(*init_args)
+        results = [frame_scores(task) for task in tasks]
+    results = [r for r in results if r is not None]
+
+    report = {'frames': len(results), 'skipped_frames': len(tasks) - len(results), 'thresholds': thresholds}
+    if not results:
+        return report
+    merged = {name: np.concatenate([r[name] for r in results]) for name in ('label',) + RULES}
+    valid = merged['label'] >= 0
+    label = merged['label'][valid]
+    report['slots'] = int(valid.sum())
+    report['excluded_slots'] = int((~valid).sum())  # 정답 없음 (박스 라벨이면 최대 IoU 0.05-0.17의 애매한 슬롯)
+    report['label_source'] = 'slot_labels' if labels_json is not None else 'boxes'
+    if labels_json is not None:
+        report['iou'] = threshold_sweep(merged['iou'][valid], label, thresholds)
+    for rule in RULES[1:]:
+        predicted = merged[rule][valid]
+        report[rule] = metrics((predicted & (label == 1)).sum(), (predicted & (label == 0)).sum(),
+                               (~predicted & (label == 0)).sum(), (~predicted & (label == 1)).sum())
+    return report
+
+
+def save_csv(report: Dict, path: str):
+    """규칙/임계값별 지표 CSV 저장"""
+    columns = ('accuracy', 'precision', 'recall', 'f1', 'tp', 'fp', 'tn', 'fn')
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(('rule', 'threshold') + columns)
+        for i, threshold in enumerate(report['thresholds'] if 'iou' in report else []):
+            writer.writerow(['iou', f"{threshold:.4f}"] + [f"{report['iou'][c][i]:.4f}" for c in columns])
+        for rule in RULES[1:]:
+            writer.writerow([rule, ""] + [f"{float(report[rule][c]):.4f}" for c in columns])
+    logger.info(f"보정 결과 저장: {path}")
+
+
+def main():
+    """메인 함수"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="슬롯 점유 판단 규칙 / IoU 임계값 보정")
+    parser.add_argument("--roi", type=str, default="roi_full_rect_coords.json", help="ROI 좌표 JSON 경로")
+    parser.add_argument("--images", type=str, default="custom_dataset/images/val", help="라벨링된 프레임 디렉터리")
+    parser.add_argument("--detections", type=str, default="runs/detect/exp/labels",
+                        help="탐지 결과 라벨 디렉터리 (detect.py --save-txt --save-conf)")
+    parser.add_argument("--roi-key", type=str, default=None, help="프레임 이름이 ROI 키에 없을 때 사용할 키")
+    parser.add_argument("--slot-labels", type=str, default=None, help="슬롯 단위 정답 JSON (IoU 임계값 스윕에 필요, 없으면 프레임 YOLO 라벨로 center 규칙만 평가)")
+    parser.add_argument("--conf", type=float, default=0.25, help="탐지 최소 confidence")
+    parser.add_argument("--classes", type=int, nargs="+", default=None, help="사용할 탐지 클래스 (기본: 전체)")
+    parser.add_argument("--thresholds", type=float, nargs=3, default=[0.01, 0.51, 0.01], metavar=("START", "STOP", "STEP"),
+                        help="IoU 임계값 범위")
+    parser.add_argument("--workers", type=int, default=None, help="프로세스 수 (기본: CPU 수, 1이면 순차)")
+    parser.add_argument("--out", type=str, default=None, help="결과 CSV 경로")
+    opt = parser.parse_args()
+
+    t = time.perf_counter()
+    report = calibrate(opt.roi, opt.images, opt.detections, opt.roi_key, opt.slot_labels, opt.conf, opt.classes,
+                       np.round(np.arange(*opt.thresholds), 4), opt.workers)
+    elapsed = time.perf_counter() - t
+    if not report['frames']:
+        logger.error(f"보정할 프레임이 없습니다 (건너뜀 {report['skipped_frames']}개)")
+        return
+
+    logger.info(f"프레임 {report['frames']}개 (건너뜀 {report['skipped_frames']}개), 슬롯 {report['slots']}개 "
+                f"(정답 없어 제외 {report['excluded_slots']}개) - {elapsed:.2f}초")
+    if 'iou' in report:
+        sweep = report['iou']
+        best = int(np.argmax(sweep['accuracy']))
+        for i, threshold in enumerate(report['thresholds']):
+            logger.info(f"IoU {threshold:.2f}: 정확도 {sweep['accuracy'][i]:.4f} 정밀도 {sweep['precision'][i]:.4f} "
+                        f"재현율 {sweep['recall'][i]:.4f} F1 {sweep['f1'][i]:.4f}")
+        logger.info(f"최적 IoU 임계값 {report['thresholds'][best]:.2f} - 정확도 {sweep['accuracy'][best]:.4f}")
+    else:
+        logger.warning(f"IoU 임계값 스윕 생략: 박스 라벨은 같은 IoU 규칙으로 정답을 만들어 결과가 치우침 - "
+                       f"--slot-labels로 슬롯 단위 정답 필요 (애매한 슬롯 {report['excluded_slots']}개 제외됨)")
+    for rule in RULES[1:]:
+        logger.info(f"{rule}: 정확도 {float(report[rule]['accuracy']):.4f} F1 {float(report[rule]['f1']):.4f}")
+    if opt.out:
+        save_csv(report, opt.out)
+
+
+if __name__ == "__main__":
+    main()
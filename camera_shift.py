@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+카메라 이동 감지 및 ROI 자동 재정합
+고정 카메라가 살짝 밀리면 ROI가 조용히 어긋나므로, 낮은 주기(check_interval초)로 축소 그레이스케일 프레임의 ORB 특징점을
+기준 프레임(ROI를 그린 프레임)과 매칭해 homography를 추정하고, ROI 꼭짓점의 평균 이동량(drift)이 임계값을 넘으면
+컴파일된 슬롯 배열을 재투영해서 사용
+
+- 기준 특징점은 한 번만 계산, 검사 1회 = 축소 + ORB + knn 매칭 + RANSAC (추론 1회보다 훨씬 저렴)
+- 주차 차량이 바뀌어 생기는 잘못된 매칭은 ratio test + RANSAC으로 제거, 인라이어가 부족하면 이전 변환 유지
+- drift가 drift_threshold를 넘으면 재정합, 이후 drift가 절반 아래로 돌아오면 원래 ROI 사용 (hysteresis)
+- 재정합 중 새 추정이 현재 변환과 update_tolerance 픽셀 이상 다를 때만 변환 교체 (매 검사마다 파생 캐시를 다시 만들지 않음)
+"""
+
+import logging
+import time
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+from roi_transform import apply_transform, transform_geometry
+from slot_occupancy import SlotGeometry
+
+logger = logging.getLogger(__name__)
+
+
+class CameraShiftMonitor:
+    def __init__(self,
+                 reference_frame: Optional[np.ndarray] = None,
+                 width: int = 960,
+                 check_interval: float = 300,
+                 drift_threshold: float = 4.0,
+                 update_tolerance: float = 1.0,
+                 n_features: int = 1000,
+                 ratio: float = 0.75,
+                 min_inliers: int = 30):
+        """
+        모니터 초기화
+
+        Args:
+            reference_frame: ROI를 그린 기준 프레임 (None이면 처음 검사한 프레임을 기준으로 사용)
+            width: 특징점 검출용 축소 프레임 폭 (픽셀)
+            check_interval: 검사 최소 간격 (초, 0이면 매번)
+            drift_threshold: ROI 꼭짓점 평균 이동량이 이 값(원본 픽셀)을 넘으면 재정합
+            update_tolerance: 재정합 중 새 변환이 현재 변환과 이 값(픽셀) 이상 다를 때만 교체
+            n_features: ORB 최대 특징점 수
+            ratio: Lowe ratio test 비율
+            min_inliers: 변환을 믿기 위한 최소 RANSAC 인라이어 수
+        """
+        self.width = width
+        self.check_interval = check_interval
+        self.drift_threshold = drift_threshold
+        self.update_tolerance = update_tolerance
+        self.ratio = ratio
+        self.min_inliers = min_inliers
+        self.orb = cv2.ORB_create(nfeatures=n_features)
+        self.matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+
+        self.reference = None  # (축소 배율, 원본 프레임 크기, 특징점 좌표 (K, 2), 기술자)
+        self.checked_at = None
+        self.matrix = None  # 기준 ROI -> 현재 프레임 변환 (재정합 중이 아니면 None)
+        self.version = 0  # 변환이 바뀔 때마다 증가
+        self.projected = None  # (원본 geometry, version, 재투영 geometry)
+        self.last_drift = 0.0
+        self.stats = {'checks': 0, 'failed': 0, 'realigned': 0, 'restored': 0, 'max_drift_px': 0.0, 'check_ms': 0.0}
+        if reference_frame is not None:
+            self.set_reference(reference_frame)
+
+    def features(self, frame: np.ndarray) -> tuple:
+        """축소 그레이스케일 프레임의 (축소 배율, 특징점 좌표 (K, 2), 기술자)"""
+        height, width = frame.shape[:2]
+        scale = min(self.width / width, 1.0)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        small = cv2.resize(gray, (int(round(width * scale)), int(round(height * scale))), interpolation=cv2.INTER_AREA)
+        keypoints, descriptors = self.orb.detectAndCompute(small, None)
+        points = np.array([kp.pt for kp in keypoints], dtype=np.float32).reshape(-1, 2)
+        return scale, points, descriptors
+
+    def set_reference(self, frame: np.ndarray):
+        """기준 프레임 설정 (특징점은 여기서 한 번만 계산) - 변환 초기화"""
+        scale, points, descriptors = self.features(frame)
+        self.reference = (scale, frame.shape[:2], points, descriptors)
+        self.matrix = None
+        self.version += 1
+        logger.info(f"카메라 이동 감지 기준 프레임 설정 - 특징점 {len(points)}개")
+
+    def estimate(self, frame: np.ndarray) -> Optional[tuple]:
+        """기준 프레임 -> 현재 프레임 homography (원본 해상도)와 인라이어 수 (추정 실패 시 None)"""
+        ref_scale, ref_shape, ref_points, ref_desc = self.reference
+        if frame.shape[:2] != ref_shape:
+            logger.warning(f"프레임 크기가 기준 프레임과 다릅니다: {frame.shape[:2]} != {ref_shape}")
+            return None
+        scale, points, descriptors = self.features(frame)
+        if ref_desc is None or descriptors is None or len(ref_desc) < 2 or len(descriptors) < 2:
+            return None
+
+        pairs = self.matcher.knnMatch(ref_desc, descriptors, k=2)
+        good = [m[0] for m in pairs if len(m) == 2 and m[0].distance < self.ratio * m[1].distance]
+        if len(good) < self.min_inliers:
+            return None
+        src = ref_points[[m.queryIdx for m in good]]
+        dst = points[[m.trainIdx for m in good]]
+        h_small, inliers = cv2.findHomography(src, dst, cv2.RANSAC, 3.0)
+        if h_small is None or int(inliers.sum()) < self.min_inliers:
+            return None
+        # 축소 좌표계 변환을 원본 좌표계로: H = S_live^-1 @ H_small @ S_ref
+        matrix = np.diag([1 / scale, 1 / scale, 1.0]) @ h_small @ np.diag([ref_scale, ref_scale, 1.0])
+        return matrix / matrix[2, 2], int(inliers.sum())
+
+    def drift(self, matrix: np.ndarray, points: np.ndarray) -> float:
+        """변환이 점들을 옮기는 평균 거리 (픽셀)"""
+        return float(np.linalg.norm(apply_transform(points, matrix) - points, axis=1).mean()) if len(points) else 0.0
+
+    def check(self, frame: np.ndarray, geometry: Optional[SlotGeometry] = None, force: bool = False) -> bool:
+        """
+        check_interval이 지났으면 카메라 이동 검사 (변환이 바뀌었으면 True)
+
+        Args:
+            frame: BGR 프레임
+            geometry: drift를 잴 원래 ROI 슬롯 배열 (None이거나 비어 있으면 프레임 네 모서리 사용)
+            force: 간격과 관계없이 검사
+        """
+        now = time.monotonic()
+        if not force and self.checked_at is not None and now - self.checked_at < self.check_interval:
+            return False
+        self.checked_at = now
+        if self.reference is None:
+            self.set_reference(frame)
+            return False
+
+        t = time.perf_counter()
+        self.stats['checks'] += 1
+        estimate = self.estimate(frame)
+        self.stats['check_ms'] = round((time.perf_counter() - t) * 1000, 1)
+        if estimate is None:
+            self.stats['failed'] += 1
+            logger.warning("카메라 이동 검사 실패 (특징점 매칭 부족 또는 프레임 크기 변경) - 현재 ROI 유지")
+            return False
+        matrix, inliers = estimate
+
+        if geometry is not None and len(geometry):
+            points = geometry.points
+        else:
+            height, width = frame.shape[:2]
+            points = np.array([[0, 0], [width, 0], [width, height], [0, height]], dtype=np.float64)
+        self.last_drift = self.drift(matrix, points)
+        self.stats['max_drift_px'] = round(max(self.stats['max_drift_px'], self.last_drift), 2)
+        logger.info(f"카메라 이동 검사 - drift {self.last_drift:.2f}px, 인라이어 {inliers}개, {self.stats['check_ms']}ms")
+
+        if self.matrix is None:
+            if self.last_drift <= self.drift_threshold:
+                return False
+            self.stats['realigned'] += 1
+            logger.warning(f"카메라 이동 감지 (drift {self.last_drift:.1f}px > {self.drift_threshold}px) - ROI 재투영")
+        elif self.last_drift <= self.drift_threshold / 2:
+            self.stats['restored'] += 1
+            logger.info(f"카메라가 기준 위치로 돌아옴 (drift {self.last_drift:.1f}px) - 원래 ROI 사용")
+            matrix = None
+        else:
+            # 현재 변환 대비 변화량: 현재 변환으로 옮긴 점을 새 변환으로 옮긴 점과 비교
+            change = float(np.linalg.norm(apply_transform(points, matrix) - apply_transform(points, self.matrix), axis=1).mean())
+            if change <= self.update_tolerance:
+                return False
+            logger.info(f"카메라 위치 추가 변화 ({change:.1f}px) - ROI 재투영 갱신")
+        self.matrix = matrix
+        self.version += 1
+        return True
+
+    def project(self, geometry: SlotGeometry) -> SlotGeometry:
+        """재정합 중이면 재투영한 슬롯 배열 (같은 geometry/변환이면 같은 객체 재사용), 아니면 그대로"""
+        if self.matrix is None:
+            return geometry
+        cached = self.projected
+        if cached is None or cached[0] is not geometry or cached[1] != self.version:
+            cached = self.projected = (geometry, self.version, transform_geometry(geometry, self.matrix))
+        return cached[2]
+
+    def summary(self) -> Dict:
+        """검사/재정합 카운터와 drift 지표"""
+        return {**self.stats, 'last_drift_px': round(self.last_drift, 2), 'realigned_now': self.matrix is not None}
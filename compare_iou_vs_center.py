@@ -3,7 +3,7 @@ import json
 import cv2
 import csv
 import numpy as np
-from shapely.geometry import box, Polygon
+from slot_occupancy import SlotGeometry
 
 # ✅ 경로 설정
 IMAGE_PATH = r"C:\Users\wecha\project\yolov5\custom_dataset\images\train\Sanggyeonggwan_c3_1.JPG"
@@ -45,36 +45,20 @@ with open(YOLO_LABEL_PATH, "r") as f:
         bboxes.append((x1, y1, x2, y2))
         centers.append((xc, yc))
 
-# ✅ IoU 계산 함수
-def calculate_iou(bbox, roi_coords):
-    bbox_poly = box(*bbox)
-    roi_poly = Polygon(roi_coords)
-    if not bbox_poly.intersects(roi_poly):
-        return 0.0
-    return bbox_poly.intersection(roi_poly).area / bbox_poly.union(roi_poly).area
-
-# ✅ 중심점 판단 함수
-def is_center_inside(cx, cy, roi_coords):
-    xs = [p[0] for p in roi_coords]
-    ys = [p[1] for p in roi_coords]
-    return min(xs) <= cx <= max(xs) and min(ys) <= cy <= max(ys)
+# ✅ IoU / 중심점 판단을 슬롯 전체에 대해 한 번에 계산
+geometry = SlotGeometry(roi_list)
+max_iou, _ = geometry.max_iou(np.array(bboxes))
+# 중심점 판단: 중심점이 ROI 외접 사각형 안에 있으면 점유
+center_inside = geometry.centers_in_bounds(np.array(centers)).any(0)
 
 # ✅ 판단 및 시각화
 results = []
-for roi in roi_list:
-    slot_id = roi["slot_id"]
-    coords = roi["coords"]
-
+for i, (slot_id, coords) in enumerate(zip(geometry.slot_ids, geometry.coords)):
     # IoU 판단
-    max_iou = max([calculate_iou(bbox, coords) for bbox in bboxes], default=0.0)
-    iou_status = "occupied" if max_iou >= 0.1 else "free"
+    iou_status = "occupied" if max_iou[i] >= 0.1 else "free"
 
     # 중심점 판단
-    center_status = "free"
-    for cx, cy in centers:
-        if is_center_inside(cx, cy, coords):
-            center_status = "occupied"
-            break
+    center_status = "occupied" if center_inside[i] else "free"
 
     # 판단 비교
     match = "일치" if iou_status == center_status else "불일치"
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+monotonic deadline 기반 주기 작업 스케줄러
+schedule + time.sleep(60) 폴링 대신 다음 실행 시각(deadline)까지 정확히 대기하고,
+deadline은 이전 deadline + interval로 계산해 실행 시간만큼 밀리지 않음 (drift 없음)
+
+- 작업은 워커 풀에서 실행되어 여러 카메라 작업이 서로를 기다리지 않음
+- 같은 작업의 이전 실행이 아직 끝나지 않았으면(overrun) 'skip'은 이번 주기를 건너뛰고,
+  'coalesce'는 밀린 주기들을 합쳐 이전 실행이 끝나는 즉시 한 번만 실행
+- 작업별 지연(lateness: 실제 시작 - deadline)과 실행 시간을 기록
+"""
+
+import heapq
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+OVERRUN_POLICIES = ("skip", "coalesce")
+
+
+class ScheduledJob:
+    def __init__(self, name: str, func: Callable, interval_seconds: float, overrun_policy: str):
+        self.name = name
+        self.func = func
+        self.interval = interval_seconds
+        self.overrun_policy = overrun_policy
+        self.next_deadline = 0.0
+        self.running = False
+        self.rerun_deadline = None  # coalesce: 실행 중에 도래한 주기 중 가장 이른 deadline
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.coalesced = 0
+        self.lateness_ms = deque(maxlen=1000)
+        self.duration_ms = deque(maxlen=1000)
+
+    def metrics(self) -> Dict:
+        """작업 지표 요약 (ms)"""
+        def stats(values):
+            if not values:
+                return {'mean': 0.0, 'p95': 0.0, 'max': 0.0}
+            arr = np.asarray(values)
+            return {'mean': round(float(arr.mean()), 1), 'p95': round(float(np.percentile(arr, 95)), 1),
+                    'max': round(float(arr.max()), 1)}
+
+        return {
+            'runs': self.runs,
+            'failures': self.failures,
+            'skipped': self.skipped,
+            'coalesced': self.coalesced,
+            'lateness_ms': stats(self.lateness_ms),
+            'duration_ms': stats(self.duration_ms)
+        }
+
+
+class DeadlineScheduler:
+    def __init__(self, max_workers: int = 4):
+        """
+        스케줄러 초기화
+
+        Args:
+            max_workers: 작업 실행 워커 수 (서로 다른 작업이 동시에 실행될 수 있는 수)
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self.heap = []  # (deadline, 순번, 작업 이름)
+        self.counter = 0
+        self.cond = threading.Condition()
+        self.stopped = False
+        self.thread = None
+
+    def add_job(self, name: str, func: Callable, interval_seconds: float,
+                first_delay: float = 0.0, overrun_policy: str = "skip") -> ScheduledJob:
+        """
+        주기 작업 등록
+
+        Args:
+            name: 작업 이름 (지표/로그 구분)
+            func: 인자 없는 작업 함수
+            interval_seconds: 실행 주기 (초)
+            first_delay: 첫 실행까지 대기 시간 (초, 0이면 즉시)
+            overrun_policy: 'skip' | 'coalesce'
+        """
+        if overrun_policy not in OVERRUN_POLICIES:
+            raise ValueError(f"지원하지 않는 overrun 정책: {overrun_policy} (가능: {OVERRUN_POLICIES})")
+        job = ScheduledJob(name, func, interval_seconds, overrun_policy)
+        with self.cond:
+            self.jobs[name] = job
+            job.next_deadline = time.monotonic() + first_delay
+            self.push(job)
+            self.cond.notify()
+        return job
+
+    def push(self, job: ScheduledJob):
+        """작업의 다음 deadline을 대기열에 추가 (cond 보유 상태에서 호출)"""
+        self.counter += 1
+        heapq.heappush(self.heap, (job.next_deadline, self.counter, job.name))
+
+    def start(self):
+        """스케줄러 스레드 시작"""
+        self.thread = threading.Thread(target=self.loop, name="deadline-scheduler", daemon=True)
+        self.thread.start()
+
+    def loop(self):
+        """deadline까지 대기 후 작업 제출 (스케줄러 스레드)"""
+        with self.cond:
+            while not self.stopped:
+                if not self.heap:
+                    self.cond.wait()
+                    continue
+                deadline, _, name = self.heap[0]
+                now = time.monotonic()
+                if deadline > now:
+                    self.cond.wait(deadline - now)
+                    continue
+                heapq.heappop(self.heap)
+                job = self.jobs[name]
+                self.fire(job, deadline, now)
+
+    def fire(self, job: ScheduledJob, deadline: float, now: float):
+        """deadline이 된 작업 실행 또는 overrun 처리 후 다음 deadline 예약 (cond 보유 상태에서 호출)"""
+        if job.running:
+            if job.overrun_policy == "coalesce":
+                if job.rerun_deadline is None:
+                    job.rerun_deadline = deadline
+                else:
+                    job.coalesced += 1
+            else:
+                job.skipped += 1
+                logger.warning(f"[{job.name}] 이전 실행이 아직 진행 중이라 이번 주기를 건너뜀 (누적 {job.skipped}회)")
+        else:
+            self.submit(job, deadline)
+
+        # 다음 deadline은 이번 deadline 기준 (실행 시간만큼 밀리지 않음), 이미 지난 주기는 건너뜀
+        job.next_deadline = deadline + job.interval
+        if job.next_deadline <= now:
+            missed = int((now - job.next_deadline) // job.interval) + 1
+            job.skipped += missed
+            job.next_deadline += missed * job.interval
+            logger.warning(f"[{job.name}] 스케줄러 지연으로 {missed}개 주기 건너뜀")
+        self.push(job)
+
+    def submit(self, job: ScheduledJob, deadline: float):
+        """워커 풀에 작업 제출 (cond 보유 상태에서 호출)"""
+        job.running = True
+        self.executor.submit(self.run_job, job, deadline)
+
+    def run_job(self, job: ScheduledJob, deadline: float):
+        """작업 실행 및 지표 기록 (워커 스레드)"""
+        start = time.monotonic()
+        job.lateness_ms.append((start - deadline) * 1000)
+        try:
+            job.func()
+        except Exception as e:
+            job.failures += 1
+            logger.error(f"[{job.name}] 작업 실행 중 오류: {e}")
+        finally:
+            duration = time.monotonic() - start
+            job.duration_ms.append(duration * 1000)
+            job.runs += 1
+            if duration > job.interval:
+                logger.warning(f"[{job.name}] 실행 시간 {duration:.1f}초가 주기 {job.interval:g}초를 초과")
+            with self.cond:
+                job.running = False
+                if job.rerun_deadline is not None and not self.stopped:
+                    # coalesce: 실행 중에 밀린 주기들을 한 번으로 합쳐 즉시 실행
+                    rerun_deadline, job.rerun_deadline = job.rerun_deadline, None
+                    self.submit(job, rerun_deadline)
+
+    def metrics(self) -> Dict[str, Dict]:
+        """작업별 지표"""
+        return {name: job.metrics() for name, job in self.jobs.items()}
+
+    def log_metrics(self):
+        """작업별 지표 로그 출력"""
+        for name, m in self.metrics().items():
+            logger.info(f"[{name}] 실행 {m['runs']}회 (실패 {m['failures']}, 건너뜀 {m['skipped']}, 합침 {m['coalesced']}) | "
+                        f"지연 평균 {m['lateness_ms']['mean']} ms / 최대 {m['lateness_ms']['max']} ms | "
+                        f"실행 시간 평균 {m['duration_ms']['mean']} ms / 최대 {m['duration_ms']['max']} ms")
+
+    def stop(self, wait: bool = True):
+        """스케줄러 중지 (wait=True면 실행 중인 작업이 끝날 때까지 대기)"""
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+        self.executor.shutdown(wait=wait)
+
+    def run_forever(self, metrics_interval: Optional[float] = 600):
+        """Ctrl+C까지 실행하며 metrics_interval초마다 지표 로그 출력"""
+        self.start()
+        try:
+            while True:
+                time.sleep(metrics_interval or 3600)
+                if metrics_interval:
+                    self.log_metrics()
+        except KeyboardInterrupt:
+            logger.info("스케줄러 중단됨")
+        finally:
+            self.stop()
+            self.log_metrics()
@@ -5,13 +5,13 @@ IoU 계산 과정을 자세히 보여줌
 """
 
 import cv2
-import json
 import numpy as np
 from datetime import datetime
 import logging
 from typing import List, Dict, Tuple, Optional
 import os
 from shapely.geometry import box, Polygon
+from roi_registry import RoiRegistry
 
 # 로깅 설정
 logging.basicConfig(
@@ -35,21 +35,10 @@ class DebugOccupancyAnalyzer:
         self.image_path = image_path
         
         # 초기화
-        self.roi_data = self.load_roi_data()
+        self.roi = RoiRegistry.shared(roi_path)
         
         logger.info(f"디버그 분석기 초기화 완료")
         
-    def load_roi_data(self) -> Dict:
-        """ROI 좌표 데이터 로드"""
-        try:
-            with open(self.roi_path, 'r', encoding='utf-8') as f:
-                roi_data = json.load(f)
-            logger.info(f"ROI 데이터 로드 완료 - {len(roi_data)}개 이미지의 슬롯 정보")
-            return roi_data
-        except Exception as e:
-            logger.error(f"ROI 데이터 로드 실패: {e}")
-            return {}
-    
     def load_yolo_detections(self) -> List[Dict]:
         """YOLO 인식 결과 로드"""
         # 최신 인식 결과 파일 찾기
@@ -147,7 +136,7 @@ class DebugOccupancyAnalyzer:
         
         # ROI 데이터에서 frame_30min.jpg의 슬롯 정보 사용
         image_key = "frame_30min.jpg"
-        slots = self.roi_data.get(image_key, [])
+        slots = self.roi.slots(image_key)
         
         logger.info(f"=== 디버그 분석 시작 ===")
         logger.info(f"총 감지된 차량: {len(normalized_detections)}대")
@@ -14,6 +14,10 @@ Usage - sources:
                                                      'https://youtu.be/LNwODJXcvt4'  # YouTube
                                                      'rtsp://example.com/media.mp4'  # RTSP, RTMP, HTTP stream
 
+Usage - tracking:
+    $ python detect.py --weights best_macos.pt --source 'rtsp://example.com/media.mp4' --track                 # track IDs
+    $ python detect.py --weights best_macos.pt --source vid.mp4 --track --detect-every 5                        # infer every 5th frame
+
 Usage - formats:
     $ python detect.py --weights yolov5s.pt                 # PyTorch
                                  yolov5s.torchscript        # TorchScript
@@ -33,6 +37,7 @@ import csv
 import os
 import platform
 import sys
+import time
 from pathlib import Path
 
 import torch
@@ -64,6 +69,7 @@ from utils.general import (
     xyxy2xywh,
 )
 from utils.torch_utils import select_device, smart_inference_mode
+from vehicle_tracker import VehicleTracker
 
 
 @smart_inference_mode()
@@ -97,6 +103,8 @@ def run(
     half=False,  # use FP16 half-precision inference
     dnn=False,  # use OpenCV DNN for ONNX inference
     vid_stride=1,  # video frame-rate stride
+    track=False,  # track objects across frames (SORT-style Kalman + IoU tracker)
+    detect_every=1,  # with track, run inference every N frames and propagate tracks in between
 ):
     """
     Runs YOLOv5 detection inference on various sources like images, videos, directories, streams, etc.
@@ -133,6 +141,9 @@ def run(
         half (bool): If True, use FP16 half-precision inference. Default is False.
         dnn (bool): If True, use OpenCV DNN backend for ONNX inference. Default is False.
         vid_stride (int): Stride for processing video frames, to skip frames between processing. Default is 1.
+        track (bool): If True, assign persistent track IDs to detections across frames. Default is False.
+        detect_every (int): With `track`, run inference only on every Nth frame and draw Kalman-propagated track boxes
+            on the frames in between. Default is 1.
 
     Returns:
         None
@@ -178,11 +189,15 @@ def run(
     else:
         dataset = LoadImages(source, img_size=imgsz, stride=stride, auto=pt, vid_stride=vid_stride)
     vid_path, vid_writer = [None] * bs, [None] * bs
+    trackers = [VehicleTracker() for _ in range(bs)] if track else None
+    frame_idx = 0
 
     # Run inference
     model.warmup(imgsz=(1 if pt or model.triton else bs, 3, *imgsz))  # warmup
     seen, windows, dt = 0, [], (Profile(device=device), Profile(device=device), Profile(device=device))
     for path, im, im0s, vid_cap, s in dataset:
+        infer = trackers is None or frame_idx % max(detect_every, 1) == 0  # otherwise tracks are propagated
+        frame_idx += 1
         with dt[0]:
             im = torch.from_numpy(im).to(model.device)
             im = im.half() if model.fp16 else im.float()  # uint8 to fp16/32
@@ -195,7 +210,9 @@ def run(
         # Inference
         with dt[1]:
             visualize = increment_path(save_dir / Path(path).stem, mkdir=True) if visualize else False
-            if model.xml and im.shape[0] > 1:
+            if not infer:
+                pred = None
+            elif model.xml and im.shape[0] > 1:
                 pred = None
                 for image in ims:
                     if pred is None:
@@ -207,7 +224,10 @@ def run(
                 pred = model(im, augment=augment, visualize=visualize)
         # NMS
         with dt[2]:
-            pred = non_max_suppression(pred, conf_thres, iou_thres, classes, agnostic_nms, max_det=max_det)
+            if infer:
+                pred = non_max_suppression(pred, conf_thres, iou_thres, classes, agnostic_nms, max_det=max_det)
+            else:
+                pred = [torch.zeros((0, 6), device=model.device) for _ in range(im.shape[0])]
 
         # Second-stage classifier (optional)
         # pred = utils.general.apply_classifier(pred, classifier_model, im, im0s)
@@ -242,9 +262,21 @@ def run(
             gn = torch.tensor(im0.shape)[[1, 0, 1, 0]]  # normalization gain whwh
             imc = im0.copy() if save_crop else im0  # for save_crop
             annotator = Annotator(im0, line_width=line_thickness, example=str(names))
+            track_ids = None
+            if trackers is not None:
+                if infer:
+                    if len(det):
+                        det[:, :4] = scale_boxes(im.shape[2:], det[:, :4], im0.shape).round()
+                    timestamp = frame / (vid_cap.get(cv2.CAP_PROP_FPS) or 30) if vid_cap else time.monotonic()
+                    tracks = trackers[i].update(det.cpu().numpy(), timestamp)
+                else:
+                    tracks = trackers[i].propagate()
+                det = torch.from_numpy(tracks[:, [0, 1, 2, 3, 5, 6]]).float().round()
+                track_ids = tracks[:, 4].astype(int)
             if len(det):
-                # Rescale boxes from img_size to im0 size
-                det[:, :4] = scale_boxes(im.shape[2:], det[:, :4], im0.shape).round()
+                # Rescale boxes from img_size to im0 size (tracked boxes are already in im0 coordinates)
+                if trackers is None:
+                    det[:, :4] = scale_boxes(im.shape[2:], det[:, :4], im0.shape).round()
 
                 # Print results
                 for c in det[:, 5].unique():
@@ -252,7 +284,7 @@ def run(
                     s += f"{n} {names[int(c)]}{'s' * (n > 1)}, "  # add to string
 
                 # Write results
-                for *xyxy, conf, cls in reversed(det):
+                for j, (*xyxy, conf, cls) in zip(reversed(range(len(det))), reversed(det)):
                     c = int(cls)  # integer class
                     label = names[c] if hide_conf else f"{names[c]}"
                     confidence = float(conf)
@@ -275,6 +307,8 @@ def run(
                     if save_img or save_crop or view_img:  # Add bbox to image
                         c = int(cls)  # integer class
                         label = None if hide_labels else (names[c] if hide_conf else f"{names[c]} {conf:.2f}")
+                        if label is not None and track_ids is not None:
+                            label = f"#{track_ids[j]} {label}"
                         annotator.box_label(xyxy, label, color=colors(c, True))
                     if save_crop:
                         save_one_box(xyxy, imc, file=save_dir / "crops" / names[c] / f"{p.stem}.jpg", BGR=True)
@@ -313,6 +347,9 @@ def run(
 
     # Print results
     t = tuple(x.t / seen * 1e3 for x in dt)  # speeds per image
+    if trackers is not None:
+        for i, tracker in enumerate(trackers):
+            LOGGER.info(f"Tracks{f' (stream {i})' if bs > 1 else ''}: {tracker.summary()}")
     LOGGER.info(f"Speed: %.1fms pre-process, %.1fms inference, %.1fms NMS per image at shape {(1, 3, *imgsz)}" % t)
     if save_txt or save_img:
         s = f"\n{len(list(save_dir.glob('labels/*.txt')))} labels saved to {save_dir / 'labels'}" if save_txt else ""
@@ -355,6 +392,9 @@ def parse_opt():
         --dnn (bool, optional): Flag to use OpenCV DNN for ONNX inference. Defaults to False.
         --vid-stride (int, optional): Video frame-rate stride, determining the number of frames to skip in between
             consecutive frames. Defaults to 1.
+        --track (bool, optional): Flag to assign persistent track IDs across frames. Defaults to False.
+        --detect-every (int, optional): With --track, run inference every N frames and propagate tracks in between.
+            Defaults to 1.
 
     Returns:
         argparse.Namespace: Parsed command-line arguments as an argparse.Namespace object.
@@ -400,6 +440,8 @@ def parse_opt():
     parser.add_argument("--half", action="store_true", help="use FP16 half-precision inference")
     parser.add_argument("--dnn", action="store_true", help="use OpenCV DNN for ONNX inference")
     parser.add_argument("--vid-stride", type=int, default=1, help="video frame-rate stride")
+    parser.add_argument("--track", action="store_true", help="track objects across frames")
+    parser.add_argument("--detect-every", type=int, default=1, help="with --track, run inference every N frames")
     opt = parser.parse_args()
     opt.imgsz *= 2 if len(opt.imgsz) == 1 else 1  # expand
     print_args(vars(opt))
@@ -15,6 +15,7 @@ from models.experimental import attempt_load
 from utils.datasets import LoadImages
 from utils.general import check_img_size, non_max_suppression, scale_coords, set_logging
 from utils.torch_utils import select_device
+from slot_occupancy import SlotRasterIndex
 
 # ROI 정보 로드
 with open('./roi_slots.json', 'r') as f:
@@ -43,22 +44,17 @@ pred = non_max_suppression(pred, conf_thres=0.25, iou_thres=0.45)[0]
 # 결과 좌표 원본 이미지 크기로 복원
 pred = scale_coords(img_tensor.shape[2:], pred[:, :4], original_img.shape).round()
 
-# 슬롯 상태 판단
-for slot_id, points in roi_dict.items():
-    pts = np.array(points, dtype=np.int32)
-    roi_mask = np.zeros(original_img.shape[:2], dtype=np.uint8)
-    cv2.fillPoly(roi_mask, [pts], 255)
-    slot_img = cv2.bitwise_and(original_img, original_img, mask=roi_mask)
+# 슬롯 래스터 인덱스 (고정 카메라이므로 한 번 만든 인덱스를 캐시에서 재사용)
+slots = [{'slot_id': slot_id, 'coords': points} for slot_id, points in roi_dict.items()]
+roi_index = SlotRasterIndex.cached(slots, original_img.shape)
 
-    # ROI 내부 객체 유무 판단
-    occupied = False
-    for *xyxy, conf, cls in pred:
-        x1, y1, x2, y2 = map(int, xyxy)
-        cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-        if roi_mask[cy, cx] > 0:
-            occupied = True
-            break
+# 슬롯 상태 판단: 차량 중심점이 슬롯 영역 내부에 있으면 점유
+boxes = pred.cpu().numpy()
+centers = np.stack(((boxes[:, 0] + boxes[:, 2]) // 2, (boxes[:, 1] + boxes[:, 3]) // 2), axis=1)
+occupied_slots = roi_index.contains_points(centers).any(0)
 
+for (slot_id, points), occupied in zip(roi_dict.items(), occupied_slots):
+    pts = np.array(points, dtype=np.int32)
     color = (0, 0, 255) if occupied else (0, 255, 0)
     label = "Occupied" if occupied else "Free"
     cv2.polylines(original_img, [pts], isClosed=True, color=color, thickness=2)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+추론 전 프레임 변화 감지 게이트
+주차장 장면은 샘플 사이에 대부분 그대로이므로, 축소 그레이스케일 프레임을 마지막으로 추론한 프레임과 비교해
+어느 슬롯 영역도 임계값 이상 바뀌지 않았으면 추론을 건너뛰고 이전 슬롯 상태를 재사용
+
+- 비교는 폭 width 픽셀로 축소 + 블러 + 밝기 평균 보정 후 절대 차이 (조명 변화/센서 노이즈 완화)
+- 슬롯별 변화율 = 슬롯 다각형 내부 픽셀 중 차이가 pixel_threshold를 넘는 비율 (축소 해상도의 슬롯 픽셀 인덱스는 캐시)
+- max_skip_cycles번 연속으로 건너뛰면 느린 변화 누적에 대비해 강제로 추론
+"""
+
+import logging
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+from slot_occupancy import SlotGeometry
+
+logger = logging.getLogger(__name__)
+
+
+class FrameChangeGate:
+    def __init__(self,
+                 width: int = 160,
+                 pixel_threshold: float = 20,
+                 slot_change_ratio: float = 0.08,
+                 max_skip_cycles: int = 20):
+        """
+        게이트 초기화
+
+        Args:
+            width: 비교용 축소 프레임 폭 (픽셀, 높이는 비율 유지)
+            pixel_threshold: 픽셀이 바뀐 것으로 보는 밝기 차이 (0-255)
+            slot_change_ratio: 슬롯 픽셀 중 이 비율 이상 바뀌면 변화로 판단
+            max_skip_cycles: 연속으로 건너뛸 수 있는 최대 주기 수 (0이면 제한 없음)
+        """
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.slot_change_ratio = slot_change_ratio
+        self.max_skip_cycles = max_skip_cycles
+
+        self.reference = None  # 마지막으로 추론한 프레임 (축소 + 보정)
+        self.pending = None  # 이번에 판단한 프레임 (추론하면 update()로 reference가 됨)
+        self.skipped_in_row = 0
+        self.last_ratios = np.zeros(0)  # 슬롯별 변화율 (마지막 판단)
+        self.slot_cache = None  # (geometry, 프레임 크기, 픽셀 인덱스, 픽셀별 슬롯 번호, 슬롯별 픽셀 수)
+        self.stats = {'cycles': 0, 'inferred': 0, 'skipped': 0, 'forced': 0}
+
+    def prepare(self, frame: np.ndarray) -> np.ndarray:
+        """축소 그레이스케일 + 블러 + 밝기 평균 제거"""
+        height, width = frame.shape[:2]
+        size = (self.width, max(int(round(height * self.width / width)), 1))
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        small = cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+        small = cv2.GaussianBlur(small, (3, 3), 0)
+        return small - small.mean()
+
+    def slot_pixels(self, geometry: SlotGeometry, frame_shape) -> tuple:
+        """축소 해상도에서 슬롯별 내부 픽셀 인덱스 (geometry/프레임 크기가 같으면 재사용)"""
+        if self.slot_cache is not None and self.slot_cache[0] is geometry and self.slot_cache[1] == frame_shape[:2]:
+            return self.slot_cache[2:]
+        height, width = frame_shape[:2]
+        scale = self.width / width
+        small_h = max(int(round(height * scale)), 1)
+        pixel_idx, owner = [], []
+        mask = np.zeros((small_h, self.width), dtype=np.uint8)
+        for i, coords in enumerate(geometry.coords):
+            mask.fill(0)
+            cv2.fillPoly(mask, [np.round(np.asarray(coords, dtype=np.float64) * scale).astype(np.int32)], 1)
+            idx = np.flatnonzero(mask)
+            pixel_idx.append(idx)
+            owner.append(np.full(len(idx), i, dtype=np.int64))
+        pixel_idx = np.concatenate(pixel_idx) if pixel_idx else np.zeros(0, dtype=np.int64)
+        owner = np.concatenate(owner) if owner else np.zeros(0, dtype=np.int64)
+        counts = np.bincount(owner, minlength=len(geometry))
+        self.slot_cache = (geometry, frame_shape[:2], pixel_idx, owner, counts)
+        return pixel_idx, owner, counts
+
+    def change_ratios(self, small: np.ndarray, geometry: Optional[SlotGeometry], frame_shape) -> np.ndarray:
+        """슬롯별 변화 픽셀 비율 (geometry가 없으면 프레임 전체 비율 1개)"""
+        changed = np.abs(small - self.reference) > self.pixel_threshold
+        if geometry is None or len(geometry) == 0:
+            return np.array([changed.mean()])
+        pixel_idx, owner, counts = self.slot_pixels(geometry, frame_shape)
+        hits = np.bincount(owner, weights=changed.ravel()[pixel_idx], minlength=len(counts))
+        return hits / np.maximum(counts, 1)
+
+    def should_infer(self, frame: np.ndarray, geometry: Optional[SlotGeometry] = None) -> bool:
+        """
+        이번 프레임에 추론이 필요한지 판단 (추론하기로 했으면 추론 후 update() 호출)
+
+        Args:
+            frame: BGR 프레임
+            geometry: 슬롯 다각형 (None이면 프레임 전체 변화율로 판단)
+        """
+        self.stats['cycles'] += 1
+        small = self.prepare(frame)
+        self.pending = small
+        if self.reference is None or self.reference.shape != small.shape:
+            self.last_ratios = np.zeros(0)
+            return self.infer()
+
+        self.last_ratios = self.change_ratios(small, geometry, frame.shape)
+        if (self.last_ratios >= self.slot_change_ratio).any():
+            return self.infer()
+        if self.max_skip_cycles and self.skipped_in_row >= self.max_skip_cycles:
+            self.stats['forced'] += 1
+            return self.infer()
+
+        self.skipped_in_row += 1
+        self.stats['skipped'] += 1
+        logger.info(f"프레임 변화 없음, 추론 생략 (최대 슬롯 변화율 {self.last_ratios.max():.3f}, "
+                    f"누적 생략 {self.stats['skipped']}/{self.stats['cycles']}회)")
+        return False
+
+    def infer(self) -> bool:
+        self.skipped_in_row = 0
+        self.stats['inferred'] += 1
+        return True
+
+    def changed_slots(self) -> np.ndarray:
+        """마지막 판단에서 변화가 감지된 슬롯 번호"""
+        return np.flatnonzero(self.last_ratios >= self.slot_change_ratio)
+
+    def update(self):
+        """추론에 사용한 프레임을 비교 기준으로 저장 (should_infer가 True를 반환한 뒤 추론이 성공하면 호출)"""
+        self.reference = self.pending
+
+    def reset(self):
+        """비교 기준 초기화 (다음 프레임은 반드시 추론)"""
+        self.reference = None
+        self.skipped_in_row = 0
+
+    def summary(self) -> Dict:
+        """생략률 포함 카운터"""
+        cycles = max(self.stats['cycles'], 1)
+        return {**self.stats, 'skip_rate': round(self.stats['skipped'] / cycles, 3)}
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+letterbox 전처리기 (버퍼 재사용)
+utils.augmentations.letterbox와 같은 기하(비율 유지 리사이즈 + 114 패딩)로 전처리하되,
+입력 크기별 기하는 한 번만 계산하고 출력 크기별 uint8/float 버퍼를 미리 할당해 매 프레임 재사용
+
+- cv2.resize가 미리 채워 둔 패딩 버퍼의 내부 영역에 직접 기록 (패딩은 다시 쓰지 않음)
+- BGR→RGB, HWC→CHW, uint8→float 변환은 미리 할당한 입력 텐서에 채널별 copy_ 후 제자리 div_
+- CUDA에서는 호스트 버퍼를 pinned 메모리로 잡아 비동기 전송
+"""
+
+import logging
+from typing import Dict, List, Sequence, Tuple
+
+import cv2
+import numpy as np
+import torch
+
+from utils.augmentations import letterbox
+
+logger = logging.getLogger(__name__)
+
+PAD_COLOR = 114
+
+
+class LetterboxPreprocessor:
+    def __init__(self, imgsz: int = 640, stride: int = 32, auto: bool = False,
+                 device: torch.device = torch.device("cpu"), half: bool = False):
+        """
+        전처리기 초기화
+
+        Args:
+            imgsz: 모델 입력 크기 (정사각형)
+            stride: 모델 stride (auto일 때 패딩을 stride 배수로 최소화)
+            auto: letterbox 최소 사각형 모드 (False면 항상 imgsz x imgsz, 배치 추론에 필요)
+            device: 모델 입력 텐서 장치
+            half: FP16 입력 사용 여부
+        """
+        self.imgsz = imgsz
+        self.stride = stride
+        self.auto = auto
+        self.device = torch.device(device)
+        self.dtype = torch.float16 if half else torch.float32
+        self.pin_memory = self.device.type == "cuda"
+
+        self.geometry: Dict[Tuple[int, int], tuple] = {}  # 입력 (h, w) -> (출력 (h, w), new_unpad, (top, left), ratio_pad)
+        self.buffers: Dict[Tuple[int, int], dict] = {}  # 출력 (h, w) -> 재사용 버퍼
+
+    def get_geometry(self, image: np.ndarray) -> tuple:
+        """입력 크기별 letterbox 기하 (처음 보는 크기만 letterbox로 계산)"""
+        shape = image.shape[:2]
+        if shape not in self.geometry:
+            im, ratio, (dw, dh) = letterbox(image, self.imgsz, stride=self.stride, auto=self.auto)
+            r = ratio[0]
+            new_unpad = int(round(shape[1] * r)), int(round(shape[0] * r))
+            top, left = int(round(dh - 0.1)), int(round(dw - 0.1))
+            self.geometry[shape] = (im.shape[:2], new_unpad, (top, left), (ratio, (dw, dh)))
+        return self.geometry[shape]
+
+    def get_buffers(self, out_shape: Tuple[int, int], batch_size: int) -> dict:
+        """출력 크기별 버퍼 (배치 용량이 부족할 때만 다시 할당)"""
+        buf = self.buffers.get(out_shape)
+        if buf is None or buf['capacity'] < batch_size:
+            h, w = out_shape
+            host = torch.full((batch_size, h, w, 3), PAD_COLOR, dtype=torch.uint8, pin_memory=self.pin_memory)
+            buf = {
+                'capacity': batch_size,
+                'host': host,
+                'host_np': host.numpy(),  # 같은 메모리를 cv2가 쓰는 numpy 뷰
+                'device_u8': host if self.device.type == "cpu" else torch.empty_like(host, device=self.device),
+                'input': torch.empty((batch_size, 3, h, w), dtype=self.dtype, device=self.device),
+                'slot_shapes': [None] * batch_size,  # 슬롯별 마지막 입력 크기 (패딩 영역 재초기화 판단용)
+            }
+            self.buffers[out_shape] = buf
+            logger.info(f"전처리 버퍼 할당 - {batch_size}x3x{h}x{w} ({self.dtype}, {self.device})")
+        return buf
+
+    def __call__(self, images: Sequence[np.ndarray]) -> Tuple[torch.Tensor, List[tuple]]:
+        """
+        BGR 이미지 목록을 모델 입력 배치로 변환
+
+        Returns:
+            (입력 텐서 (n, 3, h, w) - 내부 버퍼의 뷰이므로 다음 호출 전까지만 유효,
+             이미지별 scale_boxes용 ratio_pad 목록)
+        """
+        geometries = [self.get_geometry(im) for im in images]
+        out_shape = geometries[0][0]
+        if any(g[0] != out_shape for g in geometries):
+            raise ValueError("배치 내 이미지의 letterbox 출력 크기가 다릅니다 (auto=False 사용)")
+
+        n = len(images)
+        buf = self.get_buffers(out_shape, n)
+        host_np = buf['host_np']
+        for i, (image, (_, new_unpad, (top, left), _)) in enumerate(zip(images, geometries)):
+            shape = image.shape[:2]
+            if buf['slot_shapes'][i] != shape:
+                host_np[i].fill(PAD_COLOR)  # 입력 크기가 바뀌면 이전 이미지가 패딩 영역에 남지 않도록 초기화
+                buf['slot_shapes'][i] = shape
+            w, h = new_unpad
+            cv2.resize(image, new_unpad, dst=host_np[i, top:top + h, left:left + w], interpolation=cv2.INTER_LINEAR)
+
+        u8 = buf['device_u8'][:n]
+        if u8.data_ptr() != buf['host'].data_ptr():
+            u8.copy_(buf['host'][:n], non_blocking=True)
+
+        im = buf['input'][:n]
+        for c in range(3):  # HWC to CHW, BGR to RGB
+            im[:, c].copy_(u8[..., 2 - c])
+        im.div_(255)  # 0 - 255 to 0.0 - 1.0
+        return im, [g[3] for g in geometries]
@@ -3,7 +3,8 @@ import json
 import cv2
 import csv
 import numpy as np
-from shapely.geometry import box, Polygon
+from shapely.geometry import Polygon
+from slot_occupancy import SlotGeometry
 
 # ✅ 경로 설정
 IMAGE_PATH = r"C:\Users\wecha\project\yolov5\custom_dataset\images\train\Sanggyeonggwan_c3_1.JPG"
@@ -61,21 +62,12 @@ with open(YOLO_LABEL_PATH, 'r') as f:
         y2 = y_center + height / 2
         bboxes.append((x1, y1, x2, y2))
 
-# ✅ IoU 계산 함수
-def calculate_iou(bbox, roi_coords):
-    bbox_poly = box(*bbox)
-    roi_poly = Polygon(roi_coords)
-    if not bbox_poly.intersects(roi_poly):
-        return 0.0
-    return bbox_poly.intersection(roi_poly).area / bbox_poly.union(roi_poly).area
-
-# ✅ Occupied / Free 판단
+# ✅ Occupied / Free 판단 (박스 x 슬롯 IoU 행렬을 한 번에 계산)
+geometry = SlotGeometry(filtered_roi_list)
+max_iou, _ = geometry.max_iou(np.array(bboxes))
 results = []
-for roi in filtered_roi_list:
-    slot_id = roi["slot_id"]
-    coords = roi["coords"]
-    max_iou = max([calculate_iou(bbox, coords) for bbox in bboxes], default=0.0)
-    status = 'occupied' if max_iou >= 0.1 else 'free'
+for slot_id, coords, iou in zip(geometry.slot_ids, geometry.coords, max_iou):
+    status = 'occupied' if iou >= 0.1 else 'free'
     results.append((slot_id, status, coords))
 
 # ✅ CSV 저장
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+로컬 백엔드 대역 서버 (퍼블리셔 검증/벤치마크용)
+HTTP/1.1 keep-alive로 주차 슬롯 API를 흉내 내고 받은 요청을 기록
+
+Usage:
+    $ python mock_backend.py --port 8080 --latency-ms 5
+    $ python mock_backend.py --port 8080 --no-bulk
+    $ python mock_backend.py --port 8080 --latency-ms 500 --failure-rate 0.3
+"""
+
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class MockBackendHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True  # 헤더/본문 분할 전송 시 Nagle + delayed ACK 40ms 지연 방지
+
+    def log_message(self, format, *args):
+        """요청마다 stderr 로그를 남기지 않음"""
+
+    def reply(self, status: int, body: dict = None):
+        data = json.dumps(body or {}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def handle_request(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server
+        if server.latency_s:
+            time.sleep(server.latency_s)
+        if server.down or random.random() < server.failure_rate:
+            with server.lock:
+                server.failures += 1
+            return self.reply(503, {'error': 'unavailable'})
+
+        if self.path == "/parking-slots/bulk" and not server.bulk:
+            return self.reply(404, {'error': 'not found'})
+        if self.path not in ("/parking-slots", "/parking-slots/bulk", "/parking-lots/occupancy"):
+            return self.reply(404, {'error': 'not found'})
+
+        with server.lock:
+            server.requests.append((self.command, self.path, payload))
+            server.connections.add(self.client_address)
+        self.reply(200, {'status': 'ok'})
+
+    do_PUT = handle_request
+    do_POST = handle_request
+
+
+class MockBackend(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0, bulk: bool = True,
+                 failure_rate: float = 0.0):
+        """
+        대역 서버 생성 (port=0이면 빈 포트 자동 선택)
+
+        Args:
+            latency_ms: 요청마다 추가할 응답 지연 (ms)
+            bulk: /parking-slots/bulk 지원 여부 (False면 404)
+            failure_rate: 무작위로 503을 반환할 확률
+        """
+        super().__init__((host, port), MockBackendHandler)
+        self.latency_s = latency_ms / 1000
+        self.bulk = bulk
+        self.failure_rate = failure_rate
+        self.down = False  # True면 모든 요청에 503 (장애 흉내)
+        self.failures = 0
+        self.lock = threading.Lock()
+        self.requests = []  # (method, path, payload)
+        self.connections = set()  # 요청을 보낸 클라이언트 (host, port) = TCP 연결
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockBackend":
+        """백그라운드 스레드에서 서버 시작"""
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """서버 종료"""
+        self.shutdown()
+        self.server_close()
+
+    def reset(self):
+        """기록된 요청 초기화"""
+        with self.lock:
+            self.requests.clear()
+            self.connections.clear()
+            self.failures = 0
+
+
+def main():
+    """메인 함수"""
+    parser = argparse.ArgumentParser(description="주차 슬롯 백엔드 대역 서버")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="바인드 주소")
+    parser.add_argument("--port", type=int, default=8080, help="포트")
+    parser.add_argument("--latency-ms", type=float, default=0, help="요청별 응답 지연 (ms)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="무작위 503 응답 확률")
+    parser.add_argument("--no-bulk", action="store_true", help="일괄 엔드포인트 비활성화 (슬롯별 API만)")
+    opt = parser.parse_args()
+
+    server = MockBackend(opt.host, opt.port, opt.latency_ms, bulk=not opt.no_bulk, failure_rate=opt.failure_rate)
+    logger.info(f"대역 서버 시작: {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info(f"종료 - 받은 요청 {len(server.requests)}건")
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+점유 이력 분석 (시간별/일별 슬롯 이용률, 회전수, 평균 체류 시간, 피크 점유 구간)
+OccupancyStore에 주기 결과가 append될 때마다 직전 샘플과의 구간만 집계 테이블에 더해, 조회 시 이력을 다시 읽지 않음
+
+- 슬롯 상태는 다음 샘플까지 유지된 것으로 보고 (간격이 max_gap_seconds를 넘으면 수집 중단으로 보고 집계에서 제외)
+  구간 길이를 시간(UTC 정시)/일(로컬 자정) 버킷에 나눠 더함
+- 회전수 = free → occupied 전환 수, 체류 시간 = occupied로 바뀐 샘플부터 free로 바뀐 샘플까지
+  (첫 샘플이나 수집 중단 직후부터 점유 중이던 세션은 시작 시각을 모르므로 체류 시간에서 제외)
+- 피크 = 버킷 안에서 점유 수가 가장 많았던 샘플 (시각 포함)
+- 여러 샘플을 한 번에 처리하는 벡터 연산이라 rebuild()로 기존 이력 전체를 다시 집계할 때도 같은 경로 사용
+- 이미 저장된 시각 이전(같은 시각 포함)의 샘플은 더하지 않고 해당 주차장 집계를 다시 생성 (재실행해도 중복 집계 없음)
+
+Usage:
+    $ python occupancy_analytics.py lot --db occupancy_history.db --lot sanggyeonggwan --period hour --start 2025-06-01
+    $ python occupancy_analytics.py slots --db occupancy_history.db --lot sanggyeonggwan --period day
+    $ python occupancy_analytics.py peaks --db occupancy_history.db --lot sanggyeonggwan --top 5
+    $ python occupancy_analytics.py rebuild --db occupancy_history.db
+"""
+
+import argparse
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from occupancy_store import OccupancyStore, to_epoch
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ('hour', 'day')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS slot_stats (
+    lot_id TEXT NOT NULL,
+    period TEXT NOT NULL,
+    bucket REAL NOT NULL,
+    slot_id TEXT NOT NULL,
+    occupied_s REAL NOT NULL,
+    observed_s REAL NOT NULL,
+    arrivals INTEGER NOT NULL,
+    departures INTEGER NOT NULL,
+    dwell_s REAL NOT NULL,
+    dwell_n INTEGER NOT NULL,
+    PRIMARY KEY (lot_id, period, bucket, slot_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS lot_stats (
+    lot_id TEXT NOT NULL,
+    period TEXT NOT NULL,
+    bucket REAL NOT NULL,
+    occupied_s REAL NOT NULL,
+    observed_s REAL NOT NULL,
+    arrivals INTEGER NOT NULL,
+    departures INTEGER NOT NULL,
+    dwell_s REAL NOT NULL,
+    dwell_n INTEGER NOT NULL,
+    samples INTEGER NOT NULL,
+    peak_occupied INTEGER NOT NULL,
+    peak_total INTEGER NOT NULL,
+    peak_ts REAL NOT NULL,
+    PRIMARY KEY (lot_id, period, bucket)
+) WITHOUT ROWID;
+"""
+
+# 집계 행은 기존 값에 더함 (피크는 더 큰 값만 반영)
+SLOT_UPSERT = """
+INSERT INTO slot_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (lot_id, period, bucket, slot_id) DO UPDATE SET
+    occupied_s = occupied_s + excluded.occupied_s, observed_s = observed_s + excluded.observed_s,
+    arrivals = arrivals + excluded.arrivals, departures = departures + excluded.departures,
+    dwell_s = dwell_s + excluded.dwell_s, dwell_n = dwell_n + excluded.dwell_n
+"""
+LOT_UPSERT = """
+INSERT INTO lot_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (lot_id, period, bucket) DO UPDATE SET
+    occupied_s = occupied_s + excluded.occupied_s, observed_s = observed_s + excluded.observed_s,
+    arrivals = arrivals + excluded.arrivals, departures = departures + excluded.departures,
+    dwell_s = dwell_s + excluded.dwell_s, dwell_n = dwell_n + excluded.dwell_n, samples = samples + excluded.samples,
+    peak_ts = CASE WHEN excluded.peak_occupied > peak_occupied THEN excluded.peak_ts ELSE peak_ts END,
+    peak_total = CASE WHEN excluded.peak_occupied > peak_occupied THEN excluded.peak_total ELSE peak_total END,
+    peak_occupied = MAX(peak_occupied, excluded.peak_occupied)
+"""
+
+
+def bucket_starts(timestamps: np.ndarray, period: str) -> np.ndarray:
+    """epoch 초 → 버킷 시작 시각 ('hour': UTC 정시, 'day': 로컬 자정, 시간대/일광 절약 시간 반영)"""
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    if period == 'hour':
+        return np.floor(timestamps / 3600) * 3600
+    # 로컬 자정은 15분 단위로 고유한 시각만 변환 (30/45분 시간대 포함)
+    quarters, inverse = np.unique(np.floor(timestamps / 900) * 900, return_inverse=True)
+    days = np.array([datetime.fromtimestamp(q).replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+                     for q in quarters])
+    return days[inverse].reshape(timestamps.shape)
+
+
+def safe_ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    """num / den (den이 0이면 nan)"""
+    num = np.asarray(num, dtype=np.float64)
+    den = np.asarray(den, dtype=np.float64)
+    return np.divide(num, den, out=np.full(num.shape, np.nan), where=den > 0)
+
+
+class OccupancyAnalytics:
+    def __init__(self, store: OccupancyStore, max_gap_seconds: Optional[float] = None):
+        """
+        집계 테이블 준비 (OccupancyStore와 같은 SQLite 파일 사용)
+
+        Args:
+            store: OccupancyStore
+            max_gap_seconds: 한 샘플 상태를 유지된 것으로 볼 최대 간격 (None이면 store 설정, 1시간 이하)
+        """
+        self.store = store
+        self.conn = store.conn
+        self.max_gap_seconds = min(max_gap_seconds or store.max_gap_seconds, 3600)  # 구간은 버킷 경계를 최대 한 번 넘음
+        self.conn.executescript(SCHEMA)
+        self.state = {}  # 주차장 ID -> 마지막 샘플 {'slot_ids', 'ts', 'occupied', 'session_start'}
+        self.stale = set()  # 이미 저장된 시각 이전(같은 시각 포함)의 샘플이 들어와 rebuild가 필요한 주차장
+
+    def load_state(self, lot_id: str, before: float) -> Optional[Dict]:
+        """저장소에서 before 직전 샘플로 상태 복원 (재시작 후, 진행 중 세션의 시작 시각은 알 수 없음)"""
+        row = self.conn.execute(
+            "SELECT ts, slot_set, bits FROM samples WHERE lot_id = ? AND ts < ? ORDER BY ts DESC LIMIT 1",
+            (lot_id, before)).fetchone()
+        if row is None:
+            return None
+        slot_ids = self.store.get_slot_ids(row[1])
+        occupied = np.unpackbits(np.frombuffer(row[2], dtype=np.uint8), count=len(slot_ids),
+                                 bitorder='little').astype(bool)
+        return {'slot_ids': slot_ids, 'ts': row[0], 'occupied': occupied,
+                'session_start': np.full(len(slot_ids), np.nan)}
+
+    def has_stats(self, lot_id: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM lot_stats WHERE lot_id = ? LIMIT 1", (lot_id,)).fetchone() is not None
+
+    def update(self, lot_id: str, timestamp: float, slot_ids: Sequence[str], occupied: np.ndarray,
+               newest: Optional[float] = None):
+        """
+        새 샘플 하나를 집계에 반영 (OccupancyStore.append가 같은 트랜잭션 안에서 호출)
+        이 주차장의 집계가 아직 없고 이전 이력이 있으면 이력 전체를 한 번 집계
+
+        Args:
+            newest: append 전 이 주차장의 가장 늦은 저장 시각 - 이보다 늦지 않은 샘플(같은 시각을 다시 넣는 재실행,
+                과거 시각)은 더하면 중복 집계되므로 rebuild 대상으로 표시하고 다음 시간순 샘플에서 다시 집계
+        """
+        if newest is not None and timestamp <= newest:
+            self.mark_stale(lot_id, f"{timestamp} <= {newest}")
+            return
+        if lot_id in self.stale:
+            self.rebuild(lot_id)  # 방금 append한 샘플 포함
+            return
+        if lot_id not in self.state:
+            state = self.load_state(lot_id, timestamp)
+            if state is not None and not self.has_stats(lot_id):
+                self.rebuild(lot_id)  # 방금 append한 샘플 포함
+                return
+            if state is not None:
+                self.state[lot_id] = state
+        state = self.state.get(lot_id)
+        if state is not None and timestamp <= state['ts']:
+            self.mark_stale(lot_id, f"{timestamp} <= {state['ts']}")
+            return
+        self.accumulate(lot_id, list(slot_ids), np.array([timestamp], dtype=np.float64),
+                        np.asarray(occupied, dtype=bool)[None])
+
+    def mark_stale(self, lot_id: str, reason: str):
+        """집계에 반영하지 않은 샘플이 있는 주차장 표시 (다음 시간순 샘플, rebuild, 저장소 close 때 다시 집계)"""
+        if lot_id not in self.stale:
+            logger.warning(f"[{lot_id}] 이미 저장된 시각 이전의 샘플 ({reason}), 집계에 더하지 않고 다시 생성 예정")
+        self.stale.add(lot_id)
+
+    def accumulate(self, lot_id: str, slot_ids: List[str], timestamps: np.ndarray, occupied: np.ndarray):
+        """
+        시간순 샘플 (T,) x (T, S)를 집계 테이블에 더하고 마지막 샘플을 상태로 보관
+
+        슬롯 목록이 이전 상태와 같으면 이전 마지막 샘플부터 이어서 계산, 다르면(ROI 변경) 새로 시작
+        """
+        state = self.state.get(lot_id)
+        if state is not None and state['slot_ids'] == slot_ids:
+            ts = np.concatenate(([state['ts']], timestamps))
+            occ = np.vstack((state['occupied'][None], occupied))
+            start0, first_new = state['session_start'], 1
+        else:
+            ts, occ = timestamps, occupied
+            start0, first_new = np.full(len(slot_ids), np.nan), 0
+        n, num_slots = occ.shape
+        steps = np.arange(n)
+
+        # 샘플 간 구간 (수집 중단 구간은 제외) 과 구간 끝의 전환
+        gaps = np.diff(ts)
+        valid = (gaps > 0) & (gaps <= self.max_gap_seconds)
+        arrivals = np.zeros_like(occ)
+        departures = np.zeros_like(occ)
+        arrivals[1:] = valid[:, None] & ~occ[:-1] & occ[1:]
+        departures[1:] = valid[:, None] & occ[:-1] & ~occ[1:]
+
+        # 샘플별 진행 중 세션 시작 시각: 마지막 도착/재시작 지점을 앞으로 채움 (재시작 지점은 시작 시각 모름)
+        marker = arrivals.copy()
+        marker[0] = True
+        marker[1:] |= ~valid[:, None]
+        start_val = np.where(arrivals, ts[:, None], np.nan)
+        start_val[0] = start0
+        last_marker = np.maximum.accumulate(np.where(marker, steps[:, None], 0), axis=0)
+        session_start = np.take_along_axis(start_val, last_marker, axis=0)
+        dwell = np.zeros(occ.shape)
+        dwell[1:] = ts[1:, None] - session_start[:-1]
+        counted = departures & np.isfinite(dwell)
+        dwell = np.where(counted, dwell, 0.0)
+
+        a, b, held = ts[:-1][valid], ts[1:][valid], occ[:-1][valid]
+        new = steps >= first_new
+        n_occupied = occ[new].sum(1)
+        slot_rows, lot_rows = [], []
+        for period in PERIODS:
+            sample_bucket = bucket_starts(ts, period)
+            start_bucket, end_bucket = sample_bucket[:-1][valid], sample_bucket[1:][valid]
+            # 구간이 버킷 경계를 넘으면 경계에서 나눔 (끝 샘플이 정확히 경계면 나누지 않음)
+            end_bucket = np.where(b > end_bucket, end_bucket, bucket_starts(np.nextafter(b, a), period))
+            split = np.where(end_bucket > start_bucket, end_bucket, b)
+
+            buckets, inverse = np.unique(np.concatenate((start_bucket, end_bucket, sample_bucket)), return_inverse=True)
+            in_start, in_end = inverse[:len(a)], inverse[len(a):2 * len(a)]
+            in_sample = inverse[2 * len(a):]
+            occupied_s = np.zeros((len(buckets), num_slots))
+            observed_s = np.zeros(len(buckets))
+            for idx, length in ((in_start, split - a), (in_end, b - split)):
+                np.add.at(occupied_s, idx, held * length[:, None])
+                np.add.at(observed_s, idx, length)
+            counts = {}
+            for name, values in (('arrivals', arrivals), ('departures', departures), ('dwell_n', counted),
+                                 ('dwell_s', dwell)):
+                counts[name] = np.zeros((len(buckets), num_slots))
+                np.add.at(counts[name], in_sample, values)
+
+            # 슬롯별 행: 관측 시간이나 이벤트가 있는 (버킷, 슬롯)만
+            touched = (occupied_s > 0) | (observed_s[:, None] > 0) | (counts['arrivals'] > 0) | (counts['departures'] > 0)
+            for i, s in zip(*np.nonzero(touched)):
+                slot_rows.append((lot_id, period, buckets[i], slot_ids[s], occupied_s[i, s], observed_s[i],
+                                  int(counts['arrivals'][i, s]), int(counts['departures'][i, s]),
+                                  counts['dwell_s'][i, s], int(counts['dwell_n'][i, s])))
+
+            # 주차장 행: 슬롯 합계 + 새 샘플 기준 피크
+            new_bucket = in_sample[new]
+            for i in np.unique(np.concatenate((in_start, in_end, new_bucket))):
+                mine = np.flatnonzero(new_bucket == i)
+                peak = mine[np.argmax(n_occupied[mine])] if len(mine) else None
+                lot_rows.append((lot_id, period, buckets[i], occupied_s[i].sum(), observed_s[i] * num_slots,
+                                 int(counts['arrivals'][i].sum()), int(counts['departures'][i].sum()),
+                                 counts['dwell_s'][i].sum(), int(counts['dwell_n'][i].sum()), len(mine),
+                                 int(n_occupied[peak]) if peak is not None else -1, num_slots,
+                                 ts[first_new + peak] if peak is not None else 0.0))
+        self.conn.executemany(SLOT_UPSERT, slot_rows)
+        self.conn.executemany(LOT_UPSERT, lot_rows)
+
+        self.state[lot_id] = {'slot_ids': slot_ids, 'ts': ts[-1], 'occupied': occ[-1].copy(),
+                              'session_start': np.where(occ[-1], session_start[-1], np.nan)}
+
+    def rebuild(self, lot_id: Optional[str] = None, chunk: int = 4096):
+        """저장된 이력 전체로 집계 테이블 다시 생성 (lot_id가 None이면 모든 주차장)"""
+        for lot in [lot_id] if lot_id is not None else self.store.lots():
+            self.conn.execute("DELETE FROM slot_stats WHERE lot_id = ?", (lot,))
+            self.conn.execute("DELETE FROM lot_stats WHERE lot_id = ?", (lot,))
+            self.state.pop(lot, None)
+            self.stale.discard(lot)
+            samples = 0
+            for slot_ids, timestamps, occupied in self.store.runs(lot, chunk=chunk):
+                self.accumulate(lot, slot_ids, timestamps, occupied)
+                samples += len(timestamps)
+            logger.info(f"[{lot}] 점유 이력 집계 재생성 - 샘플 {samples}개")
+
+    def lot_stats(self, lot_id: str, period: str = 'hour', start=None, end=None) -> Dict:
+        """
+        버킷별 주차장 전체 지표 (버킷 시작 시각이 [start, end)인 버킷)
+
+        Returns:
+            {'buckets', 'utilization', 'turnover', 'avg_dwell_seconds', 'peak_occupied', 'peak_rate', 'peak_ts',
+             'samples'} - 각각 (B,) 배열, 이용률은 0-1 (관측 시간이 없으면 nan)
+        """
+        rows = self.conn.execute(
+            "SELECT bucket, occupied_s, observed_s, arrivals, dwell_s, dwell_n, peak_occupied, peak_total, peak_ts, "
+            "samples FROM lot_stats WHERE lot_id = ? AND period = ? AND bucket >= ? AND bucket < ? ORDER BY bucket",
+            self.range_args(lot_id, period, start, end)).fetchall()
+        data = np.asarray(rows, dtype=np.float64).reshape(-1, 10)
+        peak = np.where(data[:, 6] >= 0, data[:, 6], np.nan)
+        return {
+            'buckets': data[:, 0],
+            'utilization': safe_ratio(data[:, 1], data[:, 2]),
+            'turnover': data[:, 3].astype(np.int64),
+            'avg_dwell_seconds': safe_ratio(data[:, 4], data[:, 5]),
+            'peak_occupied': peak,
+            'peak_rate': safe_ratio(peak, data[:, 7]),
+            'peak_ts': np.where(data[:, 6] >= 0, data[:, 8], np.nan),
+            'samples': data[:, 9].astype(np.int64)
+        }
+
+    def slot_stats(self, lot_id: str, period: str = 'hour', start=None, end=None) -> Dict:
+        """
+        버킷 x 슬롯 지표 행렬
+
+        Returns:
+            {'buckets': (B,), 'slot_ids': [S], 'utilization': (B, S), 'turnover': (B, S), 'avg_dwell_seconds': (B, S)}
+        """
+        rows = self.conn.execute(
+            "SELECT bucket, slot_id, occupied_s, observed_s, arrivals, dwell_s, dwell_n FROM slot_stats "
+            "WHERE lot_id = ? AND period = ? AND bucket >= ? AND bucket < ? ORDER BY bucket",
+            self.range_args(lot_id, period, start, end)).fetchall()
+        slot_ids = list(dict.fromkeys(row[1] for row in rows))
+        column = {slot_id: i for i, slot_id in enumerate(slot_ids)}
+        buckets, row_idx = np.unique(np.array([row[0] for row in rows], dtype=np.float64), return_inverse=True)
+        col_idx = np.array([column[row[1]] for row in rows], dtype=np.int64)
+        values = np.array([row[2:] for row in rows], dtype=np.float64).reshape(-1, 5)
+        grid = np.zeros((5, len(buckets), len(slot_ids)))
+        grid[:, row_idx, col_idx] = values.T
+        return {
+            'buckets': buckets,
+            'slot_ids': slot_ids,
+            'utilization': safe_ratio(grid[0], grid[1]),
+            'turnover': grid[2].astype(np.int64),
+            'avg_dwell_seconds': safe_ratio(grid[3], grid[4])
+        }
+
+    def slot_summary(self, lot_id: str, start=None, end=None, period: str = 'day') -> Dict[str, Dict]:
+        """구간 전체의 슬롯별 이용률 / 회전수 / 평균 체류 시간 (period 버킷 단위로 구간 선택)"""
+        rows = self.conn.execute(
+            "SELECT slot_id, SUM(occupied_s), SUM(observed_s), SUM(arrivals), SUM(dwell_s), SUM(dwell_n) "
+            "FROM slot_stats WHERE lot_id = ? AND period = ? AND bucket >= ? AND bucket < ? GROUP BY slot_id",
+            self.range_args(lot_id, period, start, end)).fetchall()
+        return {
+            slot_id: {
+                'utilization': round(occupied / observed, 4) if observed else None,
+                'turnover': int(arrivals),
+                'avg_dwell_seconds': round(dwell / dwell_n, 1) if dwell_n else None
+            }
+            for slot_id, occupied, observed, arrivals, dwell, dwell_n in rows
+        }
+
+    def peak_windows(self, lot_id: str, start=None, end=None, period: str = 'hour', top: int = 5) -> List[Dict]:
+        """평균 점유율이 가장 높았던 버킷 top개 (버킷 내 최대 점유 시각 포함)"""
+        rows = self.conn.execute(
+            "SELECT bucket, occupied_s / observed_s AS rate, peak_occupied, peak_total, peak_ts FROM lot_stats "
+            "WHERE lot_id = ? AND period = ? AND bucket >= ? AND bucket < ? AND observed_s > 0 "
+            "ORDER BY rate DESC LIMIT ?", self.range_args(lot_id, period, start, end) + (top,)).fetchall()
+        return [{
+            'start': datetime.fromtimestamp(bucket).isoformat(),
+            'utilization': round(rate, 4),
+            'peak_occupied': peak if peak >= 0 else None,
+            'peak_total': total,
+            'peak_time': datetime.fromtimestamp(peak_ts).isoformat() if peak >= 0 else None
+        } for bucket, rate, peak, total, peak_ts in rows]
+
+    def range_args(self, lot_id: str, period: str, start, end) -> tuple:
+        if period not in PERIODS:
+            raise ValueError(f"period는 {PERIODS} 중 하나여야 합니다: {period}")
+        return lot_id, period, to_epoch(start, float("-inf")), to_epoch(end, float("inf"))
+
+
+def main():
+    """메인 함수 (집계 조회 / 재생성)"""
+    import json
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="주차장 점유 이력 분석")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("lot", help="버킷별 주차장 이용률 / 회전수 / 평균 체류 시간 / 피크")
+    sub.add_parser("slots", help="구간 전체의 슬롯별 이용률 / 회전수 / 평균 체류 시간")
+    p = sub.add_parser("peaks", help="평균 점유율이 가장 높았던 버킷")
+    p.add_argument("--top", type=int, default=5, help="출력할 버킷 수")
+    sub.add_parser("rebuild", help="저장된 이력으로 집계 다시 생성")
+    for p in sub.choices.values():
+        p.add_argument("--db", type=str, default="occupancy_history.db", help="저장소 경로")
+        p.add_argument("--lot", type=str, default=None, help="주차장 ID (rebuild는 생략 시 전체)")
+        p.add_argument("--period", type=str, default="hour", choices=PERIODS, help="집계 단위")
+        p.add_argument("--start", type=str, default=None, help="시작 시각 (ISO 형식)")
+        p.add_argument("--end", type=str, default=None, help="끝 시각 (ISO 형식, 미포함)")
+    opt = parser.parse_args()
+
+    store = OccupancyStore(opt.db, analytics=True)
+    if opt.command == "rebuild":
+        with store.lock, store.conn:
+            store.analytics.rebuild(opt.lot)
+    elif opt.lot is None:
+        parser.error("--lot이 필요합니다")
+    elif opt.command == "lot":
+        stats = store.analytics.lot_stats(opt.lot, opt.period, opt.start, opt.end)
+        for i, bucket in enumerate(stats['buckets']):
+            print(f"{datetime.fromtimestamp(bucket).isoformat()}  이용률 {stats['utilization'][i] * 100:5.1f}%  "
+                  f"회전 {stats['turnover'][i]:4d}  평균 체류 {stats['avg_dwell_seconds'][i] / 60:6.1f}분  "
+                  f"피크 {stats['peak_rate'][i] * 100:5.1f}%")
+    elif opt.command == "slots":
+        print(json.dumps(store.analytics.slot_summary(opt.lot, opt.start, opt.end, opt.period),
+                         ensure_ascii=False, indent=2))
+    else:
+        print(json.dumps(store.analytics.peak_windows(opt.lot, opt.start, opt.end, opt.period, opt.top),
+                         ensure_ascii=False, indent=2))
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+주차 슬롯 점유 시계열 저장소 (SQLite, 주기마다 JSON 파일 하나씩 쓰는 대신)
+시각별 슬롯 상태를 비트 패킹(np.packbits)한 BLOB 한 행으로 append하고, 슬롯 ID 목록은 ROI가 바뀔 때만 한 번 저장
+
+- samples: (lot_id, ts) 기본 키 (WITHOUT ROWID)로 시간 범위 조회가 인덱스 범위 스캔이 되며 점유 수는 별도 컬럼이라 비트를 풀지 않고 조회
+- slot_sets: 주차장별 슬롯 ID 목록 (비트 위치 = 목록 순서), 같은 목록은 재사용
+- 슬롯별 이용률은 구간의 비트 배열을 한 번에 unpackbits 후 샘플 간격(최대 max_gap_seconds)으로 가중 평균
+
+Usage:
+    $ python occupancy_store.py import --db occupancy_history.db --lot sanggyeonggwan occupancy_result_*.json
+    $ python occupancy_store.py query --db occupancy_history.db --lot sanggyeonggwan --start 2025-06-01 --end 2025-06-02
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+Timestamp = Union[datetime, float, int, str]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS slot_sets (
+    id INTEGER PRIMARY KEY,
+    lot_id TEXT NOT NULL,
+    digest TEXT NOT NULL UNIQUE,
+    slot_ids TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS samples (
+    lot_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    slot_set INTEGER NOT NULL REFERENCES slot_sets(id),
+    n_occupied INTEGER NOT NULL,
+    n_slots INTEGER NOT NULL,
+    bits BLOB NOT NULL,
+    PRIMARY KEY (lot_id, ts)
+) WITHOUT ROWID;
+"""
+
+
+def to_epoch(value: Optional[Timestamp], default: float) -> float:
+    """datetime / ISO 문자열 / epoch 초를 epoch 초로 (None이면 default)"""
+    if value is None:
+        return default
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+
+class OccupancyStore:
+    def __init__(self, path: str = "occupancy_history.db", max_gap_seconds: float = 3600, analytics: bool = False):
+        """
+        시계열 저장소 열기 (없으면 생성)
+
+        Args:
+            path: SQLite 파일 경로
+            max_gap_seconds: 이용률 계산 시 한 샘플이 대표하는 최대 시간 (수집 중단 구간이 과대 반영되지 않도록)
+            analytics: True면 append마다 시간별/일별 집계(occupancy_analytics.OccupancyAnalytics)도 갱신
+        """
+        self.path = path
+        self.max_gap_seconds = max_gap_seconds
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")  # 쓰는 동안에도 조회 가능
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.slot_set_ids = {}  # digest -> slot_sets.id
+        self.slot_set_cache = {}  # slot_sets.id -> 슬롯 ID 목록
+        self.analytics = None
+        if analytics:
+            from occupancy_analytics import OccupancyAnalytics  # occupancy_analytics가 이 모듈을 import
+            self.analytics = OccupancyAnalytics(self)
+
+    def slot_set_id(self, lot_id: str, slot_ids: Sequence[str]) -> int:
+        """슬롯 ID 목록의 slot_sets.id (처음 보는 목록이면 저장, lock 보유 상태에서 호출)"""
+        text = json.dumps(list(slot_ids), ensure_ascii=False)
+        digest = hashlib.sha1(f"{lot_id}\n{text}".encode()).hexdigest()
+        if digest not in self.slot_set_ids:
+            self.conn.execute("INSERT OR IGNORE INTO slot_sets (lot_id, digest, slot_ids) VALUES (?, ?, ?)",
+                              (lot_id, digest, text))
+            self.slot_set_ids[digest] = self.conn.execute(
+                "SELECT id FROM slot_sets WHERE digest = ?", (digest,)).fetchone()[0]
+        return self.slot_set_ids[digest]
+
+    def get_slot_ids(self, slot_set: int) -> List[str]:
+        """slot_sets.id의 슬롯 ID 목록"""
+        if slot_set not in self.slot_set_cache:
+            row = self.conn.execute("SELECT slot_ids FROM slot_sets WHERE id = ?", (slot_set,)).fetchone()
+            self.slot_set_cache[slot_set] = json.loads(row[0])
+        return self.slot_set_cache[slot_set]
+
+    def append(self, lot_id: str, timestamp: Timestamp, slot_ids: Sequence[str], occupied: Sequence[bool]):
+        """한 시각의 슬롯 상태 저장 (같은 시각이 이미 있으면 덮어씀)"""
+        occupied = np.asarray(occupied, dtype=bool)
+        ts = to_epoch(timestamp, 0.0)
+        bits = np.packbits(occupied, bitorder='little').tobytes()
+        with self.lock, self.conn:
+            slot_set = self.slot_set_id(lot_id, slot_ids)
+            newest = self.last_timestamp(lot_id) if self.analytics is not None else None
+            self.conn.execute("INSERT OR REPLACE INTO samples VALUES (?, ?, ?, ?, ?, ?)",
+                              (lot_id, ts, slot_set, int(occupied.sum()), len(occupied), bits))
+            if self.analytics is not None:
+                self.analytics.update(lot_id, ts, slot_ids, occupied, newest)
+
+    def append_slot_status(self, lot_id: str, timestamp: Timestamp, slot_status: List[Dict], key: str = 'occupied'):
+        """분석기 slot_status 목록 저장 (key: 'occupied' 또는 ParkingAnalysisSystem의 'is_available')"""
+        occupied = [slot[key] for slot in slot_status]
+        if key == 'is_available':
+            occupied = [not value for value in occupied]
+        self.append(lot_id, timestamp, [slot['slot_id'] for slot in slot_status], occupied)
+
+    def last_timestamp(self, lot_id: str) -> Optional[float]:
+        """이 주차장의 가장 늦은 저장 시각 (epoch 초, 이력이 없으면 None)"""
+        return self.conn.execute("SELECT MAX(ts) FROM samples WHERE lot_id = ?", (lot_id,)).fetchone()[0]
+
+    def lots(self) -> List[str]:
+        """저장된 주차장 ID 목록"""
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT lot_id FROM samples ORDER BY lot_id")]
+
+    def occupancy(self, lot_id: str, start: Optional[Timestamp] = None, end: Optional[Timestamp] = None) -> Dict:
+        """
+        구간 [start, end)의 시각별 점유 수 (비트를 풀지 않음)
+
+        Returns:
+            {'timestamps': (T,) epoch 초, 'occupied': (T,), 'total': (T,), 'rate': (T,) 0-1}
+        """
+        rows = self.conn.execute(
+            "SELECT ts, n_occupied, n_slots FROM samples WHERE lot_id = ? AND ts >= ? AND ts < ? ORDER BY ts",
+            (lot_id, to_epoch(start, float("-inf")), to_epoch(end, float("inf")))).fetchall()
+        data = np.asarray(rows, dtype=np.float64).reshape(-1, 3)
+        total = data[:, 2].astype(np.int64)
+        return {
+            'timestamps': data[:, 0],
+            'occupied': data[:, 1].astype(np.int64),
+            'total': total,
+            'rate': np.divide(data[:, 1], total, out=np.zeros(len(data)), where=total > 0)
+        }
+
+    def states(self, lot_id: str, start: Optional[Timestamp] = None, end: Optional[Timestamp] = None) -> Dict:
+        """
+        구간 [start, end)의 시각 x 슬롯 상태 행렬 (ROI가 바뀐 구간은 슬롯 ID 합집합 기준)
+
+        Returns:
+            {'timestamps': (T,), 'slot_ids': [S], 'occupied': (T, S) bool, 'known': (T, S) bool (그 시각에 있던 슬롯)}
+        """
+        rows = self.conn.execute(
+            "SELECT ts, slot_set, bits FROM samples WHERE lot_id = ? AND ts >= ? AND ts < ? ORDER BY ts",
+            (lot_id, to_epoch(start, float("-inf")), to_epoch(end, float("inf")))).fetchall()
+        timestamps = np.array([row[0] for row in rows], dtype=np.float64)
+        sets = np.array([row[1] for row in rows], dtype=np.int64)
+
+        slot_ids, column = [], {}
+        for slot_set in dict.fromkeys(sets.tolist()):
+            for slot_id in self.get_slot_ids(slot_set):
+                if slot_id not in column:
+                    column[slot_id] = len(slot_ids)
+                    slot_ids.append(slot_id)
+
+        occupied = np.zeros((len(rows), len(slot_ids)), dtype=bool)
+        known = np.zeros_like(occupied)
+        for slot_set in dict.fromkeys(sets.tolist()):
+            # 같은 슬롯 목록의 행들은 한 번에 unpack
+            members = np.flatnonzero(sets == slot_set)
+            ids = self.get_slot_ids(slot_set)
+            packed = np.frombuffer(b"".join(rows[i][2] for i in members), dtype=np.uint8).reshape(len(members), -1)
+            cols = np.array([column[slot_id] for slot_id in ids], dtype=np.int64)
+            occupied[np.ix_(members, cols)] = np.unpackbits(packed, axis=1, count=len(ids), bitorder='little')
+            known[np.ix_(members, cols)] = True
+        return {'timestamps': timestamps, 'slot_ids': slot_ids, 'occupied': occupied, 'known': known}
+
+    def runs(self, lot_id: str, start: Optional[Timestamp] = None, end: Optional[Timestamp] = None,
+             chunk: int = 4096):
+        """구간 [start, end)를 슬롯 목록이 같은 연속 구간별로 (slot_ids, (T,) 시각, (T, S) 상태) 생성 (최대 chunk개씩)"""
+        cursor = self.conn.execute(
+            "SELECT ts, slot_set, bits FROM samples WHERE lot_id = ? AND ts >= ? AND ts < ? ORDER BY ts",
+            (lot_id, to_epoch(start, float("-inf")), to_epoch(end, float("inf"))))
+        batch = []
+
+        def emit():
+            ids = self.get_slot_ids(batch[0][1])
+            packed = np.frombuffer(b"".join(row[2] for row in batch), dtype=np.uint8).reshape(len(batch), -1)
+            return (ids, np.array([row[0] for row in batch], dtype=np.float64),
+                    np.unpackbits(packed, axis=1, count=len(ids), bitorder='little').astype(bool))
+
+        for row in cursor:
+            if batch and (row[1] != batch[0][1] or len(batch) >= chunk):
+                yield emit()
+                batch = []
+            batch.append(row)
+        if batch:
+            yield emit()
+
+    def sample_weights(self, timestamps: np.ndarray) -> np.ndarray:
+        """샘플별 대표 시간 (다음 샘플까지의 간격, 최대 max_gap_seconds, 마지막 샘플은 간격 중앙값)"""
+        if len(timestamps) == 0:
+            return np.zeros(0)
+        gaps = np.diff(timestamps)
+        last = np.median(gaps) if len(gaps) else self.max_gap_seconds
+        return np.minimum(np.append(gaps, last), self.max_gap_seconds)
+
+    def slot_utilization(self, lot_id: str, start: Optional[Timestamp] = None,
+                         end: Optional[Timestamp] = None) -> Dict[str, float]:
+        """구간 [start, end)의 슬롯별 이용률 (점유 시간 / 관측 시간, 0-1)"""
+        data = self.states(lot_id, start, end)
+        weights = self.sample_weights(data['timestamps'])[:, None]
+        observed = (weights * data['known']).sum(0)
+        busy = (weights * (data['occupied'] & data['known'])).sum(0)
+        utilization = np.divide(busy, observed, out=np.zeros_like(busy), where=observed > 0)
+        return dict(zip(data['slot_ids'], utilization.round(4).tolist()))
+
+    def import_json_results(self, lot_id: str, paths: Sequence[str]) -> int:
+        """기존 occupancy_result_*.json / analysis_results/result_*.json 파일을 저장소로 가져오기"""
+        count = 0
+        for path in sorted(paths):
+            with open(path, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+            status = result.get('slot_status', [])
+            if not status:
+                continue
+            key = 'occupied' if 'occupied' in status[0] else 'is_available'
+            self.append_slot_status(lot_id, result['timestamp'], status, key)
+            count += 1
+        logger.info(f"JSON 결과 {count}개를 저장소로 가져옴 - {self.path} ({lot_id})")
+        return count
+
+    def close(self):
+        """연결 닫기 (rebuild가 필요한 집계가 남아 있으면 먼저 다시 생성)"""
+        with self.lock:
+            if self.analytics is not None and self.analytics.stale:
+                with self.conn:
+                    for lot_id in list(self.analytics.stale):
+                        self.analytics.rebuild(lot_id)
+            self.conn.close()
+
+
+def main():
+    """메인 함수 (JSON 결과 가져오기 / 구간 조회)"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="주차 슬롯 점유 시계열 저장소")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("import", help="기존 JSON 결과 파일 가져오기")
+    p.add_argument("files", nargs="+", help="결과 JSON 파일 (glob 가능)")
+    p = sub.add_parser("query", help="구간 점유율 / 슬롯별 이용률 조회")
+    p.add_argument("--start", type=str, default=None, help="시작 시각 (ISO 형식)")
+    p.add_argument("--end", type=str, default=None, help="끝 시각 (ISO 형식, 미포함)")
+    for p in sub.choices.values():
+        p.add_argument("--db", type=str, default="occupancy_history.db", help="저장소 경로")
+        p.add_argument("--lot", type=str, default="sanggyeonggwan", help="주차장 ID")
+    opt = parser.parse_args()
+
+    store = OccupancyStore(opt.db)
+    if opt.command == "import":
+        store.import_json_results(opt.lot, [f for pattern in opt.files for f in glob.glob(pattern)])
+    else:
+        occupancy = store.occupancy(opt.lot, opt.start, opt.end)
+        if len(occupancy['timestamps']):
+            print(f"{opt.lot}: {len(occupancy['timestamps'])}개 샘플, 평균 점유율 {occupancy['rate'].mean() * 100:.1f}%, "
+                  f"최대 {occupancy['rate'].max() * 100:.1f}%")
+        for slot_id, utilization in store.slot_utilization(opt.lot, opt.start, opt.end).items():
+            print(f"  {slot_id}: {utilization * 100:.1f}%")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,6 @@
 import cv2
 import json
 import time
-import requests
 import numpy as np
 from datetime import datetime, timedelta
 import torch
@@ -15,8 +14,18 @@ from models.experimental import attempt_load
 from utils.general import non_max_suppression, scale_boxes
 # from utils.plots import plot_one_box  # 사용하지 않으므로 주석 처리
 import threading
+import itertools
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Tuple, Optional
+from frame_gate import FrameChangeGate
+from frame_preprocessor import LetterboxPreprocessor
+from occupancy_store import OccupancyStore
+from parking_publisher import PublishQueue, SlotStatusPublisher
+from roi_registry import RoiRegistry
+from vehicle_tracker import VehicleTracker
+from video_sampler import VideoFrameSampler, recording_start
 
 # 로깅 설정
 logging.basicConfig(
@@ -35,7 +44,16 @@ class ParkingAnalysisSystem:
                  roi_path: str = "roi_full_rect_coords.json",
                  model_path: str = "best_macos.pt",
                  backend_url: str = "http://localhost:8080",
-                 interval_minutes: int = 3):
+                 interval_minutes: int = 3,
+                 batch_size: int = 1,
+                 num_workers: int = 4,
+                 num_threads: Optional[int] = None,
+                 publish_mode: str = "auto",
+                 async_publish: bool = True,
+                 change_gate: bool = False,
+                 track_vehicles: bool = False,
+                 detect_every: int = 1,
+                 result_store=None):
         """
         주차장 분석 시스템 초기화
         
@@ -45,6 +63,15 @@ class ParkingAnalysisSystem:
             model_path: YOLO 모델 파일 경로
             backend_url: 백엔드 서버 URL
             interval_minutes: 프레임 추출 간격 (분)
+            batch_size: 한 번에 추론할 샘플 프레임 수 (1보다 크면 배치 모드)
+            num_workers: 배치 모드 슬롯 매칭 스레드 수
+            num_threads: torch intra-op 스레드 수 (None이면 기본값)
+            publish_mode: 백엔드 전송 방식 ('auto' | 'bulk' | 'per_slot')
+            async_publish: True면 백그라운드 전송 큐 사용 (분석 루프가 백엔드 응답을 기다리지 않음)
+            change_gate: True면 슬롯 영역이 마지막 추론 프레임과 같은 샘플은 추론 생략
+            track_vehicles: True면 샘플 사이에서 차량 ID를 추적해 차량별 체류 시간 기록
+            detect_every: N이면 N번째 샘플마다만 추론하고 사이 샘플은 트랙 예측 박스 사용 (순차 모드, 추적 자동 사용)
+            result_store: 결과 시계열 저장소 (SQLite 경로 또는 OccupancyStore, 있으면 샘플마다 결과 이미지/JSON을 쓰지 않음)
         """
         self.video_path = video_path
         self.roi_path = roi_path
@@ -52,25 +79,25 @@ class ParkingAnalysisSystem:
         self.backend_url = backend_url
         self.interval_minutes = interval_minutes
         self.interval_seconds = interval_minutes * 60
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        self.num_threads = num_threads
+        self.publisher = SlotStatusPublisher(backend_url, mode=publish_mode)
+        self.publish_queue = PublishQueue(self.publisher, owner="analysis_system") if async_publish else None
+        self.gate = FrameChangeGate() if change_gate else None
+        self.detect_every = max(detect_every, 1)
+        self.tracker = VehicleTracker() if track_vehicles or self.detect_every > 1 else None
+        self.parking_lot_id = 1  # 기본 주차장 ID
+        self.result_store = OccupancyStore(result_store, analytics=True) if isinstance(result_store, str) else result_store
         
         # 초기화
-        self.roi_data = self.load_roi_data()
+        self.roi = RoiRegistry.shared(roi_path)  # 검증/컴파일된 슬롯 배열 (파일이 바뀌면 자동으로 다시 로드)
         self.model = self.load_yolo_model()
+        self.preprocessor = None  # 모델 장치에 맞춰 지연 생성
         self.video_info = self.get_video_info()
         
         logger.info(f"시스템 초기화 완료 - 영상 길이: {self.video_info['duration_minutes']:.1f}분")
         
-    def load_roi_data(self) -> Dict:
-        """ROI 좌표 데이터 로드"""
-        try:
-            with open(self.roi_path, 'r', encoding='utf-8') as f:
-                roi_data = json.load(f)
-            logger.info(f"ROI 데이터 로드 완료 - {len(roi_data)}개 이미지의 슬롯 정보")
-            return roi_data
-        except Exception as e:
-            logger.error(f"ROI 데이터 로드 실패: {e}")
-            return {}
-    
     def load_yolo_model(self):
         """YOLO 모델 로드"""
         try:
@@ -83,6 +110,13 @@ class ParkingAnalysisSystem:
             logger.error(f"YOLO 모델 로드 실패: {e}")
             return None
     
+    def get_preprocessor(self) -> LetterboxPreprocessor:
+        """모델 장치에 맞춘 letterbox 전처리기 (버퍼 재사용을 위해 한 번만 생성)"""
+        device = next(self.model.parameters()).device
+        if self.preprocessor is None or self.preprocessor.device != device:
+            self.preprocessor = LetterboxPreprocessor(640, auto=False, device=device)
+        return self.preprocessor
+    
     def get_video_info(self) -> Dict:
         """영상 정보 가져오기"""
         cap = cv2.VideoCapture(self.video_path)
@@ -100,171 +134,129 @@ class ParkingAnalysisSystem:
             'fps': fps,
             'total_frames': total_frames,
             'duration_seconds': duration_seconds,
-            'duration_minutes': duration_minutes
+            'duration_minutes': duration_minutes,
+            'start_time': datetime.fromtimestamp(recording_start(self.video_path, duration_seconds))
         }
     
-    def extract_frame_at_time(self, target_seconds: float) -> Optional[np.ndarray]:
-        """지정된 시간에 해당하는 프레임 추출"""
-        cap = cv2.VideoCapture(self.video_path)
-        if not cap.isOpened():
-            logger.error("영상을 열 수 없습니다")
-            return None
-        
-        # 목표 시간에 해당하는 프레임 번호 계산
-        target_frame = int(target_seconds * self.video_info['fps'])
-        
-        # 해당 프레임으로 이동
-        cap.set(cv2.CAP_PROP_POS_FRAMES, target_frame)
-        ret, frame = cap.read()
-        cap.release()
-        
-        if ret:
-            logger.info(f"프레임 추출 완료 - 시간: {target_seconds:.1f}초")
-            return frame
-        else:
-            logger.error(f"프레임 추출 실패 - 시간: {target_seconds:.1f}초")
-            return None
-    
     def detect_vehicles(self, frame: np.ndarray) -> List[Dict]:
         """YOLO를 사용하여 차량 탐지 (YOLO 기본 구현과 동일)"""
+        return self.detect_vehicles_batch([frame])[0]
+    
+    def detect_vehicles_batch(self, frames: List[np.ndarray]) -> List[List[Dict]]:
+        """여러 프레임을 하나의 텐서 배치로 묶어 한 번에 YOLO 차량 탐지"""
         if self.model is None:
             logger.error("YOLO 모델이 로드되지 않았습니다")
-            return []
+            return [[] for _ in frames]
         
         try:
-            # 이미지 전처리 (YOLO 기본 구현과 동일)
-            img = cv2.resize(frame, (640, 640))
-            img = img.transpose((2, 0, 1))[::-1]  # HWC to CHW, BGR to RGB
-            img = np.ascontiguousarray(img)
-            img = torch.from_numpy(img).float()
-            img /= 255.0  # 0 - 255 to 0.0 - 1.0
-            if len(img.shape) == 3:
-                img = img[None]  # expand for batch dim
-            
-            # 모델과 같은 장치로 이동
-            device = next(self.model.parameters()).device
-            img = img.to(device)
+            # letterbox 전처리 (입력 크기별 기하/버퍼 재사용, 비율 유지 + 패딩)
+            img, ratio_pads = self.get_preprocessor()(frames)
             
             # 추론 (YOLO 기본 구현과 동일)
             with torch.no_grad():
                 pred = self.model(img, augment=False, visualize=False)
                 pred = non_max_suppression(pred, conf_thres=0.3, iou_thres=0.5, max_det=1000)
             
-            detections = []
-            # YOLO 기본 구현과 동일하게 pred 전체를 처리
-            for i, det in enumerate(pred):
+            results = []
+            # YOLO 기본 구현과 동일하게 pred 전체를 처리 (배치의 이미지별)
+            for frame, det, ratio_pad in zip(frames, pred, ratio_pads):
+                detections = []
                 if det is not None:
-                    # 원본 이미지 크기로 좌표 변환 (YOLO 기본 구현과 동일)
-                    det[:, :4] = scale_boxes(img.shape[2:], det[:, :4], frame.shape).round()
+                    # 원본 이미지 크기로 좌표 변환 (letterbox 비율/패딩 사용)
+                    det[:, :4] = scale_boxes(img.shape[2:], det[:, :4], frame.shape, ratio_pad=ratio_pad).round()
                     
-                    for *xyxy, conf, cls in det:
+                    for *xyxy, conf, cls in det.tolist():
                         x1, y1, x2, y2 = map(int, xyxy)
                         detections.append({
                             'bbox': [x1, y1, x2, y2],
                             'confidence': float(conf),
                             'class': int(cls)
                         })
+                results.append(detections)
             
-            logger.info(f"차량 탐지 완료 - {len(detections)}대 탐지")
-            return detections
+            logger.info(f"차량 탐지 완료 - {len(frames)}개 프레임, {sum(len(d) for d in results)}대 탐지")
+            return results
             
         except Exception as e:
             logger.error(f"차량 탐지 실패: {e}")
-            return []
+            return [[] for _ in frames]
+    
+    def track_detections(self, current_time: float, detections: List[Dict]) -> List[Dict]:
+        """탐지 결과로 차량 트랙을 갱신하고 탐지별 track_id 추가 (샘플 시각 순서대로 호출)"""
+        if self.tracker is None:
+            return detections
+        dets = np.array([[*d['bbox'], d['confidence'], d['class']] for d in detections], dtype=np.float64)
+        self.tracker.update(dets.reshape(-1, 6), current_time)
+        for det, track_id in zip(detections, self.tracker.last_det_ids.tolist()):
+            det['track_id'] = track_id
+        return detections
+    
+    def propagated_detections(self) -> List[Dict]:
+        """추론을 건너뛴 샘플: 탐지 대신 Kalman 예측한 트랙 박스 사용"""
+        return [
+            {
+                'bbox': [int(round(v)) for v in track[:4]],
+                'confidence': float(track[5]),
+                'class': int(track[6]),
+                'track_id': int(track[4])
+            }
+            for track in self.tracker.propagate()
+        ]
     
     def check_parking_slots(self, frame: np.ndarray, detections: List[Dict]) -> List[Dict]:
         """ROI와 차량 탐지 결과를 비교하여 주차 슬롯 상태 확인"""
         slot_status = []
         
         # ROI 데이터에서 슬롯 정보 가져오기 (첫 번째 이미지 사용)
-        image_key = list(self.roi_data.keys())[0]  # "test.png"
-        slots = self.roi_data[image_key]
+        self.roi.refresh()
+        image_key = self.roi.first_key()  # "test.png"
+        geometry = self.roi.geometry(image_key)
         
-        for slot in slots:
-            slot_id = slot['slot_id']
-            roi_coords = slot['coords']
-            
-            # ROI 영역 내 차량 개수 확인
-            vehicles_in_slot = 0
-            
-            for detection in detections:
-                bbox = detection['bbox']
-                vehicle_center = [(bbox[0] + bbox[2]) // 2, (bbox[1] + bbox[3]) // 2]
-                
-                # 차량 중심점이 ROI 내부에 있는지 확인
-                if self.point_in_polygon(vehicle_center, roi_coords):
-                    vehicles_in_slot += 1
-            
+        # 차량 중심점이 ROI 내부에 있는지 확인 (격자 인덱스로 후보 슬롯만 검사)
+        centers = np.array([[(d['bbox'][0] + d['bbox'][2]) // 2, (d['bbox'][1] + d['bbox'][3]) // 2]
+                            for d in detections]).reshape(-1, 2)
+        _, slot_idx = geometry.point_pairs(centers)
+        vehicle_counts = np.bincount(slot_idx, minlength=len(geometry))
+        
+        for slot_id, roi_coords, vehicles_in_slot in zip(geometry.slot_ids, geometry.coords, vehicle_counts):
             # 주차 슬롯 상태 결정 (차량이 있으면 occupied, 없으면 available)
-            is_available = vehicles_in_slot == 0
+            is_available = bool(vehicles_in_slot == 0)
             
             slot_status.append({
                 'slot_id': slot_id,
                 'is_available': is_available,
-                'vehicle_count': vehicles_in_slot,
+                'vehicle_count': int(vehicles_in_slot),
                 'roi_coords': roi_coords
             })
         
         logger.info(f"주차 슬롯 상태 분석 완료 - {len(slot_status)}개 슬롯")
         return slot_status
     
-    def point_in_polygon(self, point: List[int], polygon: List[List[int]]) -> bool:
-        """점이 다각형 내부에 있는지 확인 (Ray casting algorithm)"""
-        x, y = point
-        n = len(polygon)
-        inside = False
-        
-        p1x, p1y = polygon[0]
-        for i in range(n + 1):
-            p2x, p2y = polygon[i % n]
-            if y > min(p1y, p2y):
-                if y <= max(p1y, p2y):
-                    if x <= max(p1x, p2x):
-                        if p1y != p2y:
-                            xinters = (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
-                        if p1x == p2x or x <= xinters:
-                            inside = not inside
-            p1x, p1y = p2x, p2y
-        
-        return inside
-    
     def send_to_backend(self, slot_status: List[Dict], timestamp: datetime) -> bool:
         """백엔드 서버로 주차 슬롯 상태 전송"""
-        try:
-            # API 요청 데이터 준비
-            parking_lot_id = 1  # 기본 주차장 ID
-            
-            for slot in slot_status:
-                slot_number = int(slot['slot_id'].split('_')[1])  # "slot_2" -> 2
-                
-                request_data = {
-                    'parkingLotId': parking_lot_id,
-                    'slotNumber': slot_number,
-                    'isAvailable': slot['is_available']
-                }
-                
-                # PUT 요청으로 주차 슬롯 상태 업데이트
-                response = requests.put(
-                    f"{self.backend_url}/parking-slots",
-                    json=request_data,
-                    headers={'Content-Type': 'application/json'},
-                    timeout=10
-                )
-                
-                if response.status_code == 200:
-                    logger.info(f"슬롯 {slot_number} 상태 전송 성공: {'사용가능' if slot['is_available'] else '사용중'}")
-                else:
-                    logger.error(f"슬롯 {slot_number} 상태 전송 실패: {response.status_code}")
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"백엔드 전송 실패: {e}")
-            return False
+        # API 요청 데이터 준비
+        parking_lot_id = self.parking_lot_id
+        slots = [
+            {
+                'slotNumber': int(slot['slot_id'].split('_')[1]),  # "slot_2" -> 2
+                'isAvailable': slot['is_available']
+            }
+            for slot in slot_status
+        ]
+        
+        # 연결 풀을 재사용해 일괄 전송 (일괄 API가 없으면 슬롯별 동시 전송), 비동기 모드에서는 큐에 등록만
+        if self.publish_queue is not None:
+            return self.publish_queue.submit("publish", parking_lot_id, slots)
+        return self.publisher.publish(parking_lot_id, slots)
     
     def save_analysis_result(self, slot_status: List[Dict], timestamp: datetime, frame: np.ndarray):
-        """분석 결과를 로컬에 저장"""
+        """분석 결과를 로컬에 저장 (result_store가 있으면 시계열 저장소에 append)"""
         try:
+            if self.result_store is not None:
+                self.result_store.append_slot_status(str(self.parking_lot_id), timestamp, slot_status, 'is_available')
+                logger.info(f"분석 결과 저장 완료: {self.result_store.path}")
+                return
+
             # 결과 이미지 생성 (ROI와 탐지 결과 시각화)
             result_image = frame.copy()
             
@@ -302,49 +294,141 @@ class ParkingAnalysisSystem:
         except Exception as e:
             logger.error(f"결과 저장 실패: {e}")
     
+    def process_frame_result(self, current_time: float, frame: np.ndarray, detections: List[Dict]) -> List[Dict]:
+        """탐지 이후 단계 처리: 슬롯 매칭 → 백엔드 전송 → 결과 저장"""
+        # 주차 슬롯 상태 확인
+        slot_status = self.check_parking_slots(frame, detections)
+        self.publish_frame_result(current_time, frame, slot_status)
+        return slot_status
+    
+    def publish_frame_result(self, current_time: float, frame: np.ndarray, slot_status: List[Dict]):
+        """슬롯 상태 전송/저장 (샘플 순서대로 호출해야 함 - 전송 큐와 결과 파일이 샘플 시각 기준)"""
+        # 샘플 시각 = 영상 시작 시각 + 영상 내 위치 (처리 속도와 무관하게 샘플마다 다름)
+        timestamp = self.video_info['start_time'] + timedelta(seconds=current_time)
+        
+        # 백엔드로 전송
+        success = self.send_to_backend(slot_status, timestamp)
+        
+        # 결과 저장
+        self.save_analysis_result(slot_status, timestamp, frame)
+        
+        logger.info(f"분석 완료 - 시간: {current_time/60:.1f}분, 슬롯 상태: {sum(1 for s in slot_status if s['is_available'])}/{len(slot_status)} 사용가능")
+    
     def run_analysis(self):
         """전체 분석 프로세스 실행"""
         logger.info("주차장 영상 분석 시작")
         
         # 결과 저장 디렉토리 생성
-        import os
         os.makedirs("analysis_results", exist_ok=True)
         
-        # 영상 시작부터 끝까지 3분 간격으로 분석
-        current_time = 0.0
+        if self.batch_size > 1:
+            self.run_batch_analysis()
+            self.flush_publish_queue()
+            return
+        
+        # 영상 시작부터 끝까지 3분 간격으로 분석 (영상을 한 번만 열고 순차적으로 건너뛰며 추출)
         analysis_count = 0
         
-        while current_time <= self.video_info['duration_seconds']:
-            logger.info(f"분석 진행률: {current_time/self.video_info['duration_seconds']*100:.1f}%")
-            
-            # 현재 시간에 해당하는 프레임 추출
-            frame = self.extract_frame_at_time(current_time)
-            if frame is None:
-                current_time += self.interval_seconds
-                continue
-            
-            # 차량 탐지
-            detections = self.detect_vehicles(frame)
-            
-            # 주차 슬롯 상태 확인
-            slot_status = self.check_parking_slots(frame, detections)
-            
-            # 현재 시간 계산
-            timestamp = datetime.now()
-            
-            # 백엔드로 전송
-            success = self.send_to_backend(slot_status, timestamp)
-            
-            # 결과 저장
-            self.save_analysis_result(slot_status, timestamp, frame)
-            
-            analysis_count += 1
-            logger.info(f"분석 완료 #{analysis_count} - 시간: {current_time/60:.1f}분, 슬롯 상태: {sum(1 for s in slot_status if s['is_available'])}/{len(slot_status)} 사용가능")
-            
-            # 다음 분석 시간으로 이동
-            current_time += self.interval_seconds
+        with VideoFrameSampler(self.video_path) as sampler:
+            for current_time, frame in self.gated_frames(sampler.iter_interval(self.interval_seconds)):
+                logger.info(f"분석 진행률: {current_time/self.video_info['duration_seconds']*100:.1f}%")
+                
+                # 차량 탐지 (detect_every > 1이면 사이 샘플은 트랙 예측으로 대체)
+                if self.detect_every > 1 and analysis_count % self.detect_every:
+                    detections = self.propagated_detections()
+                else:
+                    detections = self.track_detections(current_time, self.detect_vehicles(frame))
+                
+                # 슬롯 매칭, 백엔드 전송, 결과 저장
+                self.process_frame_result(current_time, frame, detections)
+                analysis_count += 1
         
         logger.info(f"전체 분석 완료 - 총 {analysis_count}회 분석 수행")
+        self.log_gate_summary()
+        self.save_tracking_summary()
+        self.flush_publish_queue()
+    
+    def gated_frames(self, frames):
+        """
+        변화 감지 게이트를 통과한 (시각, 프레임)만 생성 (게이트가 없으면 그대로)
+        슬롯 영역이 마지막 추론 프레임과 같으면 건너뜀 - 슬롯 상태가 그대로이므로 전송/저장할 것도 없음
+        """
+        for current_time, frame in frames:
+            if self.gate is not None:
+                self.roi.refresh()
+                geometry = self.roi.geometry(self.roi.first_key()) if len(self.roi) else None
+                if not self.gate.should_infer(frame, geometry):
+                    continue
+                self.gate.update()
+            yield current_time, frame
+    
+    def log_gate_summary(self):
+        """변화 감지 게이트 카운터 로그"""
+        if self.gate is not None:
+            logger.info(f"변화 감지 게이트: {self.gate.summary()}")
+    
+    def save_tracking_summary(self):
+        """차량별 체류 시간 (진행 중 + 종료된 트랙) 로그 및 analysis_results/vehicle_dwell.json 저장"""
+        if self.tracker is None:
+            return
+        logger.info(f"차량 추적: {self.tracker.summary()}")
+        dwell = {
+            'active': [{'track_id': tid, 'dwell_seconds': round(seconds, 1)}
+                       for tid, seconds in self.tracker.dwell_times().items()],
+            'finished': self.tracker.finished_tracks()
+        }
+        with open("analysis_results/vehicle_dwell.json", 'w', encoding='utf-8') as f:
+            json.dump(dwell, f, ensure_ascii=False, indent=2)
+    
+    def flush_publish_queue(self, timeout: float = 30.0):
+        """전송 큐에 남은 작업 대기 (시간 내에 못 보내면 spool에 남아 다음 실행 때 재전송)"""
+        if self.publish_queue is not None and not self.publish_queue.flush(timeout):
+            logger.warning(f"백엔드 전송 대기 작업 {self.publish_queue.qsize()}개 남음 (spool: {self.publish_queue.spool_dir})")
+    
+    def run_batch_analysis(self):
+        """
+        배치 분석 (오프라인 백필용)
+        batch_size개 샘플 프레임을 하나의 텐서 배치로 추론하고, 슬롯 매칭은 스레드 풀에서 실행하는 동안
+        메인 스레드는 다음 배치를 디코딩/추론 (전송/저장은 메인 스레드에서 샘플 순서대로)
+        """
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+        
+        analysis_count = 0
+        pending = []
+        
+        with VideoFrameSampler(self.video_path) as sampler, \
+                ThreadPoolExecutor(max_workers=self.num_workers) as executor:
+            frames = self.gated_frames(sampler.iter_interval(self.interval_seconds))
+            while True:
+                batch = list(itertools.islice(frames, self.batch_size))
+                if not batch:
+                    break
+                
+                times = [t for t, _ in batch]
+                logger.info(f"분석 진행률: {times[-1]/self.video_info['duration_seconds']*100:.1f}% (배치 {len(batch)}개)")
+                
+                # 배치 추론
+                results = self.detect_vehicles_batch([frame for _, frame in batch])
+                
+                # 슬롯 매칭은 스레드 풀로 넘기고 바로 다음 배치로 진행 (추적은 샘플 순서대로 메인 스레드에서)
+                for (current_time, frame), detections in zip(batch, results):
+                    detections = self.track_detections(current_time, detections)
+                    pending.append((current_time, frame, executor.submit(self.check_parking_slots, frame, detections)))
+                
+                # 매칭이 밀리면 메모리에 프레임이 쌓이지 않도록 오래된 작업부터 대기 후 순서대로 전송/저장
+                while len(pending) > 2 * self.batch_size:
+                    current_time, frame, future = pending.pop(0)
+                    self.publish_frame_result(current_time, frame, future.result())
+                    analysis_count += 1
+            
+            for current_time, frame, future in pending:
+                self.publish_frame_result(current_time, frame, future.result())
+                analysis_count += 1
+        
+        logger.info(f"전체 분석 완료 - 총 {analysis_count}회 분석 수행 (배치 크기 {self.batch_size})")
+        self.log_gate_summary()
+        self.save_tracking_summary()
 
 def main():
     """메인 실행 함수"""
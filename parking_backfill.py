@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+녹화 영상 아카이브 오프라인 백필 (프로세스 풀 병렬)
+디렉터리의 영상들을 샘플 시각 기준 구간(segment)으로 나눠 프로세스 풀에 분배하고, 결과를 하나의 시간순 점유 타임라인으로 병합
+
+- 워커 프로세스마다 상주형 탐지기(VehicleDetector)를 한 번 로드하고 torch intra-op 스레드 수를 CPU 수 / 워커 수로 맞춤
+  (inter-op 1, OpenCV 1 스레드 - 워커 간 코어 과다 구독 방지)
+- 구간 결과는 out/segments/*.npz에 원자적으로 저장하고 완료 목록을 out/manifest.json에 기록
+  → 중단 후 같은 명령을 다시 실행하면 완료된 구간은 건너뜀 (설정이 바뀌었으면 --restart 필요)
+- 슬롯 판단은 ParkingOccupancyAnalyzer와 같은 최대 IoU >= iou_threshold 규칙
+- 영상 시작 시각은 파일 이름의 YYYYMMDD_HHMMSS (또는 YYYYMMDD-HHMMSS), 없으면 파일 수정 시각 - 영상 길이
+
+Usage:
+    $ python parking_backfill.py --videos recordings/ --roi roi_full_rect_coords.json --roi-key frame_30min.jpg \
+        --weights best_macos.pt --interval 180 --segment-minutes 30 --out runs/backfill
+    $ python parking_backfill.py ... --store occupancy_history.db --lot-id sanggyeonggwan  # 저장소에도 기록
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from roi_registry import RoiRegistry
+from slot_occupancy import SlotGeometry
+from video_sampler import VideoFrameSampler, recording_start
+
+logger = logging.getLogger(__name__)
+
+VIDEO_FORMATS = {"mov", "mp4", "avi", "mkv", "m4v", "wmv", "mpg", "mpeg", "ts"}
+
+# 워커 프로세스별 상태 (initializer에서 설정)
+WORKER = {}
+
+
+def init_worker(weights: str, roi_data: Dict, threads: int, imgsz: int, conf: float, iou_threshold: float,
+                batch_size: int):
+    """워커 초기화: 스레드 수 조정 후 탐지기 1회 로드"""
+    import cv2
+    import torch
+
+    from parking_detector import VEHICLE_CLASSES, VehicleDetector
+
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # 이미 병렬 작업이 실행된 뒤에는 변경 불가
+    cv2.setNumThreads(1)
+    WORKER.update(
+        detector=VehicleDetector(weights, device="cpu", imgsz=imgsz, conf_thres=conf, classes=VEHICLE_CLASSES),
+        roi_data=roi_data, geometry={}, iou_threshold=iou_threshold, batch_size=batch_size)
+
+
+def process_segment(task: Dict) -> Dict:
+    """
+    한 구간의 샘플 프레임 탐지 + 슬롯 점유 판단 (워커 프로세스에서 실행)
+
+    결과는 task['output']에 npz (video_seconds (T,), occupied (T, S), slot_ids (S,))로 저장
+    """
+    start = time.perf_counter()
+    key = task['roi_key']
+    if key not in WORKER['geometry']:
+        WORKER['geometry'][key] = SlotGeometry(WORKER['roi_data'][key])
+    geometry = WORKER['geometry'][key]
+    detector = WORKER['detector']
+
+    seconds, occupied, vehicles = [], [], 0
+    with VideoFrameSampler(task['video']) as sampler:
+        frames = sampler.iter_frames(task['seconds'])
+        while True:
+            batch = [item for _, item in zip(range(WORKER['batch_size']), frames)]
+            if not batch:
+                break
+            for (t, _), det in zip(batch, detector.detect_batch([frame for _, frame in batch])):
+                max_iou, _ = geometry.max_iou(det[:, :4])
+                seconds.append(t)
+                occupied.append(max_iou >= WORKER['iou_threshold'])
+                vehicles += len(det)
+
+    tmp = task['output'] + ".tmp.npz"
+    np.savez(tmp, video_seconds=np.array(seconds, dtype=np.float64),
+             occupied=np.array(occupied, dtype=bool).reshape(-1, len(geometry)), slot_ids=np.array(geometry.slot_ids))
+    os.replace(tmp, task['output'])  # 완료된 구간 파일만 남도록 원자적 교체
+    return {'segment': task['segment'], 'samples': len(seconds), 'vehicles': vehicles,
+            'seconds': round(time.perf_counter() - start, 2), 'pid': os.getpid()}
+
+
+def file_digest(path: str) -> str:
+    """설정 비교용 파일 식별자 (내용 해시가 비싼 모델은 크기 + 수정 시각)"""
+    if not os.path.isfile(path):
+        return path
+    stat = os.stat(path)
+    return f"{os.path.basename(path)}:{stat.st_size}:{int(stat.st_mtime)}"
+
+
+class BackfillManifest:
+    def __init__(self, path: str, config: Dict, restart: bool = False):
+        """
+        체크포인트 매니페스트 로드 (없거나 restart면 새로 생성)
+
+        Args:
+            path: manifest.json 경로
+            config: 결과에 영향을 주는 설정 (이전 실행과 다르면 재개 불가)
+        """
+        self.path = path
+        self.data = {'config': config, 'videos': {}, 'segments': {}}
+        if os.path.isfile(path) and not restart:
+            with open(path, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+            if previous.get('config') != config:
+                raise ValueError(f"이전 백필과 설정이 다릅니다 ({path}) - 같은 설정으로 실행하거나 --restart 사용")
+            self.data = previous
+
+    @property
+    def videos(self) -> Dict:
+        return self.data['videos']
+
+    def done(self, segment: str, output: str) -> bool:
+        return segment in self.data['segments'] and os.path.isfile(output)
+
+    def complete(self, segment: str, info: Dict):
+        """구간 완료 기록 후 매니페스트 저장"""
+        self.data['segments'][segment] = info
+        self.save()
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+
+def plan_segments(videos: Dict, out_dir: str, roi_key: str, interval: float, segment_samples: int) -> List[Dict]:
+    """영상별 샘플 시각(0, interval, ... 영상 끝 전)을 segment_samples개씩 나눈 작업 목록"""
+    tasks = []
+    for name, info in videos.items():
+        count = int(np.ceil(info['duration'] / interval))
+        seconds = [i * interval for i in range(count)]
+        stem = re.sub(r"[^\w.-]", "_", name)
+        for index, begin in enumerate(range(0, count, segment_samples)):
+            segment = f"{name}#{index}"
+            tasks.append({'segment': segment, 'video': info['path'], 'roi_key': roi_key,
+                          'seconds': seconds[begin:begin + segment_samples],
+                          'output': os.path.join(out_dir, "segments", f"{stem}_{index:05d}.npz")})
+    return tasks
+
+
+def merge_timeline(videos: Dict, tasks: List[Dict], out_dir: str, store=None, lot_id: Optional[str] = None) -> int:
+    """완료된 구간 결과를 절대 시각 순으로 병합해 out/timeline.csv 저장 (store가 있으면 시간순으로 append)"""
+    rows = []
+    for task in tasks:
+        if not os.path.isfile(task['output']):
+            continue
+        name = task['segment'].rsplit("#", 1)[0]
+        with np.load(task['output']) as data:
+            slot_ids = data['slot_ids'].tolist()
+            for t, occupied in zip(data['video_seconds'], data['occupied']):
+                rows.append((videos[name]['start'] + t, name, float(t), slot_ids, occupied))
+    rows.sort(key=lambda row: row[0])
+
+    with open(os.path.join(out_dir, "timeline.csv"), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['timestamp', 'video', 'video_seconds', 'occupied', 'total', 'occupied_slots'])
+        for ts, name, t, slot_ids, occupied in rows:
+            writer.writerow([datetime.fromtimestamp(ts).isoformat(), name, f"{t:.1f}", int(occupied.sum()),
+                             len(occupied), " ".join(s for s, o in zip(slot_ids, occupied) if o)])
+
+    if store is not None:
+        # 이미 저장된 시각까지(재실행, 기존 이력보다 앞선 영상)는 덮어쓴 뒤 집계를 한 번만 다시 생성하고
+        # 그 뒤 시각만 append마다 집계에 더함 (같은 샘플이 두 번 더해지지 않음)
+        newest = store.last_timestamp(lot_id)
+        split = sum(1 for row in rows if row[0] <= newest) if newest is not None else 0
+        for ts, _, _, slot_ids, occupied in rows[:split]:
+            store.append(lot_id, ts, slot_ids, occupied)
+        if split and store.analytics is not None:
+            with store.lock, store.conn:
+                store.analytics.rebuild(lot_id)
+        for ts, _, _, slot_ids, occupied in rows[split:]:
+            store.append(lot_id, ts, slot_ids, occupied)
+    return len(rows)
+
+
+def run_backfill(videos_dir: str, roi_path: str, weights: str, out_dir: str = "runs/backfill",
+                 roi_key: Optional[str] = None, interval: float = 180, segment_minutes: float = 30,
+                 workers: Optional[int] = None, batch_size: int = 4, imgsz: int = 640, conf: float = 0.3,
+                 iou_threshold: float = 0.17, store: Optional[str] = None, lot_id: Optional[str] = None,
+                 restart: bool = False) -> Dict:
+    """
+    디렉터리의 영상 전체 백필
+
+    Args:
+        videos_dir: 녹화 영상 디렉터리 (하위 디렉터리 포함)
+        roi_path: ROI 좌표 JSON 경로
+        weights: YOLO 모델 경로
+        out_dir: 구간 결과 / 매니페스트 / 타임라인 출력 디렉터리
+        roi_key: 사용할 ROI 키 (None이면 첫 번째 키)
+        interval: 샘플 간격 (초)
+        segment_minutes: 작업 하나가 맡는 영상 길이 (분, 작을수록 균등 분배 / 재개 단위가 작아짐)
+        workers: 프로세스 수 (None이면 CPU 수)
+        batch_size: 워커당 한 번에 추론할 프레임 수
+        store: 결과를 append할 OccupancyStore 경로 (None이면 타임라인 CSV만)
+        lot_id: 저장소 주차장 ID (None이면 ROI 키)
+        restart: 매니페스트를 무시하고 처음부터
+    """
+    roi_data = RoiRegistry(roi_path).data  # 검증된 슬롯만 워커로 전달
+    roi_key = roi_key or next(iter(roi_data))
+    segment_samples = max(int(round(segment_minutes * 60 / interval)), 1)
+    os.makedirs(os.path.join(out_dir, "segments"), exist_ok=True)
+
+    config = {'weights': file_digest(weights), 'roi': hashlib.sha1(json.dumps(roi_data[roi_key]).encode()).hexdigest(),
+              'roi_key': roi_key, 'interval': interval, 'segment_samples': segment_samples, 'imgsz': imgsz,
+              'conf': conf, 'iou_threshold': iou_threshold}
+    manifest = BackfillManifest(os.path.join(out_dir, "manifest.json"), config, restart)
+
+    # 영상 목록 (길이/시작 시각은 매니페스트에 저장해 재개 시 다시 열지 않음)
+    files = sorted(p for p in Path(videos_dir).rglob("*") if p.suffix[1:].lower() in VIDEO_FORMATS)
+    for file in files:
+        name = str(file.relative_to(videos_dir))
+        if name not in manifest.videos:
+            try:
+                with VideoFrameSampler(str(file)) as sampler:
+                    duration = sampler.duration_seconds
+            except ValueError as e:
+                logger.error(f"영상 건너뜀: {e}")
+                continue
+            manifest.videos[name] = {'path': str(file), 'duration': duration,
+                                     'start': recording_start(str(file), duration)}
+    manifest.save()
+
+    tasks = plan_segments(manifest.videos, out_dir, roi_key, interval, segment_samples)
+    pending = [task for task in tasks if not manifest.done(task['segment'], task['output'])]
+    workers = max(min(workers or os.cpu_count() or 1, len(pending)), 1)
+    threads = max((os.cpu_count() or 1) // workers, 1)
+    logger.info(f"백필 시작 - 영상 {len(manifest.videos)}개, 구간 {len(tasks)}개 (남은 구간 {len(pending)}개), "
+                f"워커 {workers}개 x torch 스레드 {threads}개")
+
+    start, samples, failed = time.perf_counter(), 0, 0
+    if pending:
+        # spawn: 부모 프로세스의 torch/OpenCV 스레드 상태를 물려받지 않음
+        with ProcessPoolExecutor(workers, mp_context=get_context("spawn"), initializer=init_worker,
+                                 initargs=(weights, roi_data, threads, imgsz, conf, iou_threshold, batch_size)) as pool:
+            futures = {pool.submit(process_segment, task): task for task in pending}
+            try:
+                for done, future in enumerate(as_completed(futures), 1):
+                    task = futures[future]
+                    try:
+                        info = future.result()
+                    except Exception as e:
+                        failed += 1
+                        logger.error(f"구간 실패 {task['segment']}: {e}")
+                        continue
+                    manifest.complete(task['segment'], {k: v for k, v in info.items() if k != 'segment'})
+                    samples += info['samples']
+                    elapsed = time.perf_counter() - start
+                    logger.info(f"[{done}/{len(pending)}] {task['segment']} - 샘플 {info['samples']}개 "
+                                f"{info['seconds']:.1f}초 (누적 {samples / elapsed:.2f} 샘플/초)")
+            except KeyboardInterrupt:
+                logger.warning("중단됨 - 완료된 구간은 매니페스트에 기록되어 다시 실행하면 이어서 처리")
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+
+    occupancy_store = None
+    if store:
+        from occupancy_store import OccupancyStore
+        occupancy_store = OccupancyStore(store, analytics=True)
+    merged = merge_timeline(manifest.videos, tasks, out_dir, occupancy_store, lot_id or roi_key)
+    if occupancy_store is not None:
+        occupancy_store.close()
+
+    elapsed = time.perf_counter() - start
+    summary = {'videos': len(manifest.videos), 'segments': len(tasks), 'processed_segments': len(pending) - failed,
+               'failed_segments': failed, 'samples': samples, 'timeline_samples': merged,
+               'seconds': round(elapsed, 1), 'samples_per_second': round(samples / elapsed, 2) if elapsed else 0.0}
+    logger.info(f"백필 완료 - {summary} (타임라인: {os.path.join(out_dir, 'timeline.csv')})")
+    return summary
+
+
+def main():
+    """메인 함수"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="녹화 영상 아카이브 병렬 백필 (재개 가능)")
+    parser.add_argument("--videos", type=str, required=True, help="녹화 영상 디렉터리")
+    parser.add_argument("--roi", type=str, default="roi_full_rect_coords.json", help="ROI 좌표 JSON 경로")
+    parser.add_argument("--roi-key", type=str, default=None, help="사용할 ROI 키 (기본: 첫 번째 키)")
+    parser.add_argument("--weights", type=str, default="best_macos.pt", help="YOLO 모델 경로")
+    parser.add_argument("--out", type=str, default="runs/backfill", help="출력 디렉터리")
+    parser.add_argument("--interval", type=float, default=180, help="샘플 간격 (초)")
+    parser.add_argument("--segment-minutes", type=float, default=30, help="작업 하나가 맡는 영상 길이 (분)")
+    parser.add_argument("--workers", type=int, default=None, help="프로세스 수 (기본: CPU 수)")
+    parser.add_argument("--batch-size", type=int, default=4, help="워커당 배치 크기")
+    parser.add_argument("--imgsz", type=int, default=640, help="추론 입력 크기")
+    parser.add_argument("--conf", type=float, default=0.3, help="탐지 confidence 임계값")
+    parser.add_argument("--iou-threshold", type=float, default=0.17, help="점유 판단 최소 IoU")
+    parser.add_argument("--store", type=str, default=None, help="결과를 append할 시계열 저장소 경로")
+    parser.add_argument("--lot-id", type=str, default=None, help="저장소 주차장 ID (기본: ROI 키)")
+    parser.add_argument("--restart", action="store_true", help="매니페스트를 무시하고 처음부터")
+    opt = parser.parse_args()
+    run_backfill(opt.videos, opt.roi, opt.weights, opt.out, opt.roi_key, opt.interval, opt.segment_minutes,
+                 opt.workers, opt.batch_size, opt.imgsz, opt.conf, opt.iou_threshold, opt.store, opt.lot_id,
+                 opt.restart)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1048 @@
+#!/usr/bin/env python3
+"""
+주차장 분석 파이프라인 성능 벤치마크
+각 하위 명령이 기존 경로와 개선된 경로의 주기당 지연 시간/메모리를 비교
+
+Usage:
+    $ python parking_benchmarks.py inference --weights best_macos.pt --image frame_30min.jpg --cycles 10
+    $ python parking_benchmarks.py occupancy --slots 500 --detections 300
+    $ python parking_benchmarks.py sampler --duration 3600 --fps 10 --interval 180
+    $ python parking_benchmarks.py preprocess --size 1920 1080 --batch 4 --iterations 50
+    $ python parking_benchmarks.py publish --slots 50 100 200 400 --latency-ms 2
+    $ python parking_benchmarks.py delta --slots 200 --cycles 100 --change-rate 0.03
+    $ python parking_benchmarks.py queue --cycles 40 --latency-ms 300 --failure-rate 0.3
+    $ python parking_benchmarks.py scheduler --interval 0.2 --job-ms 50 --ticks 25
+    $ python parking_benchmarks.py gate --cycles 200 --change-prob 0.1
+    $ python parking_benchmarks.py classifier --weights best_macos.pt --classifier runs/train-cls/exp/weights/best.pt --slots 50 200 800
+    $ python parking_benchmarks.py smoothing --slots 5000 --cycles 200 --dropout 0.05 --false-positive 0.02
+    $ python parking_benchmarks.py store --slots 200 --cycles 4800 --interval 180
+    $ python parking_benchmarks.py analytics --slots 200 --days 30 --interval 180
+    $ python parking_benchmarks.py backfill --weights best_macos.pt --videos 4 --workers 1 2 4 8
+    $ python parking_benchmarks.py roi-transform --cameras 20 --slots 200 --repeats 20
+    $ python parking_benchmarks.py shift --slots 60 --trials 40 --size 1920 1080
+    $ python parking_benchmarks.py suggest --slots 200 --frames 500 --repeats 5
+    $ python parking_benchmarks.py batch --weights best_macos.pt --batch-sizes 1 4 8 --threads 1 4
+"""
+
+import argparse
+import os
+import platform
+import resource
+import statistics
+import time
+
+import numpy as np
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF) -> float:
+    """프로세스(또는 종료된 자식 프로세스 중 최대)의 peak RSS (MB)"""
+    rss = resource.getrusage(who).ru_maxrss
+    return rss / 1024 ** 2 if platform.system() == "Darwin" else rss / 1024  # macOS: bytes, Linux: KB
+
+
+def summarize(name: str, times: list, **extra):
+    """주기별 측정 시간 요약 출력"""
+    ms = [t * 1000 for t in times]
+    line = f"{name:<12} mean {statistics.mean(ms):9.1f} ms | median {statistics.median(ms):9.1f} ms | max {max(ms):9.1f} ms"
+    for k, v in extra.items():
+        line += f" | {k} {v}"
+    print(line)
+
+
+def bench_inference(opt):
+    """subprocess(simple_detect.py) 경로와 resident 모델 경로의 주기당 지연 시간 및 peak RSS 비교"""
+    from parking_occupancy_analyzer import ParkingOccupancyAnalyzer
+
+    def run_cycles(analyzer):
+        times = []
+        for _ in range(opt.cycles):
+            t = time.perf_counter()
+            analyzer.run_yolo_detection()
+            times.append(time.perf_counter() - t)
+        return times
+
+    # 1. subprocess 경로 (자식 프로세스마다 인터프리터 시작 + torch import + 가중치 로드 + 디스크 왕복)
+    analyzer = ParkingOccupancyAnalyzer(model_path=opt.weights, image_path=opt.image, inference_mode="subprocess")
+    times = run_cycles(analyzer)
+    summarize("subprocess", times, **{"child peak RSS": f"{peak_rss_mb(resource.RUSAGE_CHILDREN):.0f} MB"})
+
+    # 2. resident 경로 (모델 1회 로드 후 재사용)
+    t = time.perf_counter()
+    analyzer = ParkingOccupancyAnalyzer(model_path=opt.weights, image_path=opt.image, inference_mode="resident")
+    load_s = time.perf_counter() - t
+    times = run_cycles(analyzer)
+    summarize("resident", times, **{"load": f"{load_s * 1000:.0f} ms", "peak RSS": f"{peak_rss_mb():.0f} MB"})
+
+
+def synthetic_lot(n_slots: int, n_dets: int, width: int = 3840, height: int = 2160, seed: int = 0):
+    """무작위 사각형 슬롯 목록과 xyxy 탐지 박스 배열 생성"""
+    rng = np.random.default_rng(seed)
+    c = rng.uniform((0, 0), (width, height), (n_slots, 2))
+    wh = rng.uniform(40, 150, (n_slots, 2))
+    corners = np.array([[-0.5, -0.5], [0.5, -0.5], [0.5, 0.5], [-0.5, 0.5]])
+    quads = c[:, None] + corners[None] * wh[:, None] + rng.normal(0, 5, (n_slots, 4, 2))
+    slots = [{'slot_id': f"slot_{i + 1}", 'coords': q.round().astype(int).tolist()} for i, q in enumerate(quads)]
+    xy = rng.uniform((0, 0), (width, height), (n_dets, 2))
+    boxes = np.concatenate((xy, xy + rng.uniform(30, 300, (n_dets, 2))), axis=1)
+    return slots, boxes
+
+
+def bench_occupancy(opt):
+    """슬롯 x 탐지 IoU: shapely 쌍별 루프 vs 벡터화 엔진"""
+    from shapely.geometry import Polygon, box
+
+    from slot_occupancy import SlotGeometry
+
+    slots, boxes = synthetic_lot(opt.slots, opt.detections)
+
+    def shapely_loop():
+        iou = np.zeros((len(boxes), len(slots)))
+        for d, b in enumerate(boxes):
+            bbox_poly = box(*b)
+            for s, slot in enumerate(slots):
+                roi_poly = Polygon(slot['coords'])
+                if bbox_poly.intersects(roi_poly):
+                    iou[d, s] = bbox_poly.intersection(roi_poly).area / bbox_poly.union(roi_poly).area
+        return iou
+
+    t = time.perf_counter()
+    geometry = SlotGeometry(slots)
+    build_s = time.perf_counter() - t
+
+    times_ref, times_vec = [], []
+    for _ in range(opt.repeats):
+        t = time.perf_counter()
+        ref = shapely_loop()
+        times_ref.append(time.perf_counter() - t)
+        t = time.perf_counter()
+        iou = geometry.iou_matrix(boxes)
+        times_vec.append(time.perf_counter() - t)
+
+    print(f"{opt.slots} slots x {opt.detections} detections")
+    summarize("shapely", times_ref)
+    summarize("vectorized", times_vec, build=f"{build_s * 1000:.1f} ms", **{"max |diff|": f"{np.abs(iou - ref).max():.2e}"})
+
+
+def make_synthetic_video(path: str, duration: float, fps: float, size=(640, 360)) -> str:
+    """움직이는 사각형이 있는 합성 영상 생성 (이미 있으면 재사용)"""
+    import cv2
+
+    if os.path.exists(path):
+        return path
+    w, h = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+    base = np.random.default_rng(0).integers(0, 255, (h, w, 3), dtype=np.uint8)
+    for i in range(int(duration * fps)):
+        frame = base.copy()
+        x = i % (w - 40)
+        cv2.rectangle(frame, (x, h // 3), (x + 40, h // 3 + 30), (0, 0, 255), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def bench_sampler(opt):
+    """샘플마다 VideoCapture 재오픈 + seek vs 한 번 연 캡처를 재사용하는 샘플러 (grab 전용 / grab+seek)"""
+    import cv2
+
+    from video_sampler import VideoFrameSampler
+
+    t = time.perf_counter()
+    os.makedirs(os.path.dirname(opt.video) or ".", exist_ok=True)
+    path = make_synthetic_video(opt.video, opt.duration, opt.fps, tuple(opt.size))
+    print(f"synthetic video {path} ({opt.duration:.0f}s @ {opt.fps} fps): {time.perf_counter() - t:.1f} s")
+
+    cap = cv2.VideoCapture(path)
+    fps, total = cap.get(cv2.CAP_PROP_FPS), int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    timestamps = np.arange(0, total / fps, opt.interval)
+
+    def reopen_and_seek(target_seconds):
+        cap = cv2.VideoCapture(path)
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(target_seconds * fps))
+        ret, frame = cap.read()
+        cap.release()
+        return frame if ret else None
+
+    t = time.perf_counter()
+    n_seek = sum(reopen_and_seek(ts) is not None for ts in timestamps)
+    seek_s = time.perf_counter() - t
+
+    def persistent(max_grab_frames):
+        t = time.perf_counter()
+        with VideoFrameSampler(path, max_grab_frames=max_grab_frames) as sampler:
+            n = sum(1 for _ in sampler.iter_frames(timestamps))
+        return time.perf_counter() - t, n
+
+    grab_s, n_grab = persistent(max_grab_frames=total)
+    hybrid_s, n_hybrid = persistent(max_grab_frames=None)
+
+    print(f"{len(timestamps)} samples every {opt.interval:.0f} s")
+    print(f"reopen+seek  total {seek_s:8.2f} s ({n_seek} frames)")
+    print(f"grab only    total {grab_s:8.2f} s ({n_grab} frames)")
+    print(f"grab+seek    total {hybrid_s:8.2f} s ({n_hybrid} frames)")
+
+
+def bench_preprocess(opt):
+    """cv2.resize + 매번 새 텐서 vs letterbox 버퍼 재사용 전처리: tracemalloc 할당량과 박스 좌표 왜곡"""
+    import tracemalloc
+
+    import cv2
+    import torch
+
+    from frame_preprocessor import LetterboxPreprocessor
+    from utils.general import scale_boxes
+
+    w, h = opt.size
+    frames = list(np.random.default_rng(0).integers(0, 255, (opt.batch, h, w, 3), dtype=np.uint8))
+
+    def resize_path():
+        batch = [cv2.resize(f, (640, 640)).transpose((2, 0, 1))[::-1] for f in frames]
+        img = torch.from_numpy(np.ascontiguousarray(np.stack(batch))).float()
+        img /= 255.0
+        return img
+
+    preprocessor = LetterboxPreprocessor(640, auto=False)
+
+    def letterbox_path():
+        return preprocessor(frames)[0]
+
+    for name, fn in (("resize", resize_path), ("letterbox", letterbox_path)):
+        fn()  # 워밍업 (버퍼/기하 캐시 생성)
+        tracemalloc.start()
+        times = []
+        for _ in range(opt.iterations):
+            t = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        summarize(name, times, **{"traced peak": f"{peak / 1024 ** 2:.2f} MB"})
+
+    # 원본 좌표의 박스를 각 전처리 기하로 투영한 뒤 scale_boxes로 되돌렸을 때의 오차 (픽셀)
+    box = torch.tensor([[w * 0.2, h * 0.3, w * 0.4, h * 0.6]], dtype=torch.float64)
+    resized = box * torch.tensor([640 / w, 640 / h, 640 / w, 640 / h], dtype=torch.float64)
+    err_resize = (scale_boxes((640, 640), resized.clone(), (h, w)) - box).abs().max().item()
+    (ratio, (dw, dh)) = preprocessor.get_geometry(frames[0])[3]
+    padded = box * ratio[0] + torch.tensor([dw, dh, dw, dh], dtype=torch.float64)
+    ratio_pad = (ratio, (dw, dh))
+    err_letterbox = (scale_boxes((640, 640), padded.clone(), (h, w), ratio_pad=ratio_pad) - box).abs().max().item()
+    print(f"box round-trip error ({w}x{h}): resize {err_resize:.1f} px | letterbox {err_letterbox:.2e} px")
+
+
+def bench_batch(opt):
+    """ParkingAnalysisSystem 배치 추론 처리량 (배치 크기 x torch 스레드 수)"""
+    import json
+
+    import torch
+
+    from parking_analysis_system import ParkingAnalysisSystem
+
+    os.makedirs(os.path.dirname(opt.video) or ".", exist_ok=True)
+    path = make_synthetic_video(opt.video, opt.duration, opt.fps, tuple(opt.size))
+    roi_path = os.path.join(os.path.dirname(opt.video) or ".", "synthetic_roi.json")
+    with open(roi_path, "w", encoding="utf-8") as f:
+        json.dump({"synthetic": synthetic_lot(50, 0, *opt.size)[0]}, f)
+
+    system = ParkingAnalysisSystem(path, roi_path, opt.weights, interval_minutes=opt.interval / 60)
+    if system.model is None:
+        # 가중치가 없으면 같은 구조의 무작위 초기화 모델로 처리량만 측정
+        from models.yolo import Model
+        system.model = Model(opt.cfg).eval()
+        print(f"weights not found, using random {opt.cfg}")
+
+    from video_sampler import VideoFrameSampler
+    with VideoFrameSampler(path) as sampler:
+        frames = [frame for _, frame in sampler.iter_interval(opt.interval)][:max(opt.batch_sizes) * opt.batches]
+
+    for threads in opt.threads:
+        torch.set_num_threads(threads)
+        for bs in opt.batch_sizes:
+            batches = [frames[i:i + bs] for i in range(0, bs * opt.batches, bs)]
+            system.detect_vehicles_batch(batches[0])  # 워밍업
+            t = time.perf_counter()
+            for batch in batches:
+                system.detect_vehicles_batch(batch)
+            total = time.perf_counter() - t
+            n = sum(len(b) for b in batches)
+            print(f"threads {threads:2d} | batch {bs:2d} | {n / total:7.2f} frames/s | {total / n * 1000:8.1f} ms/frame")
+
+
+def bench_publish(opt):
+    """주기당 전송 시간: 슬롯별 requests.put (연결 재사용 없음) vs 연결 풀 슬롯별 동시 전송 vs 일괄 전송"""
+    import requests
+
+    from mock_backend import MockBackend
+    from parking_publisher import SlotStatusPublisher
+
+    server = MockBackend(latency_ms=opt.latency_ms).start()
+
+    def legacy(slots):
+        for slot in slots:
+            requests.put(f"{server.url}/parking-slots", json={'parkingLotId': 1, **slot}, timeout=10)
+
+    print(f"local stand-in server {server.url} (latency {opt.latency_ms} ms/request)")
+    try:
+        for n in opt.slots:
+            slots = [{'slotNumber': i + 1, 'isAvailable': bool(i % 2)} for i in range(n)]
+            row = []
+            for name, fn in (("legacy", legacy),
+                             ("per_slot", SlotStatusPublisher(server.url, mode="per_slot", max_workers=opt.workers).send),
+                             ("bulk", SlotStatusPublisher(server.url, mode="bulk").send)):
+                times = []
+                for _ in range(opt.cycles):
+                    server.reset()
+                    t = time.perf_counter()
+                    fn(slots) if name == "legacy" else fn(1, slots)
+                    times.append(time.perf_counter() - t)
+                row.append(f"{name} {statistics.median(times) * 1000:8.1f} ms ({len(server.requests)} req, {len(server.connections)} conn)")
+            print(f"{n:4d} slots | " + " | ".join(row))
+    finally:
+        server.stop()
+
+
+def bench_delta(opt):
+    """정상 상태 주기에서 매번 전체 전송 vs 변경분 + 주기적 전체 스냅샷 전송의 요청 본문 크기/슬롯 쓰기 수"""
+    import json
+
+    from mock_backend import MockBackend
+    from parking_publisher import SlotStatusPublisher
+
+    server = MockBackend().start()
+    rng = np.random.default_rng(0)
+    states = rng.random(opt.slots) < 0.5
+    history = []
+    for _ in range(opt.cycles):
+        states = states ^ (rng.random(opt.slots) < opt.change_rate)
+        history.append([{'slotNumber': i + 1, 'isAvailable': bool(a)} for i, a in enumerate(states)])
+
+    # 스냅샷 주기를 주기 수 기준으로 맞추기 위해 snapshot_interval 대신 ack 기록을 직접 만료
+    try:
+        for name in ("full", "delta"):
+            publisher = SlotStatusPublisher(server.url, mode="bulk", snapshot_interval=0 if name == "full" else float("inf"))
+            server.reset()
+            for i, slots in enumerate(history):
+                if name == "delta" and i % opt.snapshot_every == 0:
+                    publisher.last_snapshot.clear()
+                publisher.publish(1, slots)
+            publisher.close()
+            payload_bytes = sum(len(json.dumps(p)) for _, _, p in server.requests)
+            writes = sum(len(p['slots']) for _, _, p in server.requests)
+            print(f"{name:<6} {len(server.requests):4d} requests | {payload_bytes / 1024:9.1f} KB | {writes:7d} slot writes")
+    finally:
+        server.stop()
+
+
+def bench_queue(opt):
+    """느리고 불안정한 백엔드에서 동기 전송 vs 비동기 전송 큐: 분석 루프가 전송에 막히는 시간, 장애 후 spool 복구"""
+    import tempfile
+
+    from mock_backend import MockBackend
+    from parking_publisher import PublishQueue, SlotStatusPublisher
+
+    server = MockBackend(latency_ms=opt.latency_ms, failure_rate=opt.failure_rate).start()
+    rng = np.random.default_rng(0)
+    states = rng.random(opt.slots) < 0.5
+    history = []
+    for _ in range(opt.cycles):
+        states = states ^ (rng.random(opt.slots) < 0.05)
+        history.append([{'slotNumber': i + 1, 'isAvailable': bool(a)} for i, a in enumerate(states)])
+
+    print(f"mock backend: latency {opt.latency_ms} ms, failure rate {opt.failure_rate:.0%}, {opt.cycles} cycles")
+    try:
+        # 1. 동기 전송 (분석 루프가 응답을 기다림)
+        publisher = SlotStatusPublisher(server.url, mode="bulk")
+        times = []
+        for slots in history:
+            t = time.perf_counter()
+            publisher.publish(1, slots)
+            times.append(time.perf_counter() - t)
+        summarize("sync", times)
+
+        # 2. 비동기 큐 (중간에 장애 구간을 넣고 spool 복구 확인)
+        spool_dir = tempfile.mkdtemp(prefix="publish_spool_")
+        publisher = SlotStatusPublisher(server.url, mode="bulk")
+        queue = PublishQueue(publisher, backoff_base=0.05, backoff_max=0.5, spool_dir=spool_dir)
+        outage = range(opt.cycles // 3, 2 * opt.cycles // 3)
+        times, spooled_during_outage = [], 0
+        for i, slots in enumerate(history):
+            server.down = i in outage
+            t = time.perf_counter()
+            queue.submit("publish", 1, slots)
+            times.append(time.perf_counter() - t)
+            time.sleep(opt.cycle_ms / 1000)  # 다음 주기 분석
+            if i in outage:
+                spooled_during_outage = max(spooled_during_outage, len(os.listdir(queue.spool_dir)))
+        server.down = False
+        drained = queue.flush(timeout=30)
+        queue.close()
+        summarize("async", times, **{"stats": queue.stats})
+        final = {(1, s['slotNumber']): (s['isAvailable'],) for s in history[-1]}
+        consistent = all(publisher.acked.get(k) == v for k, v in final.items())
+        print(f"outage spool files {spooled_during_outage} | drained {drained} | spool left {len(os.listdir(queue.spool_dir))} | "
+              f"backend consistent with last cycle: {consistent} | injected failures {server.failures}")
+    finally:
+        server.stop()
+
+
+def bench_scheduler(opt):
+    """작업 후 sleep(interval) 루프 vs monotonic deadline 스케줄러: 누적 drift, overrun 처리 (skip / coalesce)"""
+    import logging
+
+    from deadline_scheduler import DeadlineScheduler
+
+    logging.getLogger("deadline_scheduler").setLevel(logging.ERROR)  # overrun 경고는 지표로 확인
+    interval, job_s = opt.interval, opt.job_ms / 1000
+
+    # 1. 작업 실행 후 interval만큼 sleep (실행 시간만큼 매 주기 밀림)
+    start = time.monotonic()
+    starts = []
+    for _ in range(opt.ticks):
+        starts.append(time.monotonic() - start)
+        time.sleep(job_s)
+        time.sleep(interval)
+    drift = (starts[-1] - (opt.ticks - 1) * interval) * 1000
+    print(f"sleep loop   drift after {opt.ticks} ticks: {drift:8.1f} ms")
+
+    # 2. deadline 스케줄러 (정상 작업 1개 + 주기를 넘기는 작업 2개)
+    scheduler = DeadlineScheduler(max_workers=3)
+    scheduler.add_job("steady", lambda: time.sleep(job_s), interval)
+    scheduler.add_job("overrun_skip", lambda: time.sleep(interval * 2.5), interval, overrun_policy="skip")
+    scheduler.add_job("overrun_coalesce", lambda: time.sleep(interval * 2.5), interval, overrun_policy="coalesce")
+    scheduler.start()
+    time.sleep(interval * opt.ticks)
+    scheduler.stop()
+    for name, m in scheduler.metrics().items():
+        print(f"{name:<17} runs {m['runs']:3d} | skipped {m['skipped']:3d} | coalesced {m['coalesced']:3d} | "
+              f"lateness mean {m['lateness_ms']['mean']:7.1f} ms max {m['lateness_ms']['max']:7.1f} ms | "
+              f"duration mean {m['duration_ms']['mean']:7.1f} ms")
+
+
+def bench_gate(opt):
+    """변화 감지 게이트: 노이즈/밝기 변화만 있는 주기는 생략하고 슬롯에 차량이 드나든 주기는 추론하는지, 판단 비용"""
+    import cv2
+
+    from frame_gate import FrameChangeGate
+    from slot_occupancy import SlotGeometry
+
+    rng = np.random.default_rng(0)
+    w, h = opt.size
+    slots, _ = synthetic_lot(opt.slots, 0, w, h)
+    geometry = SlotGeometry(slots)
+    scene = cv2.GaussianBlur(rng.integers(0, 255, (h, w, 3), dtype=np.uint8), (31, 31), 0)
+    gate = FrameChangeGate()
+
+    times, missed, changes = [], 0, 0
+    for i in range(opt.cycles):
+        changed = False
+        if i > 0 and rng.random() < opt.change_prob:
+            # 임의 슬롯에 차량 크기의 어둡거나 밝은 사각형을 넣음 (배경 평균 밝기 ~127)
+            x0, y0, x1, y1 = np.clip(geometry.bounds[rng.integers(len(geometry))], 0, None).astype(int)
+            before = scene[y0:y1, x0:x1].mean()
+            scene[y0:y1, x0:x1] = rng.choice([40, 210]) + rng.integers(-20, 21, 3)
+            changed = abs(scene[y0:y1, x0:x1].mean() - before) > 30  # 같은 슬롯을 비슷한 색으로 다시 칠한 경우는 변화 아님
+            changes += changed
+        frame = scene.astype(np.int16) + rng.normal(0, opt.noise, scene.shape).astype(np.int16) + int(rng.integers(-15, 16))
+        frame = np.clip(frame, 0, 255).astype(np.uint8)
+        t = time.perf_counter()
+        infer = gate.should_infer(frame, geometry)
+        times.append(time.perf_counter() - t)
+        if infer:
+            gate.update()
+        elif changed:
+            missed += 1
+
+    summarize("gate check", times, **gate.summary(), **{"slot changes": changes, "missed": missed})
+
+
+def random_checkpoint(path: str, model) -> str:
+    """무작위 초기화 모델을 attempt_load 형식 체크포인트로 저장 (가중치 없이 지연 시간만 측정할 때)"""
+    import torch
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    torch.save({'model': model}, path)
+    return path
+
+
+def synthetic_grid_frames(n_slots: int, n_frames: int, width: int = 1920, height: int = 1080, seed: int = 0):
+    """격자형 주차장 합성 프레임: (슬롯 목록, 프레임 목록, 프레임별 슬롯 점유 정답 (F, S))"""
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    cols = int(np.ceil(np.sqrt(n_slots * width / height)))
+    rows = int(np.ceil(n_slots / cols))
+    sw, sh = width / cols, height / rows
+    slots = []
+    for i in range(n_slots):
+        x0, y0 = (i % cols) * sw + sw * 0.1, (i // cols) * sh + sh * 0.1
+        quad = np.array([[x0, y0], [x0 + sw * 0.8, y0], [x0 + sw * 0.8, y0 + sh * 0.8], [x0, y0 + sh * 0.8]])
+        slots.append({'slot_id': f"slot_{i + 1}", 'coords': quad.round().astype(int).tolist()})
+
+    background = cv2.GaussianBlur(rng.integers(60, 200, (height, width, 3), dtype=np.uint8), (31, 31), 0)
+    frames, truth = [], rng.random((n_frames, n_slots)) < 0.5
+    for occupied in truth:
+        frame = background.copy()
+        for slot, car in zip(slots, occupied):
+            if car:
+                (x0, y0), (x1, y1) = slot['coords'][0], slot['coords'][2]
+                mx, my = (x1 - x0) // 6, (y1 - y0) // 6
+                cv2.rectangle(frame, (x0 + mx, y0 + my), (x1 - mx, y1 - my), rng.integers(0, 255, 3).tolist(), -1)
+        frames.append(frame)
+    return slots, frames, truth
+
+
+def labelled_frames(roi_path: str, images: str, roi_key: str):
+    """라벨링된 프레임(YOLO images/ + labels/)과 ROI로 (슬롯 목록, 프레임 목록, 정답 (F, S), -1은 애매해서 제외)"""
+    import json
+    from pathlib import Path
+
+    import cv2
+
+    from slot_classifier import slot_labels_from_boxes
+    from slot_occupancy import SlotGeometry
+    from utils.dataloaders import IMG_FORMATS, img2label_paths
+
+    with open(roi_path, 'r', encoding='utf-8') as f:
+        slots = json.load(f)[roi_key]
+    geometry = SlotGeometry(slots)
+    files = sorted(str(p) for p in Path(images).rglob("*") if p.suffix[1:].lower() in IMG_FORMATS)
+    frames, truth = [], []
+    for file, label_file in zip(files, img2label_paths(files)):
+        frame = cv2.imread(file)
+        if frame is None or not os.path.isfile(label_file):
+            continue
+        h, w = frame.shape[:2]
+        labels = np.loadtxt(label_file, ndmin=2).reshape(-1, 5)
+        xc, yc, bw, bh = labels[:, 1] * w, labels[:, 2] * h, labels[:, 3] * w, labels[:, 4] * h
+        boxes = np.stack((xc - bw / 2, yc - bh / 2, xc + bw / 2, yc + bh / 2), axis=1)
+        frames.append(frame)
+        truth.append(slot_labels_from_boxes(geometry, boxes))
+    return slots, frames, np.asarray(truth).reshape(len(frames), len(slots))
+
+
+def bench_classifier(opt):
+    """전체 프레임 탐지 + 슬롯 IoU 경로 vs 슬롯 패치 배치 분류 경로 (프레임당 지연 시간, 슬롯 정확도)"""
+    from models.yolo import ClassificationModel, Model
+    from parking_detector import VEHICLE_CLASSES, VehicleDetector
+    from slot_classifier import SlotClassifier
+    from slot_occupancy import SlotGeometry
+
+    weights, classifier_weights = opt.weights, opt.classifier
+    if not os.path.isfile(weights):
+        weights = random_checkpoint("runs/bench/random_detector.pt", Model(opt.cfg).eval())
+        print(f"weights not found, using random {opt.cfg} (accuracy not meaningful)")
+    if not classifier_weights or not os.path.isfile(classifier_weights):
+        model = ClassificationModel(model=Model(opt.cls_cfg), nc=2, cutoff=10).eval()
+        model.names = ["free", "occupied"]
+        classifier_weights = random_checkpoint("runs/bench/random_slot_classifier.pt", model)
+        print(f"classifier not found, using random {opt.cls_cfg} backbone (accuracy not meaningful)")
+    detector = VehicleDetector(weights, device=opt.device)
+    classifier = SlotClassifier(classifier_weights, device=opt.device, imgsz=opt.patch)
+
+    if opt.images:
+        cases = [labelled_frames(opt.roi, opt.images, opt.roi_key)]
+    else:
+        cases = [synthetic_grid_frames(n, opt.frames, *opt.size) for n in opt.slots]
+
+    for slots, frames, truth in cases:
+        geometry = SlotGeometry(slots)
+        valid = truth >= 0
+        detector.detect(frames[0]), classifier.predict(frames[0], geometry)  # 워밍업
+        det_times, cls_times, det_pred, cls_pred = [], [], [], []
+        for frame in frames:
+            t = time.perf_counter()
+            det = detector.detect(frame)
+            vehicles = det[np.isin(det[:, 5], VEHICLE_CLASSES)]
+            max_iou, _ = geometry.max_iou(vehicles[:, :4])
+            det_times.append(time.perf_counter() - t)
+            det_pred.append(max_iou >= 0.17)
+
+            t = time.perf_counter()
+            prob = classifier.predict(frame, geometry)
+            cls_times.append(time.perf_counter() - t)
+            cls_pred.append(prob >= classifier.threshold)
+
+        print(f"{len(slots)} slots x {len(frames)} frames")
+        for name, times, pred in (("detector", det_times, det_pred), ("classifier", cls_times, cls_pred)):
+            accuracy = (np.asarray(pred) == truth.astype(bool))[valid].mean() if valid.any() else float("nan")
+            summarize(name, times, accuracy=f"{accuracy:.3f}")
+
+
+def bench_smoothing(opt):
+    """원시 임계값 vs 평활화 슬롯 상태: 상태 변경(= 백엔드 쓰기) 수, 정답 일치율, 갱신 비용"""
+    from slot_state import SlotStateTracker
+
+    rng = np.random.default_rng(0)
+    truth = rng.random(opt.slots) < 0.5
+    tracker = SlotStateTracker([f"slot_{i + 1}" for i in range(opt.slots)])
+    raw_prev = None
+    times, raw_changes, true_changes, raw_correct, smooth_correct = [], 0, 0, 0, 0
+    for _ in range(opt.cycles):
+        flips = rng.random(opt.slots) < opt.change_rate
+        truth ^= flips
+        true_changes += int(flips.sum())
+        # 점유 슬롯은 IoU ~0.45에 가끔 탐지 누락(0), 빈 슬롯은 가끔 오탐(0.2~0.4)
+        scores = np.where(truth, rng.normal(0.45, 0.08, opt.slots), 0.0)
+        scores[truth & (rng.random(opt.slots) < opt.dropout)] = 0.0
+        fp = ~truth & (rng.random(opt.slots) < opt.false_positive)
+        scores[fp] = rng.uniform(0.2, 0.4, int(fp.sum()))
+
+        raw = scores >= 0.17
+        if raw_prev is not None:
+            raw_changes += int((raw != raw_prev).sum())
+        raw_prev = raw
+        t = time.perf_counter()
+        state = tracker.update(scores)
+        times.append(time.perf_counter() - t)
+        raw_correct += int((raw == truth).sum())
+        smooth_correct += int((state == truth).sum())
+
+    total = opt.slots * opt.cycles
+    print(f"{opt.slots} slots x {opt.cycles} cycles | true changes {true_changes}")
+    print(f"raw        state changes {raw_changes:7d} | agreement {raw_correct / total:.4f}")
+    print(f"smoothed   state changes {tracker.stats['state_changes']:7d} | agreement {smooth_correct / total:.4f}")
+    summarize("update", times)
+
+
+def bench_store(opt):
+    """주기별 JSON 파일 vs 시계열 저장소: 기록 비용, 디스크 사용량, 구간 점유율/슬롯 이용률 조회 시간"""
+    import glob
+    import json
+    import tempfile
+    from datetime import datetime
+
+    from occupancy_store import OccupancyStore
+
+    rng = np.random.default_rng(0)
+    slot_ids = [f"slot_{i + 1}" for i in range(opt.slots)]
+    start = datetime(2025, 6, 1).timestamp()
+    states = rng.random(opt.slots) < 0.5
+    with tempfile.TemporaryDirectory() as tmp:
+        store = OccupancyStore(os.path.join(tmp, "occupancy.db"))
+        json_times, store_times = [], []
+        for k in range(opt.cycles):
+            states ^= rng.random(opt.slots) < 0.02
+            ts = datetime.fromtimestamp(start + k * opt.interval)
+            slot_status = [{'slot_id': slot_id, 'occupied': bool(occupied), 'max_iou': 0.0}
+                           for slot_id, occupied in zip(slot_ids, states)]
+            t = time.perf_counter()
+            with open(os.path.join(tmp, f"occupancy_result_{ts.strftime('%Y%m%d_%H%M%S')}.json"), 'w') as f:
+                json.dump({'timestamp': ts.isoformat(), 'slot_status': slot_status}, f, indent=2)
+            json_times.append(time.perf_counter() - t)
+            t = time.perf_counter()
+            store.append_slot_status("lot", ts, slot_status)
+            store_times.append(time.perf_counter() - t)
+
+        files = sorted(glob.glob(os.path.join(tmp, "*.json")))
+        json_mb = sum(os.path.getsize(f) for f in files) / 1024 ** 2
+        db_mb = sum(os.path.getsize(f) for f in glob.glob(os.path.join(tmp, "occupancy.db*"))) / 1024 ** 2
+        print(f"{opt.slots} slots x {opt.cycles} cycles | JSON {json_mb:.1f} MB ({len(files)} files) | store {db_mb:.2f} MB")
+        summarize("json write", json_times)
+        summarize("store append", store_times)
+
+        # 마지막 하루 구간: 파일 스캔(이름으로 구간 선택 후 파싱) vs 저장소 범위 조회
+        t1, t2 = start + (opt.cycles * opt.interval - 86400), start + opt.cycles * opt.interval
+        times = {'json scan': [], 'store occ': [], 'store util': []}
+        for _ in range(opt.repeats):
+            t = time.perf_counter()
+            rows = []
+            for path in files:
+                ts = datetime.strptime(os.path.basename(path)[17:32], "%Y%m%d_%H%M%S").timestamp()
+                if t1 <= ts < t2:
+                    with open(path) as f:
+                        rows.append([slot['occupied'] for slot in json.load(f)['slot_status']])
+            util = np.asarray(rows).mean(0)
+            times['json scan'].append(time.perf_counter() - t)
+            t = time.perf_counter()
+            occupancy = store.occupancy("lot", t1, t2)
+            times['store occ'].append(time.perf_counter() - t)
+            t = time.perf_counter()
+            store.slot_utilization("lot", t1, t2)
+            times['store util'].append(time.perf_counter() - t)
+        print(f"range query: {len(occupancy['timestamps'])} samples, mean utilization {util.mean():.3f}")
+        for name, values in times.items():
+            summarize(name, values)
+        store.close()
+
+
+def bench_analytics(opt):
+    """이력 재계산 vs 증분 집계: append 비용, 대시보드 조회(시간별 점유율, 일별 슬롯 지표, 피크) 시간"""
+    import tempfile
+    from datetime import datetime
+
+    from occupancy_analytics import bucket_starts
+    from occupancy_store import OccupancyStore
+
+    rng = np.random.default_rng(0)
+    slot_ids = [f"slot_{i + 1}" for i in range(opt.slots)]
+    start = datetime(2025, 6, 1).timestamp()
+    cycles = int(opt.days * 86400 / opt.interval)
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = OccupancyStore(os.path.join(tmp, "plain.db"))
+        store = OccupancyStore(os.path.join(tmp, "analytics.db"), analytics=True)
+        states = rng.random(opt.slots) < 0.5
+        plain_times, store_times = [], []
+        for k in range(cycles):
+            states ^= rng.random(opt.slots) < 0.03
+            ts = start + k * opt.interval
+            t = time.perf_counter()
+            plain.append("lot", ts, slot_ids, states)
+            plain_times.append(time.perf_counter() - t)
+            t = time.perf_counter()
+            store.append("lot", ts, slot_ids, states)
+            store_times.append(time.perf_counter() - t)
+        print(f"{opt.slots} slots x {cycles} cycles ({opt.days} days, {opt.interval:.0f}s interval)")
+        summarize("append", plain_times)
+        summarize("+analytics", store_times)
+
+        def recompute():
+            """저장된 이력을 모두 읽어 시간별 점유율 + 슬롯별 이용률/회전수 계산"""
+            data = plain.states("lot")
+            ts, occ = data['timestamps'], data['occupied']
+            gaps = np.diff(ts)
+            hours, inverse = np.unique(bucket_starts(ts[:-1], 'hour'), return_inverse=True)
+            busy = np.bincount(inverse, weights=(occ[:-1] * gaps[:, None]).sum(1), minlength=len(hours))
+            seen = np.bincount(inverse, weights=gaps * occ.shape[1], minlength=len(hours))
+            turnover = (~occ[:-1] & occ[1:]).sum(0)
+            return busy / seen, (occ[:-1] * gaps[:, None]).sum(0) / gaps.sum(), turnover
+
+        analytics = store.analytics
+        times = {'recompute': [], 'lot hourly': [], 'slot daily': [], 'peaks': []}
+        for _ in range(opt.repeats):
+            t = time.perf_counter()
+            hourly, _, _ = recompute()
+            times['recompute'].append(time.perf_counter() - t)
+            t = time.perf_counter()
+            stats = analytics.lot_stats("lot", 'hour')
+            times['lot hourly'].append(time.perf_counter() - t)
+            t = time.perf_counter()
+            analytics.slot_summary("lot", period='day')
+            times['slot daily'].append(time.perf_counter() - t)
+            t = time.perf_counter()
+            analytics.peak_windows("lot", top=5)
+            times['peaks'].append(time.perf_counter() - t)
+        diff = np.nanmax(np.abs(stats['utilization'][:len(hourly)] - hourly))
+        print(f"hourly buckets {len(stats['buckets'])} | max |incremental - recompute| {diff:.2e}")
+        for name, values in times.items():
+            summarize(name, values)
+        plain.close()
+        store.close()
+
+
+def bench_backfill(opt):
+    """영상 아카이브 백필 처리량 (워커 프로세스 수별, 워커당 torch 스레드 = CPU 수 / 워커 수)"""
+    import json
+    import shutil
+
+    from parking_backfill import run_backfill
+
+    video_dir = os.path.join(opt.out, "videos")
+    os.makedirs(video_dir, exist_ok=True)
+    source = make_synthetic_video(os.path.join(opt.out, "synthetic.mp4"), opt.duration, opt.fps, tuple(opt.size))
+    for i in range(opt.videos):
+        target = os.path.join(video_dir, f"cam_20250601_{i:02d}0000.mp4")
+        if not os.path.exists(target):
+            shutil.copy(source, target)
+    roi_path = os.path.join(opt.out, "synthetic_roi.json")
+    with open(roi_path, "w", encoding="utf-8") as f:
+        json.dump({"synthetic": synthetic_lot(50, 0, *opt.size)[0]}, f)
+    weights = opt.weights
+    if not os.path.isfile(weights):
+        # 가중치가 없으면 같은 구조의 무작위 초기화 모델로 처리량만 측정
+        from models.yolo import Model
+        weights = random_checkpoint(os.path.join(opt.out, "random.pt"), Model(opt.cfg).eval())
+        print(f"weights not found, using random {opt.cfg}")
+
+    print(f"{opt.videos} videos x {opt.duration:.0f}s, interval {opt.interval:.0f}s, {os.cpu_count()} CPUs")
+    base = None
+    for workers in opt.workers:
+        summary = run_backfill(video_dir, roi_path, weights, os.path.join(opt.out, f"run_w{workers}"),
+                               interval=opt.interval, segment_minutes=opt.segment_minutes, workers=workers,
+                               imgsz=opt.imgsz, restart=True)
+        rate = summary['samples_per_second']
+        base = base or rate
+        print(f"workers {workers:2d} | {summary['samples']} samples in {summary['seconds']:7.1f} s | "
+              f"{rate:7.2f} samples/s | speedup x{rate / base:.2f}")
+
+
+def bench_roi_transform(opt):
+    """슬롯별 Python 루프 오프셋/스케일 vs 전체 ROI 일괄 행렬 변환 (homography 포함)"""
+    from roi_transform import compose, fit_transform, resize_matrix, transform_roi, translation
+
+    lot = synthetic_lot(opt.slots, 0, 2556, 1179)[0]
+    roi_data = {f"camera{i}.jpg": lot for i in range(opt.cameras)}
+    video_width, video_height, y_offset = 1920, 1080, 150
+
+    def loop_adjust():
+        # fine_tune_roi.py / adjust_roi_manual.py와 같은 꼭짓점별 루프
+        adjusted = {}
+        for key, slots in roi_data.items():
+            adjusted[key] = [{'slot_id': slot['slot_id'],
+                              'coords': [[max(0, min(int(x / 2556 * video_width), video_width - 1)),
+                                          max(0, min(int(y / 1179 * video_height) - y_offset, video_height - 1))]
+                                         for x, y in slot['coords']]} for slot in slots]
+        return adjusted
+
+    matrix = compose(resize_matrix((2556, 1179), (video_width, video_height)), translation(0, -y_offset))
+    times = {'loop': [], 'matrix': [], 'fit+homography': []}
+    rng = np.random.default_rng(0)
+    src = rng.uniform(0, (2556, 1179), (8, 2))
+    for _ in range(opt.repeats):
+        t = time.perf_counter()
+        expected = loop_adjust()
+        times['loop'].append(time.perf_counter() - t)
+        t = time.perf_counter()
+        result = transform_roi(roi_data, matrix, clip_size=(video_width, video_height), rounding="trunc")
+        times['matrix'].append(time.perf_counter() - t)
+        t = time.perf_counter()
+        homography, _ = fit_transform(src, src + rng.normal(0, 2, src.shape) + (3, -5))
+        transform_roi(roi_data, homography, clip_size=(2556, 1179))
+        times['fit+homography'].append(time.perf_counter() - t)
+    same = all(a['coords'] == b['coords'] for key in roi_data for a, b in zip(expected[key], result[key]))
+    print(f"{opt.cameras} cameras x {opt.slots} slots | same result as loop: {same}")
+    for name, values in times.items():
+        summarize(name, values)
+
+
+def bench_shift(opt):
+    """카메라 이동 감지: 임의 이동/회전에 대한 재정합 판단 정확도, 재투영 오차, 검사 비용 (추론 1회 대비)"""
+    import cv2
+    import torch
+
+    from camera_shift import CameraShiftMonitor
+    from models.yolo import Model
+    from roi_transform import apply_transform, compose, rotation, translation
+    from slot_occupancy import SlotGeometry
+
+    w, h = opt.size
+    slots, frames, _ = synthetic_grid_frames(opt.slots, opt.trials + 1, w, h)
+    geometry = SlotGeometry(slots)
+    for frame in frames:  # 주차선 (실제 주차장에서 특징점이 잡히는 고정 구조물)
+        cv2.polylines(frame, [np.asarray(c, dtype=np.int32).reshape(-1, 1, 2) for c in geometry.coords], True, (235, 235, 235), 3)
+    monitor = CameraShiftMonitor(frames[0], check_interval=0)
+
+    rng = np.random.default_rng(1)
+    times, errors, correct = [], [], 0
+    for frame in frames[1:]:
+        shifted = rng.random() < 0.5
+        matrix = np.eye(3)
+        if shifted:
+            matrix = compose(rotation(rng.uniform(-1.5, 1.5), (w / 2, h / 2)), translation(*rng.uniform(-25, 25, 2)))
+        live = cv2.warpPerspective(frame, matrix, (w, h), borderMode=cv2.BORDER_REPLICATE)
+        monitor.matrix = None  # 시행마다 기준 상태에서 판단
+        t = time.perf_counter()
+        monitor.check(live, geometry, force=True)
+        times.append(time.perf_counter() - t)
+        truth = monitor.drift(matrix, geometry.points) > monitor.drift_threshold
+        correct += (monitor.matrix is not None) == truth
+        if monitor.matrix is not None:
+            errors.append(np.linalg.norm(monitor.project(geometry).points - apply_transform(geometry.points, matrix), axis=1).mean())
+
+    model = Model(opt.cfg).eval()
+    x = torch.zeros(1, 3, opt.imgsz, opt.imgsz)
+    with torch.no_grad():
+        model(x)
+        t = time.perf_counter()
+        model(x)
+        infer_ms = (time.perf_counter() - t) * 1000
+    summarize("shift check", times, **{"correct": f"{correct}/{opt.trials}",
+                                       "reproj err px": round(float(np.mean(errors)), 2) if errors else None,
+                                       "inference ms": round(infer_ms, 1)})
+
+
+def bench_suggest(opt):
+    """누적 탐지 기반 ROI 슬롯 제안: 탐지 수별 처리 시간과 정답 슬롯 재현율/꼭짓점 오차"""
+    from roi_suggest import suggest_slots
+
+    w, h = 1920, 1080
+    rng = np.random.default_rng(0)
+    cols = int(np.ceil(np.sqrt(opt.slots * w / h)))
+    rows = int(np.ceil(opt.slots / cols))
+    sw, sh = w / cols, h / rows
+    i = np.arange(opt.slots)
+    x0, y0 = (i % cols) * sw + sw * 0.1, (i // cols) * sh + sh * 0.1
+    truth = np.stack((x0, y0, x0 + sw * 0.8, y0 + sh * 0.8), axis=1)
+
+    occupied = rng.random((opt.frames, opt.slots)) < 0.5
+    frame_ids, slot_ids = np.nonzero(occupied)
+    boxes = truth[slot_ids] + rng.normal(0, 0.05 * min(sw, sh), (len(slot_ids), 4))
+    n_noise = len(boxes) // 10  # 지나가는 차량 / 오탐
+    xy = rng.uniform((0, 0), (w, h), (n_noise, 2))
+    boxes = np.concatenate((boxes, np.concatenate((xy, xy + rng.uniform(0.5, 1.0, (n_noise, 2)) * (sw, sh)), axis=1)))
+    frame_ids = np.concatenate((frame_ids, rng.integers(0, opt.frames, n_noise)))
+
+    times = []
+    for _ in range(opt.repeats):
+        t = time.perf_counter()
+        slots = suggest_slots(boxes, frame_ids, (w, h), n_frames=opt.frames)
+        times.append(time.perf_counter() - t)
+    found = np.array([[s['coords'][0][0], s['coords'][0][1], s['coords'][2][0], s['coords'][2][1]] for s in slots])
+    error = np.abs(found[:, None] - truth[None]).max(axis=2) if len(found) else np.zeros((0, len(truth)))
+    matched = error.min(axis=0) <= 0.1 * min(sw, sh) if len(found) else np.zeros(len(truth), dtype=bool)
+    summarize("suggest", times, **{"detections": len(boxes), "suggested": len(slots),
+                                   "recall": f"{matched.sum()}/{opt.slots}",
+                                   "max corner err px": round(float(error.min(axis=0)[matched].max()), 1) if matched.any() else None})
+
+
+def parse_opt():
+    """명령행 인자 파싱"""
+    parser = argparse.ArgumentParser(description="주차장 분석 파이프라인 벤치마크")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("inference", help="subprocess vs resident 추론 주기 비교")
+    p.add_argument("--weights", type=str, default="best_macos.pt", help="모델 경로")
+    p.add_argument("--image", type=str, default="frame_30min.jpg", help="분석할 이미지")
+    p.add_argument("--cycles", type=int, default=10, help="측정 주기 수")
+    p.set_defaults(func=bench_inference)
+
+    p = sub.add_parser("occupancy", help="shapely vs 벡터화 슬롯 IoU 행렬")
+    p.add_argument("--slots", type=int, default=500, help="슬롯 수")
+    p.add_argument("--detections", type=int, default=300, help="탐지 수")
+    p.add_argument("--repeats", type=int, default=3, help="반복 횟수")
+    p.set_defaults(func=bench_occupancy)
+
+    p = sub.add_parser("sampler", help="reopen+seek vs 순차 grab() 프레임 샘플링")
+    p.add_argument("--video", type=str, default="runs/bench/synthetic_1h.mp4", help="합성 영상 경로 (없으면 생성)")
+    p.add_argument("--duration", type=float, default=3600, help="합성 영상 길이 (초)")
+    p.add_argument("--fps", type=float, default=10, help="합성 영상 FPS")
+    p.add_argument("--size", type=int, nargs=2, default=[640, 360], help="합성 영상 크기 (w h)")
+    p.add_argument("--interval", type=float, default=180, help="샘플링 간격 (초)")
+    p.set_defaults(func=bench_sampler)
+
+    p = sub.add_parser("preprocess", help="cv2.resize vs letterbox 버퍼 재사용 전처리 (tracemalloc)")
+    p.add_argument("--size", type=int, nargs=2, default=[1920, 1080], help="프레임 크기 (w h)")
+    p.add_argument("--batch", type=int, default=4, help="배치 크기")
+    p.add_argument("--iterations", type=int, default=50, help="반복 횟수")
+    p.set_defaults(func=bench_preprocess)
+
+    p = sub.add_parser("publish", help="슬롯 수별 주기당 백엔드 전송 시간")
+    p.add_argument("--slots", type=int, nargs="+", default=[50, 100, 200, 400], help="슬롯 수 목록")
+    p.add_argument("--latency-ms", type=float, default=2, help="대역 서버 요청별 지연 (ms)")
+    p.add_argument("--workers", type=int, default=8, help="per_slot 동시 요청 수")
+    p.add_argument("--cycles", type=int, default=3, help="슬롯 수별 반복 주기")
+    p.set_defaults(func=bench_publish)
+
+    p = sub.add_parser("delta", help="전체 전송 vs 변경분 전송 (본문 크기, 슬롯 쓰기 수)")
+    p.add_argument("--slots", type=int, default=200, help="슬롯 수")
+    p.add_argument("--cycles", type=int, default=100, help="주기 수")
+    p.add_argument("--change-rate", type=float, default=0.03, help="주기당 상태가 바뀌는 슬롯 비율")
+    p.add_argument("--snapshot-every", type=int, default=20, help="전체 스냅샷 주기 (주기 수, 3분 간격이면 20 = 1시간)")
+    p.set_defaults(func=bench_delta)
+
+    p = sub.add_parser("queue", help="동기 전송 vs 비동기 전송 큐 (지연/실패 주입 대역 서버)")
+    p.add_argument("--slots", type=int, default=200, help="슬롯 수")
+    p.add_argument("--cycles", type=int, default=40, help="주기 수")
+    p.add_argument("--cycle-ms", type=float, default=50, help="주기당 분석 시간 흉내 (ms)")
+    p.add_argument("--latency-ms", type=float, default=300, help="대역 서버 요청별 지연 (ms)")
+    p.add_argument("--failure-rate", type=float, default=0.3, help="대역 서버 무작위 503 확률")
+    p.set_defaults(func=bench_queue)
+
+    p = sub.add_parser("scheduler", help="sleep 루프 vs deadline 스케줄러 (drift, overrun)")
+    p.add_argument("--interval", type=float, default=0.2, help="작업 주기 (초)")
+    p.add_argument("--job-ms", type=float, default=50, help="정상 작업 실행 시간 (ms)")
+    p.add_argument("--ticks", type=int, default=25, help="주기 수")
+    p.set_defaults(func=bench_scheduler)
+
+    p = sub.add_parser("gate", help="변화 감지 게이트 생략률/놓친 변화/판단 비용")
+    p.add_argument("--slots", type=int, default=60, help="슬롯 수")
+    p.add_argument("--size", type=int, nargs=2, default=[1920, 1080], help="프레임 크기 (w h)")
+    p.add_argument("--cycles", type=int, default=200, help="주기 수")
+    p.add_argument("--change-prob", type=float, default=0.1, help="주기당 슬롯 변화 확률")
+    p.add_argument("--noise", type=float, default=6, help="센서 노이즈 표준편차")
+    p.set_defaults(func=bench_gate)
+
+    p = sub.add_parser("classifier", help="전체 프레임 탐지 vs 슬롯 패치 분류 (지연 시간, 정확도)")
+    p.add_argument("--weights", type=str, default="best_macos.pt", help="탐지 모델 경로")
+    p.add_argument("--classifier", type=str, default="", help="슬롯 분류 모델 경로 (없으면 무작위 초기화)")
+    p.add_argument("--cfg", type=str, default="models/yolov5s.yaml", help="탐지 가중치가 없을 때 사용할 모델 구조")
+    p.add_argument("--cls-cfg", type=str, default="models/yolov5n.yaml", help="분류 가중치가 없을 때 사용할 backbone 구조")
+    p.add_argument("--patch", type=int, default=64, help="슬롯 패치 크기 (픽셀)")
+    p.add_argument("--roi", type=str, default="roi_full_rect_coords.json", help="ROI 좌표 JSON (--images와 함께 사용)")
+    p.add_argument("--roi-key", type=str, default="frame_30min.jpg", help="ROI 키")
+    p.add_argument("--images", type=str, default="", help="라벨링된 프레임 디렉터리 (없으면 합성 격자 주차장)")
+    p.add_argument("--slots", type=int, nargs="+", default=[50, 200, 800], help="합성 주차장 슬롯 수 목록")
+    p.add_argument("--frames", type=int, default=5, help="합성 프레임 수")
+    p.add_argument("--size", type=int, nargs=2, default=[1920, 1080], help="합성 프레임 크기 (w h)")
+    p.add_argument("--device", type=str, default="cpu", help="추론 장치")
+    p.set_defaults(func=bench_classifier)
+
+    p = sub.add_parser("smoothing", help="원시 임계값 vs EWMA/hysteresis 슬롯 상태 (상태 변경 수, 갱신 비용)")
+    p.add_argument("--slots", type=int, default=5000, help="슬롯 수")
+    p.add_argument("--cycles", type=int, default=200, help="주기 수")
+    p.add_argument("--change-rate", type=float, default=0.01, help="주기당 실제 상태가 바뀌는 슬롯 비율")
+    p.add_argument("--dropout", type=float, default=0.05, help="점유 슬롯의 탐지 누락 확률")
+    p.add_argument("--false-positive", type=float, default=0.02, help="빈 슬롯의 오탐 확률")
+    p.set_defaults(func=bench_smoothing)
+
+    p = sub.add_parser("store", help="주기별 JSON 파일 vs SQLite 시계열 저장소 (기록, 용량, 구간 조회)")
+    p.add_argument("--slots", type=int, default=200, help="슬롯 수")
+    p.add_argument("--cycles", type=int, default=4800, help="기록 주기 수")
+    p.add_argument("--interval", type=float, default=180, help="주기 간격 (초)")
+    p.add_argument("--repeats", type=int, default=3, help="조회 반복 횟수")
+    p.set_defaults(func=bench_store)
+
+    p = sub.add_parser("analytics", help="이력 재계산 vs 증분 집계 (append 비용, 대시보드 조회 시간)")
+    p.add_argument("--slots", type=int, default=200, help="슬롯 수")
+    p.add_argument("--days", type=float, default=30, help="기록 기간 (일)")
+    p.add_argument("--interval", type=float, default=180, help="주기 간격 (초)")
+    p.add_argument("--repeats", type=int, default=5, help="조회 반복 횟수")
+    p.set_defaults(func=bench_analytics)
+
+    p = sub.add_parser("backfill", help="영상 아카이브 백필 처리량 (워커 프로세스 수별)")
+    p.add_argument("--weights", type=str, default="best_macos.pt", help="모델 경로")
+    p.add_argument("--cfg", type=str, default="models/yolov5s.yaml", help="가중치가 없을 때 사용할 모델 구조")
+    p.add_argument("--out", type=str, default="runs/bench/backfill", help="합성 영상 / 결과 디렉터리")
+    p.add_argument("--videos", type=int, default=4, help="합성 영상 수")
+    p.add_argument("--duration", type=float, default=1800, help="영상 길이 (초)")
+    p.add_argument("--fps", type=float, default=10, help="합성 영상 FPS")
+    p.add_argument("--size", type=int, nargs=2, default=[640, 360], help="합성 영상 크기 (w h)")
+    p.add_argument("--interval", type=float, default=60, help="샘플링 간격 (초)")
+    p.add_argument("--segment-minutes", type=float, default=10, help="작업 하나가 맡는 영상 길이 (분)")
+    p.add_argument("--imgsz", type=int, default=640, help="추론 입력 크기")
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="워커 프로세스 수 목록")
+    p.set_defaults(func=bench_backfill)
+
+    p = sub.add_parser("roi-transform", help="슬롯별 루프 vs 일괄 행렬 ROI 변환 (오프셋/스케일, homography)")
+    p.add_argument("--cameras", type=int, default=20, help="ROI 키(카메라) 수")
+    p.add_argument("--slots", type=int, default=200, help="카메라당 슬롯 수")
+    p.add_argument("--repeats", type=int, default=20, help="반복 횟수")
+    p.set_defaults(func=bench_roi_transform)
+
+    p = sub.add_parser("shift", help="카메라 이동 감지 정확도/재투영 오차/검사 비용 (추론 1회 대비)")
+    p.add_argument("--slots", type=int, default=60, help="슬롯 수")
+    p.add_argument("--trials", type=int, default=40, help="시행 수 (절반 정도는 이동 없음)")
+    p.add_argument("--size", type=int, nargs=2, default=[1920, 1080], help="프레임 크기 (w h)")
+    p.add_argument("--cfg", type=str, default="models/yolov5s.yaml", help="추론 비용 비교용 모델 구조")
+    p.add_argument("--imgsz", type=int, default=640, help="추론 입력 크기")
+    p.set_defaults(func=bench_shift)
+
+    p = sub.add_parser("suggest", help="누적 탐지 기반 ROI 슬롯 제안 (처리 시간, 정답 슬롯 재현율)")
+    p.add_argument("--slots", type=int, default=200, help="정답 슬롯 수")
+    p.add_argument("--frames", type=int, default=500, help="샘플 프레임 수 (슬롯당 점유 확률 0.5)")
+    p.add_argument("--repeats", type=int, default=5, help="반복 횟수")
+    p.set_defaults(func=bench_suggest)
+
+    p = sub.add_parser("batch", help="배치 크기/스레드 수별 추론 처리량")
+    p.add_argument("--weights", type=str, default="best_macos.pt", help="모델 경로")
+    p.add_argument("--cfg", type=str, default="models/yolov5s.yaml", help="가중치가 없을 때 사용할 모델 구조")
+    p.add_argument("--video", type=str, default="runs/bench/synthetic_1h.mp4", help="합성 영상 경로 (없으면 생성)")
+    p.add_argument("--duration", type=float, default=3600, help="합성 영상 길이 (초)")
+    p.add_argument("--fps", type=float, default=10, help="합성 영상 FPS")
+    p.add_argument("--size", type=int, nargs=2, default=[640, 360], help="합성 영상 크기 (w h)")
+    p.add_argument("--interval", type=float, default=180, help="샘플링 간격 (초)")
+    p.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8], help="배치 크기 목록")
+    p.add_argument("--threads", type=int, nargs="+", default=[os.cpu_count() or 1], help="torch 스레드 수 목록")
+    p.add_argument("--batches", type=int, default=2, help="배치 크기별 측정 배치 수")
+    p.set_defaults(func=bench_batch)
+
+    return parser.parse_args()
+
+
+def main():
+    """메인 함수"""
+    opt = parse_opt()
+    opt.func(opt)
+
+
+if __name__ == "__main__":
+    main()
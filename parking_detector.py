@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+상주형(resident) YOLO 차량 탐지기
+모델을 프로세스 내에 한 번만 로드해 두고, 매 주기마다 메모리 상의 numpy 배열로 탐지 결과를 반환
+"""
+
+import logging
+from typing import List, Optional, Sequence
+
+import numpy as np
+import torch
+
+from frame_preprocessor import LetterboxPreprocessor
+from models.common import DetectMultiBackend
+from utils.general import check_img_size, non_max_suppression, scale_boxes
+from utils.torch_utils import select_device
+
+logger = logging.getLogger(__name__)
+
+# 차량으로 취급하는 클래스 ID (0: car, 2: car, 3: motorcycle, 5: bus, 7: truck)
+VEHICLE_CLASSES = (0, 2, 3, 5, 7)
+
+
+class VehicleDetector:
+    def __init__(self,
+                 weights: str = "best_macos.pt",
+                 device: str = "",
+                 imgsz: int = 640,
+                 conf_thres: float = 0.25,
+                 iou_thres: float = 0.45,
+                 classes: Optional[Sequence[int]] = None,
+                 max_det: int = 1000,
+                 half: bool = False):
+        """
+        상주형 차량 탐지기 초기화 (모델 로드 + 워밍업)
+
+        Args:
+            weights: YOLO 모델 파일 경로 (DetectMultiBackend 지원 형식)
+            device: 추론 장치 ('' 자동 선택, 'cpu', '0', 'mps' 등)
+            imgsz: 추론 입력 크기 (픽셀)
+            conf_thres: confidence 임계값
+            iou_thres: NMS IoU 임계값
+            classes: 남길 클래스 ID 목록 (None이면 전체)
+            max_det: 이미지당 최대 탐지 수
+            half: FP16 추론 사용 여부
+        """
+        self.weights = weights
+        self.conf_thres = conf_thres
+        self.iou_thres = iou_thres
+        self.classes = list(classes) if classes is not None else None
+        self.max_det = max_det
+
+        self.device = select_device(device)
+        self.model = DetectMultiBackend(weights, device=self.device, fp16=half)
+        self.stride = self.model.stride
+        self.imgsz = check_img_size(imgsz, s=self.stride)
+        self.model.warmup(imgsz=(1, 3, self.imgsz, self.imgsz))
+        self.preprocessor = LetterboxPreprocessor(self.imgsz, stride=self.stride, auto=self.model.pt,
+                                                  device=self.model.device, half=self.model.fp16)
+        # 배치 추론용 (크기가 다른 카메라 프레임도 같은 imgsz x imgsz 입력으로 묶음)
+        self.batch_preprocessor = LetterboxPreprocessor(self.imgsz, stride=self.stride, auto=False,
+                                                        device=self.model.device, half=self.model.fp16)
+
+        logger.info(f"상주형 YOLO 모델 로드 완료 - {weights} (장치: {self.device})")
+
+    def preprocess(self, image: np.ndarray):
+        """letterbox 전처리 후 (모델 입력 텐서, ratio_pad) 반환 (입력 버퍼는 재사용)"""
+        im, ratio_pads = self.preprocessor([image])
+        return im, ratio_pads[0]
+
+    @torch.no_grad()
+    def detect(self, image: np.ndarray) -> np.ndarray:
+        """
+        BGR 이미지에서 차량 탐지
+
+        Returns:
+            (N, 6) float32 배열 - 원본 이미지 픽셀 좌표 [x1, y1, x2, y2, conf, cls]
+        """
+        im, ratio_pad = self.preprocess(image)
+        pred = self.model(im)
+        det = non_max_suppression(pred, self.conf_thres, self.iou_thres, self.classes, max_det=self.max_det)[0]
+        if len(det):
+            det[:, :4] = scale_boxes(im.shape[2:], det[:, :4], image.shape, ratio_pad=ratio_pad).round()
+        return det.cpu().numpy().astype(np.float32)
+
+    @torch.no_grad()
+    def detect_batch(self, images: Sequence[np.ndarray]) -> List[np.ndarray]:
+        """
+        여러 BGR 이미지(크기가 달라도 됨)를 한 번의 배치 추론으로 탐지
+
+        Returns:
+            이미지별 (N, 6) float32 배열 목록 - 원본 이미지 픽셀 좌표 [x1, y1, x2, y2, conf, cls]
+        """
+        im, ratio_pads = self.batch_preprocessor(images)
+        pred = self.model(im)
+        dets = non_max_suppression(pred, self.conf_thres, self.iou_thres, self.classes, max_det=self.max_det)
+        results = []
+        for image, det, ratio_pad in zip(images, dets, ratio_pads):
+            if len(det):
+                det[:, :4] = scale_boxes(im.shape[2:], det[:, :4], image.shape, ratio_pad=ratio_pad).round()
+            results.append(det.cpu().numpy().astype(np.float32))
+        return results
+
+
+def detections_to_yolo_dicts(det: np.ndarray, image_shape) -> list:
+    """탐지 배열을 YOLO 정규화 좌표(class x_center y_center width height conf) dict 목록으로 변환"""
+    height, width = image_shape[:2]
+    xyxy = det[:, :4]
+    xc = (xyxy[:, 0] + xyxy[:, 2]) / 2 / width
+    yc = (xyxy[:, 1] + xyxy[:, 3]) / 2 / height
+    w = (xyxy[:, 2] - xyxy[:, 0]) / width
+    h = (xyxy[:, 3] - xyxy[:, 1]) / height
+    return [
+        {
+            'class_id': int(c),
+            'x_center': float(x),
+            'y_center': float(y),
+            'width': float(bw),
+            'height': float(bh),
+            'confidence': float(conf)
+        }
+        for x, y, bw, bh, conf, c in zip(xc, yc, w, h, det[:, 4], det[:, 5])
+    ]
@@ -7,7 +7,6 @@ YOLO 차량 인식 결과를 ROI 좌표와 비교하여 주차장 점유율 계
 import cv2
 import json
 import time
-import requests
 import numpy as np
 from datetime import datetime
 import torch
@@ -17,7 +16,15 @@ import logging
 from typing import List, Dict, Tuple, Optional
 import os
 import subprocess
-from shapely.geometry import box, Polygon
+from camera_shift import CameraShiftMonitor
+from frame_gate import FrameChangeGate
+from occupancy_store import OccupancyStore
+from parking_detector import VEHICLE_CLASSES, VehicleDetector, detections_to_yolo_dicts
+from parking_publisher import PublishQueue, SlotStatusPublisher
+from roi_registry import RoiRegistry
+from slot_classifier import SlotClassifier
+from slot_occupancy import SlotGeometry, SlotRasterIndex, boxes_from_detections, slot_max
+from slot_state import SlotStateTracker
 
 # 로깅 설정
 logging.basicConfig(
@@ -35,7 +42,21 @@ class ParkingOccupancyAnalyzer:
                  roi_path: str = "roi_manual_coords.json",
                  model_path: str = "best_macos.pt",  # 원본 모델 사용
                  backend_url: str = "http://localhost:8080",
-                 image_path: str = "frame_30min.jpg"):
+                 image_path: str = "frame_30min.jpg",
+                 inference_mode: str = "resident",
+                 overlap_method: str = "polygon",
+                 async_publish: bool = True,
+                 roi_key: str = "frame_30min.jpg",
+                 parking_lot_id = 'sanggyeonggwan',
+                 detector: Optional[VehicleDetector] = None,
+                 publish_queue: Optional[PublishQueue] = None,
+                 camera_id: Optional[str] = None,
+                 change_gate: bool = False,
+                 slot_classifier=None,
+                 temporal_smoothing: bool = False,
+                 result_store=None,
+                 shift_detection: bool = False,
+                 shift_reference: Optional[str] = None):
         """
         주차장 점유 현황 분석기 초기화
         
@@ -44,41 +65,114 @@ class ParkingOccupancyAnalyzer:
             model_path: YOLO 모델 파일 경로
             backend_url: 백엔드 서버 URL
             image_path: 분석할 이미지 파일 경로
+            inference_mode: 'resident' (모델을 메모리에 상주) 또는 'subprocess' (simple_detect.py 실행)
+            overlap_method: 'polygon' (정확한 다각형 클리핑) 또는 'raster' (고정 카메라용 캐시된 슬롯 래스터 + integral image)
+            async_publish: True면 백그라운드 전송 큐 사용 (분석 루프가 백엔드 응답을 기다리지 않음)
+            roi_key: 사용할 ROI JSON 키 (카메라 이미지 이름)
+            parking_lot_id: 백엔드로 전송할 주차장 ID
+            detector: 여러 분석기가 공유할 상주 탐지기 (None이면 model_path에서 로드)
+            publish_queue: 여러 분석기가 공유할 전송 큐 (None이면 async_publish에 따라 생성)
+            camera_id: 카메라 ID (결과 파일 이름과 로그 구분용)
+            change_gate: True면 슬롯 영역이 바뀌지 않은 프레임은 추론을 생략하고 이전 슬롯 상태 재사용
+            slot_classifier: 슬롯 패치 분류 모드 (분류 모델 경로 또는 공유 SlotClassifier, None이면 전체 프레임 탐지)
+            temporal_smoothing: True면 IoU EWMA + hysteresis + 연속 확인으로 슬롯 상태 결정 (깜빡이는 탐지로 상태가 뒤집히지 않음)
+            result_store: 결과 시계열 저장소 (SQLite 경로 또는 공유 OccupancyStore, 경로면 이력 집계도 갱신, None이면 주기마다 JSON 파일 저장)
+            shift_detection: True면 낮은 주기로 카메라 이동을 감지해 ROI를 자동 재투영 (ORB 특징점 + homography)
+            shift_reference: ROI를 그린 기준 프레임 이미지 경로 (None이면 처음 분석한 프레임을 기준으로 사용)
         """
         self.roi_path = roi_path
         self.model_path = model_path
         self.backend_url = backend_url
         self.image_path = image_path
+        self.inference_mode = inference_mode
+        self.overlap_method = overlap_method
+        self.roi_key = roi_key
+        self.parking_lot_id = parking_lot_id
+        self.detector = detector
+        self.camera_id = camera_id
+        self.gate = FrameChangeGate() if change_gate else None
+        self.last_slot_status = None  # 마지막으로 추론한 슬롯 상태 (게이트가 추론을 생략하면 재사용)
+        self.current_image = None  # resident 모드에서 이번 주기에 읽은 이미지
+        self.last_detections = np.zeros((0, 6), dtype=np.float32)  # [x1, y1, x2, y2, conf, cls]
+        self.slot_classifier = SlotClassifier(slot_classifier) if isinstance(slot_classifier, str) else slot_classifier
+        self.temporal_smoothing = temporal_smoothing
+        self.slot_tracker = None  # 슬롯 상태 추적기 (ROI 슬롯 목록이 바뀌면 새로 생성)
+        self.owns_store = isinstance(result_store, str)
+        self.result_store = OccupancyStore(result_store, analytics=True) if self.owns_store else result_store
+        self.shift_monitor = None
+        if shift_detection:
+            reference = cv2.imread(shift_reference) if shift_reference else None
+            if shift_reference and reference is None:
+                logger.warning(f"기준 프레임을 로드할 수 없습니다: {shift_reference} - 첫 프레임을 기준으로 사용")
+            self.shift_monitor = CameraShiftMonitor(reference)
+        self.shifted_raster = None  # (재투영 geometry, 프레임 크기, SlotRasterIndex)
         
         # 초기화
-        self.roi_data = self.load_roi_data()
+        self.roi = RoiRegistry.shared(roi_path)  # 같은 ROI 파일을 쓰는 카메라끼리 컴파일된 슬롯 배열 공유
         self.model = self.load_yolo_model()
+        self.owns_publisher = publish_queue is None
+        if publish_queue is not None:
+            self.publisher = publish_queue.publisher
+            self.publish_queue = publish_queue
+        else:
+            self.publisher = SlotStatusPublisher(backend_url, headers={'Authorization': 'Bearer yolo_token'})  # YOLO 서비스 토큰
+            self.publish_queue = PublishQueue(self.publisher, owner=f"analyzer_{parking_lot_id}") if async_publish else None
         
         logger.info(f"주차장 점유 현황 분석기 초기화 완료")
         
-    def load_roi_data(self) -> Dict:
-        """ROI 좌표 데이터 로드"""
+    def load_yolo_model(self):
+        """YOLO 모델 로드 (resident 모드에서는 한 번 로드한 모델을 계속 재사용)"""
+        if self.detector is not None:
+            return self.detector
+        if self.slot_classifier is not None:
+            logger.info("슬롯 패치 분류 모드: YOLO 탐지 모델을 로드하지 않습니다.")
+            return None
+        if self.inference_mode != "resident":
+            logger.info("subprocess 모드: YOLO 모델은 simple_detect.py에서 로드됩니다.")
+            return None
         try:
-            with open(self.roi_path, 'r', encoding='utf-8') as f:
-                roi_data = json.load(f)
-            logger.info(f"ROI 데이터 로드 완료 - {len(roi_data)}개 이미지의 슬롯 정보")
-            return roi_data
+            return VehicleDetector(self.model_path)
         except Exception as e:
-            logger.error(f"ROI 데이터 로드 실패: {e}")
-            return {}
+            logger.error(f"YOLO 모델 로드 실패, subprocess 모드로 전환: {e}")
+            self.inference_mode = "subprocess"
+            return None
     
-    def load_yolo_model(self):
-        """YOLO 모델 로드"""
+    def run_yolo_detection(self, frame: Optional[np.ndarray] = None) -> List[Dict]:
+        """
+        YOLO 차량 인식 실행 (resident 모델이 있으면 프로세스 내 추론, 없으면 subprocess)
+        
+        Args:
+            frame: 이미 디코딩된 BGR 프레임 (None이면 image_path에서 읽음)
+        """
+        self.current_image = None
+        if self.model is not None:
+            return self.run_resident_detection(frame)
+        if frame is not None:
+            # subprocess 모드는 파일 입력만 지원하므로 프레임을 image_path에 기록
+            cv2.imwrite(self.image_path, frame)
+        return self.run_subprocess_detection()
+    
+    def run_resident_detection(self, frame: Optional[np.ndarray] = None) -> List[Dict]:
+        """상주 모델로 프로세스 내 추론 (디스크 왕복 없이 메모리 상의 배열 반환)"""
         try:
-            # Linux 환경에서는 모델 로드를 건너뛰고 detect.py에서 처리
-            logger.info("Linux 환경: YOLO 모델은 detect.py에서 로드됩니다.")
-            return None
+            image = frame if frame is not None else cv2.imread(self.image_path)
+            if image is None:
+                logger.error(f"이미지를 로드할 수 없습니다: {self.image_path}")
+                return []
+            
+            self.current_image = image
+            self.last_detections = self.model.detect(image)
+            detections = detections_to_yolo_dicts(self.last_detections, image.shape)
+            
+            logger.info(f"차량 인식 완료 (resident): {len(detections)}개 객체 감지")
+            return detections
+            
         except Exception as e:
-            logger.error(f"YOLO 모델 로드 실패: {e}")
-            return None
+            logger.error(f"YOLO 인식 실행 중 오류: {e}")
+            return []
     
-    def run_yolo_detection(self) -> List[Dict]:
-        """YOLO 차량 인식 실행 (iou 0.2로 변경)"""
+    def run_subprocess_detection(self) -> List[Dict]:
+        """simple_detect.py를 별도 프로세스로 실행하여 YOLO 차량 인식 (iou 0.2로 변경)"""
         try:
             # YOLO 인식 명령어 실행 (simple_detect.py 사용)
             cmd = [
@@ -157,28 +251,37 @@ class ParkingOccupancyAnalyzer:
         
         return normalized_detections
     
-    def calculate_iou(self, bbox: List[float], roi_coords: List[List[int]]) -> float:
-        """IoU 계산 함수 (judge_occupancy.py 참고)"""
-        try:
-            bbox_poly = box(*bbox)
-            roi_poly = Polygon(roi_coords)
-            
-            if not bbox_poly.intersects(roi_poly):
-                return 0.0
-            
-            intersection_area = bbox_poly.intersection(roi_poly).area
-            union_area = bbox_poly.union(roi_poly).area
-            
-            return intersection_area / union_area if union_area > 0 else 0.0
-            
-        except Exception as e:
-            logger.warning(f"IoU 계산 중 오류: {e}")
-            return 0.0
+    def get_slot_geometry(self) -> SlotGeometry:
+        """이 카메라의 슬롯 배열 (ROI 파일 변경 반영, 카메라 이동이 감지되었으면 재투영한 배열)"""
+        self.roi.refresh()
+        geometry = self.roi.geometry(self.roi_key)
+        return self.shift_monitor.project(geometry) if self.shift_monitor is not None else geometry
+    
+    def get_slot_raster(self, geometry: SlotGeometry, image_shape: Tuple[int, ...]) -> SlotRasterIndex:
+        """슬롯 래스터 인덱스 (원래 ROI는 레지스트리의 디스크 캐시, 재투영한 ROI는 변환이 바뀔 때만 생성)"""
+        if geometry is self.roi.geometry(self.roi_key):
+            return self.roi.raster(self.roi_key, image_shape)
+        shape = tuple(image_shape[:2])
+        if self.shifted_raster is None or self.shifted_raster[0] is not geometry or self.shifted_raster[1] != shape:
+            self.shifted_raster = (geometry, shape, SlotRasterIndex(geometry, shape))
+        return self.shifted_raster[2]
+    
+    def check_camera_shift(self, frame: np.ndarray):
+        """카메라 이동 검사 (모니터가 있을 때만, 검사 간격은 모니터가 관리)"""
+        if self.shift_monitor is not None:
+            self.roi.refresh()
+            self.shift_monitor.check(frame, self.roi.geometry(self.roi_key))
+    
+    def get_slot_tracker(self, geometry: SlotGeometry) -> SlotStateTracker:
+        """슬롯 상태 추적기 (ROI 슬롯 목록이 바뀌면 새로 생성)"""
+        if self.slot_tracker is None or self.slot_tracker.slot_ids != geometry.slot_ids:
+            self.slot_tracker = SlotStateTracker(geometry.slot_ids)
+        return self.slot_tracker
     
     def check_parking_slots_iou(self, detections: List[Dict]) -> List[Dict]:
         """IoU 기반 주차 슬롯별 점유 현황 확인 (judge_occupancy.py 참고)"""
-        # 이미지 로드하여 크기 확인
-        image = cv2.imread(self.image_path)
+        # 이미지 로드하여 크기 확인 (resident 모드에서는 추론에 사용한 이미지 재사용)
+        image = self.current_image if self.current_image is not None else cv2.imread(self.image_path)
         if image is None:
             logger.error(f"이미지를 로드할 수 없습니다: {self.image_path}")
             return []
@@ -186,42 +289,70 @@ class ParkingOccupancyAnalyzer:
         height, width = image.shape[:2]
         normalized_detections = self.normalize_coordinates(detections, (height, width))
         
-        # ROI 데이터에서 frame_30min.jpg의 슬롯 정보 사용
-        image_key = "frame_30min.jpg"
-        slots = self.roi_data.get(image_key, [])
+        # ROI 데이터에서 이 카메라(roi_key, 기본 frame_30min.jpg)의 슬롯 정보 사용
+        geometry = self.get_slot_geometry()
         
-        slot_status = []
+        # 차량 클래스 ID 확인 (0: car, 2: car, 3: motorcycle, 5: bus, 7: truck)
+        vehicles = [det for det in normalized_detections if det['class_id'] in VEHICLE_CLASSES]
         
-        for slot in slots:
-            slot_id = slot['slot_id']
-            coords = slot['coords']
-            
-            # IoU 기반 점유 판단 (judge_occupancy.py 참고)
-            max_iou = 0.0
-            vehicle_count = 0
-            
-            for det in normalized_detections:
-                # 차량 클래스 ID 확인 (0: car, 2: car, 3: motorcycle, 5: bus, 7: truck)
-                if det['class_id'] in [0, 2, 3, 5, 7]:
-                    iou = self.calculate_iou(det['bbox'], coords)
-                    if iou > max_iou:
-                        max_iou = iou
-                    if iou >= 0.1:  # judge_occupancy.py와 동일한 임계값
-                        vehicle_count += 1
-            
-            # IoU 임계값 0.17 이상이면 점유로 판단
+        # 격자 인덱스로 겹칠 수 있는 (차량, 슬롯) 쌍만 골라 IoU를 한 번에 계산 (judge_occupancy.py 참고)
+        index = self.get_slot_raster(geometry, image.shape) if self.overlap_method == "raster" else geometry
+        det_idx, slot_idx, iou = index.iou_pairs(boxes_from_detections(vehicles))
+        max_iou, _ = slot_max(det_idx, slot_idx, iou, len(geometry))
+        vehicle_counts = np.bincount(slot_idx[iou >= 0.1], minlength=len(geometry))  # judge_occupancy.py와 동일한 임계값
+        
+        # IoU 임계값 0.17 이상이면 점유로 판단 (평활화 모드에서는 EWMA + hysteresis + 연속 확인)
+        if self.temporal_smoothing:
+            occupied = self.get_slot_tracker(geometry).update(max_iou)
+        else:
             occupied = max_iou >= 0.17
-            
+        
+        slot_status = []
+        
+        for i, (slot_id, coords) in enumerate(zip(geometry.slot_ids, geometry.coords)):
             slot_status.append({
                 'slot_id': slot_id,
-                'occupied': occupied,
-                'vehicle_count': vehicle_count,
-                'max_iou': round(max_iou, 3),
+                'occupied': bool(occupied[i]),
+                'vehicle_count': int(vehicle_counts[i]),
+                'max_iou': round(float(max_iou[i]), 3),
                 'coordinates': coords
             })
         
         return slot_status
     
+    def classify_parking_slots(self, frame: np.ndarray, changed_only: bool = False) -> List[Dict]:
+        """
+        슬롯 패치 분류 모드: 슬롯별 원근 변환 패치를 한 배치로 occupied/free 분류 (전체 프레임 탐지 생략)
+        
+        Args:
+            frame: BGR 프레임
+            changed_only: True면 변화 감지 게이트가 이 프레임에서 변화를 감지한 슬롯만 분류
+        """
+        geometry = self.get_slot_geometry()
+        
+        # 게이트가 변화를 감지한 슬롯만 다시 분류하고 나머지 슬롯은 이전 상태 재사용
+        previous = self.last_slot_status
+        indices = None
+        if (changed_only and self.gate is not None and previous is not None and
+                [slot['slot_id'] for slot in previous] == geometry.slot_ids):
+            changed = self.gate.changed_slots()
+            indices = changed if len(changed) else None
+        probs = self.slot_classifier.predict(frame, geometry, indices)
+        
+        slot_status = [dict(slot) for slot in previous] if indices is not None else [None] * len(geometry)
+        for i, prob in zip(range(len(geometry)) if indices is None else indices, probs):
+            occupied = bool(prob >= self.slot_classifier.threshold)
+            slot_status[i] = {
+                'slot_id': geometry.slot_ids[i],
+                'occupied': occupied,
+                'vehicle_count': int(occupied),
+                'max_iou': 0.0,  # 분류 모드에서는 IoU를 계산하지 않음
+                'occupied_prob': round(float(prob), 3),
+                'coordinates': geometry.coords[i]
+            }
+        logger.info(f"슬롯 패치 분류 완료 - {len(probs)}/{len(geometry)}개 슬롯 분류")
+        return slot_status
+    
     def calculate_occupancy_rate(self, slot_status: List[Dict]) -> Dict:
         """전체 점유율 계산"""
         total_slots = len(slot_status)
@@ -239,47 +370,53 @@ class ParkingOccupancyAnalyzer:
         }
     
     def send_to_backend(self, slot_status: List[Dict], occupancy_info: Dict, timestamp: datetime) -> bool:
-        """백엔드 서버로 JSON 데이터 전송"""
-        try:
-            # 전송할 데이터 구성 (JSON 형식)
-            payload = {
-                'timestamp': timestamp.isoformat(),
-                'parking_lot_id': 'sanggyeonggwan',  # 주차장 ID
-                'occupancy_info': occupancy_info,
-                'slot_details': [
-                    {
-                        'slot_id': slot['slot_id'],
-                        'occupied': slot['occupied'],
-                        'vehicle_count': slot['vehicle_count'],
-                        'max_iou': slot['max_iou']
-                    }
-                    for slot in slot_status
-                ]
+        """백엔드 서버로 JSON 데이터 전송 (비동기 모드에서는 전송 큐에 등록만 하고 바로 반환)"""
+        parking_lot_id = self.parking_lot_id
+        slot_details = [
+            {
+                'slot_id': slot['slot_id'],
+                'occupied': slot['occupied'],
+                'vehicle_count': slot['vehicle_count'],
+                'max_iou': slot['max_iou']
             }
-            
-            # 백엔드 API 엔드포인트
-            url = f"{self.backend_url}/parking-lots/occupancy"
-            
-            headers = {
-                'Content-Type': 'application/json',
-                'Authorization': 'Bearer yolo_token'  # YOLO 서비스 토큰
-            }
-            
-            response = requests.post(url, json=payload, headers=headers, timeout=10)
-            
-            if response.status_code == 200:
-                logger.info(f"백엔드 전송 성공: {occupancy_info['occupancy_ratio']} ({occupancy_info['occupancy_rate']}%)")
-                return True
-            else:
-                logger.error(f"백엔드 전송 실패: {response.status_code} - {response.text}")
-                return False
-                
-        except Exception as e:
-            logger.error(f"백엔드 전송 중 오류: {e}")
+            for slot in slot_status
+        ]
+        
+        if self.publish_queue is not None:
+            return self.publish_queue.submit("publish_occupancy", parking_lot_id, timestamp.isoformat(),
+                                             occupancy_info, slot_details)
+        return self.publisher.publish_occupancy(parking_lot_id, timestamp.isoformat(), occupancy_info, slot_details)
+    
+    def frame_unchanged(self, frame: np.ndarray) -> bool:
+        """
+        변화 감지 게이트: 마지막 추론 이후 어느 슬롯 영역도 바뀌지 않았으면 True (게이트가 없으면 항상 False)
+        프레임마다 한 번 호출되는 곳이라 게이트 판단 전에 카메라 이동 검사도 여기서 수행 (ROI 재투영이 게이트 영역에 반영됨)
+        """
+        self.check_camera_shift(frame)
+        if self.gate is None:
             return False
+        if self.last_slot_status is None or (self.slot_tracker is not None and not self.slot_tracker.settled()):
+            self.gate.reset()  # 재사용할 상태가 없거나 평활화 확인이 남아 있으면 반드시 추론 (생략하면 상태 변경이 max_skip_cycles만큼 늦어짐)
+        geometry = self.get_slot_geometry() if self.roi_key in self.roi else None
+        return not self.gate.should_infer(frame, geometry)
+    
+    def close(self):
+        """전송 큐의 남은 작업을 보내고(실패 시 spool) 연결 / 저장소 정리 (공유 큐와 저장소는 소유자가 정리)"""
+        if self.owns_store:
+            self.result_store.close()
+        if not self.owns_publisher:
+            return
+        if self.publish_queue is not None:
+            self.publish_queue.close()
+        self.publisher.close()
     
     def save_analysis_result(self, slot_status: List[Dict], occupancy_info: Dict, timestamp: datetime):
-        """분석 결과를 JSON 파일로 저장"""
+        """분석 결과 저장 (result_store가 있으면 시계열 저장소에 append, 없으면 JSON 파일)"""
+        if self.result_store is not None:
+            self.result_store.append_slot_status(self.parking_lot_id, timestamp, slot_status)
+            logger.info(f"분석 결과 저장: {self.result_store.path} ({self.parking_lot_id})")
+            return
+
         result = {
             'timestamp': timestamp.isoformat(),
             'occupancy_info': occupancy_info,
@@ -287,28 +424,57 @@ class ParkingOccupancyAnalyzer:
         }
         
         # JSON 파일로 저장
-        filename = f"occupancy_result_{timestamp.strftime('%Y%m%d_%H%M%S')}.json"
+        prefix = f"occupancy_result_{self.camera_id}" if self.camera_id else "occupancy_result"
+        filename = f"{prefix}_{timestamp.strftime('%Y%m%d_%H%M%S')}.json"
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(result, f, ensure_ascii=False, indent=2)
         
         logger.info(f"분석 결과 저장: {filename}")
     
-    def run_analysis(self):
-        """전체 분석 프로세스 실행"""
+    def run_analysis(self, frame: Optional[np.ndarray] = None, detections: Optional[np.ndarray] = None):
+        """
+        전체 분석 프로세스 실행
+        
+        Args:
+            frame: 이미 디코딩된 BGR 프레임 (None이면 image_path에서 읽음)
+            detections: 이 프레임에 대해 이미 계산된 (N, 6) 탐지 배열 (배치 추론 결과, 있으면 추론 생략)
+        """
         logger.info("주차장 점유 현황 분석 시작 (IoU 기반)")
         
-        # 1. YOLO 차량 인식 실행 (iou 0.2)
-        detections = self.run_yolo_detection()
-        if not detections:
-            logger.error("차량 인식 실패")
-            return
+        # 0. 슬롯 영역이 바뀌지 않았으면 추론 생략 (이전 슬롯 상태 재사용, 상태가 같으므로 전송/저장도 생략)
+        #    카메라 이동 검사는 frame_unchanged에서 한 번만 (탐지 결과를 넘기는 호출자는 그 전에 frame_unchanged를 호출)
+        if detections is None and frame is not None and self.frame_unchanged(frame):
+            return self.last_slot_status
         
-        # 2. IoU 기반 주차 슬롯 점유 현황 확인
-        slot_status = self.check_parking_slots_iou(detections)
+        if self.slot_classifier is not None and detections is None:
+            # 1-2. 슬롯 패치 분류 모드: 탐지 없이 슬롯별 패치를 한 배치로 occupied/free 분류
+            image = frame if frame is not None else cv2.imread(self.image_path)
+            if image is None:
+                logger.error(f"이미지를 로드할 수 없습니다: {self.image_path}")
+                return
+            slot_status = self.classify_parking_slots(image, changed_only=frame is not None)
+        else:
+            # 1. YOLO 차량 인식 실행 (iou 0.2)
+            if detections is not None and frame is not None:
+                self.current_image = frame
+                self.last_detections = detections
+                detections = detections_to_yolo_dicts(detections, frame.shape)
+            else:
+                detections = self.run_yolo_detection(frame)
+                if not detections:
+                    logger.error("차량 인식 실패")
+                    return
+            
+            # 2. IoU 기반 주차 슬롯 점유 현황 확인
+            slot_status = self.check_parking_slots_iou(detections)
         if not slot_status:
             logger.error("주차 슬롯 분석 실패")
             return
         
+        self.last_slot_status = slot_status
+        if self.gate is not None:
+            self.gate.update()
+        
         # 3. 점유율 계산
         occupancy_info = self.calculate_occupancy_rate(slot_status)
         
@@ -329,14 +495,16 @@ class ParkingOccupancyAnalyzer:
         self.save_analysis_result(slot_status, occupancy_info, timestamp)
         
         if success:
-            logger.info("분석 및 전송 완료")
+            logger.info("분석 완료, 백엔드 전송 " + ("등록" if self.publish_queue is not None else "완료"))
         else:
             logger.warning("분석 완료, 백엔드 전송 실패")
+        return slot_status
 
 def main():
     """메인 함수"""
     analyzer = ParkingOccupancyAnalyzer()
     analyzer.run_analysis()
+    analyzer.close()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
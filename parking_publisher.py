@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+"""
+주차 슬롯 상태 백엔드 퍼블리셔
+하나의 requests.Session(HTTP keep-alive 연결 풀)을 유지하며 슬롯 상태를 전송
+
+- bulk: 한 주기의 슬롯 상태를 한 번의 요청으로 전송 (PUT /parking-slots/bulk)
+- per_slot: 슬롯별 PUT /parking-slots만 받는 백엔드용, 연결 풀 크기만큼 동시에 전송
+- auto: bulk를 먼저 시도하고, 백엔드가 지원하지 않으면(404/405) per_slot으로 전환
+
+주차장/슬롯별로 마지막으로 전송 성공(ack)한 상태를 기억해 바뀐 슬롯만 전송하고,
+snapshot_interval마다(또는 첫 전송 시) 전체 스냅샷을 보내 백엔드와 재동기화
+
+PublishQueue는 백그라운드 스레드에서 전송해 분석 루프가 네트워크를 기다리지 않도록 함
+(실패 작업 spool은 백엔드 URL / 큐 소유자별 하위 디렉토리를 써서 다른 백엔드나 다른 큐의 작업을 재전송하지 않음)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+PUBLISH_MODES = ("auto", "bulk", "per_slot")
+
+# 점유 현황 델타 전송에서 슬롯을 구분하는 키와 변경 여부를 판단하는 필드 (max_iou는 매 주기 조금씩 달라지므로 제외)
+OCCUPANCY_DELTA_KEYS = {'key': 'slot_id', 'fields': ('occupied', 'vehicle_count')}
+
+
+class SlotStatusPublisher:
+    def __init__(self,
+                 backend_url: str = "http://localhost:8080",
+                 mode: str = "auto",
+                 slot_path: str = "/parking-slots",
+                 bulk_path: str = "/parking-slots/bulk",
+                 max_workers: int = 8,
+                 timeout: float = 10,
+                 headers: Optional[Dict] = None,
+                 snapshot_interval: float = 3600):
+        """
+        퍼블리셔 초기화
+
+        Args:
+            backend_url: 백엔드 서버 URL
+            mode: 'auto' | 'bulk' | 'per_slot'
+            slot_path: 슬롯별 PUT 엔드포인트
+            bulk_path: 일괄 PUT 엔드포인트
+            max_workers: per_slot 모드 동시 요청 수 (= 연결 풀 크기)
+            timeout: 요청 타임아웃 (초)
+            headers: 추가 요청 헤더 (인증 토큰 등)
+            snapshot_interval: 전체 스냅샷 재전송 주기 (초, 0이면 항상 전체 전송)
+        """
+        if mode not in PUBLISH_MODES:
+            raise ValueError(f"지원하지 않는 전송 모드: {mode} (가능: {PUBLISH_MODES})")
+        self.backend_url = backend_url.rstrip("/")
+        self.mode = mode
+        self.slot_path = slot_path
+        self.bulk_path = bulk_path
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.bulk_supported = mode != "per_slot"
+        self.snapshot_interval = snapshot_interval
+
+        self.lock = threading.Lock()
+        self.acked: Dict[Tuple, tuple] = {}  # (주차장 ID, 슬롯 키) -> 마지막으로 ack된 상태
+        self.last_snapshot: Dict = {}  # 주차장 ID -> 마지막 전체 스냅샷 전송 시각 (monotonic)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({'Content-Type': 'application/json'})
+        if headers:
+            self.session.headers.update(headers)
+        self.executor = None  # per_slot 전송 시 지연 생성
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """스레드 풀과 연결 풀 정리"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        self.session.close()
+
+    def post(self, path: str, payload: Dict) -> requests.Response:
+        """연결 풀을 재사용하는 JSON POST"""
+        return self.session.post(f"{self.backend_url}{path}", json=payload, timeout=self.timeout)
+
+    def put(self, path: str, payload: Dict) -> requests.Response:
+        """연결 풀을 재사용하는 JSON PUT"""
+        return self.session.put(f"{self.backend_url}{path}", json=payload, timeout=self.timeout)
+
+    def changed_slots(self, parking_lot_id, slots: List[Dict], key: str = 'slotNumber',
+                      fields: Sequence[str] = ('isAvailable',)) -> Tuple[List[Dict], bool]:
+        """
+        마지막 ack 이후 상태(fields)가 바뀐 슬롯 선택
+
+        Returns:
+            (전송할 슬롯 목록, 전체 스냅샷 여부) - 스냅샷 주기가 되었거나 ack 기록이 없으면 전체
+        """
+        last = self.last_snapshot.get(parking_lot_id)
+        if last is None or time.monotonic() - last >= self.snapshot_interval:
+            return list(slots), True
+        changed = [slot for slot in slots
+                   if self.acked.get((parking_lot_id, slot[key])) != tuple(slot[f] for f in fields)]
+        return changed, False
+
+    def acknowledge(self, parking_lot_id, slots: List[Dict], full: bool, key: str = 'slotNumber',
+                    fields: Sequence[str] = ('isAvailable',)):
+        """전송에 성공한 슬롯 상태 기록 (전체 스냅샷이면 스냅샷 시각도 갱신)"""
+        for slot in slots:
+            self.acked[(parking_lot_id, slot[key])] = tuple(slot[f] for f in fields)
+        if full:
+            self.last_snapshot[parking_lot_id] = time.monotonic()
+
+    def publish(self, parking_lot_id, slots: List[Dict]) -> bool:
+        """
+        슬롯 상태 전송 (마지막 ack 이후 바뀐 슬롯만, 스냅샷 주기마다 전체)
+
+        Args:
+            parking_lot_id: 주차장 ID
+            slots: [{'slotNumber': int, 'isAvailable': bool}, ...]
+
+        Returns:
+            전송할 슬롯이 모두 전송되었는지 여부
+        """
+        with self.lock:
+            changed, full = self.changed_slots(parking_lot_id, slots)
+            if not changed:
+                logger.info(f"슬롯 상태 변경 없음, 전송 생략 (주차장 {parking_lot_id})")
+                return True
+            if self.send(parking_lot_id, changed, full):
+                self.acknowledge(parking_lot_id, changed, full)
+                return True
+            return False
+
+    def send(self, parking_lot_id, slots: List[Dict], full: bool = True) -> bool:
+        """슬롯 목록을 일괄(지원 시) 또는 슬롯별로 전송"""
+        if self.bulk_supported:
+            try:
+                response = self.put(self.bulk_path, {'parkingLotId': parking_lot_id, 'fullSnapshot': full, 'slots': slots})
+            except requests.RequestException as e:
+                logger.error(f"일괄 상태 전송 실패: {e}")
+                return False
+            if response.status_code in (404, 405) and self.mode == "auto":
+                logger.warning(f"백엔드가 일괄 전송을 지원하지 않음 ({response.status_code}), 슬롯별 전송으로 전환")
+                self.bulk_supported = False
+            elif response.status_code == 200:
+                logger.info(f"슬롯 {len(slots)}개 상태 일괄 전송 성공 ({'전체' if full else '변경분'})")
+                return True
+            else:
+                logger.error(f"일괄 상태 전송 실패: {response.status_code}")
+                return False
+        return self.publish_per_slot(parking_lot_id, slots)
+
+    def publish_per_slot(self, parking_lot_id, slots: List[Dict]) -> bool:
+        """슬롯별 PUT을 연결 풀 크기만큼 동시에 전송"""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="publisher")
+        results = list(self.executor.map(lambda slot: self.put_slot(parking_lot_id, slot), slots))
+        failed = len(results) - sum(results)
+        if failed:
+            logger.error(f"슬롯 상태 전송 실패 - {failed}/{len(slots)}개")
+        else:
+            logger.info(f"슬롯 {len(slots)}개 상태 전송 성공")
+        return failed == 0
+
+    def put_slot(self, parking_lot_id, slot: Dict) -> bool:
+        """슬롯 하나의 상태 PUT"""
+        try:
+            response = self.put(self.slot_path, {'parkingLotId': parking_lot_id, **slot})
+        except requests.RequestException as e:
+            logger.error(f"슬롯 {slot['slotNumber']} 상태 전송 실패: {e}")
+            return False
+        if response.status_code != 200:
+            logger.error(f"슬롯 {slot['slotNumber']} 상태 전송 실패: {response.status_code}")
+            return False
+        return True
+
+    def publish_occupancy(self, parking_lot_id, timestamp: str, occupancy_info: Dict, slot_details: List[Dict],
+                          path: str = "/parking-lots/occupancy") -> bool:
+        """
+        점유 현황 전송 (점유율 요약 + 마지막 ack 이후 점유 상태가 바뀐 슬롯, 스냅샷 주기마다 전체)
+
+        Args:
+            parking_lot_id: 주차장 ID
+            timestamp: 분석 시각 (ISO 형식)
+            occupancy_info: 점유율 요약
+            slot_details: [{'slot_id', 'occupied', 'vehicle_count', 'max_iou'}, ...]
+        """
+        with self.lock:
+            changed, full = self.changed_slots(parking_lot_id, slot_details, **OCCUPANCY_DELTA_KEYS)
+            if not changed:
+                logger.info(f"슬롯 상태 변경 없음, 전송 생략 (주차장 {parking_lot_id})")
+                return True
+
+            payload = {
+                'timestamp': timestamp,
+                'parking_lot_id': parking_lot_id,
+                'occupancy_info': occupancy_info,
+                'full_snapshot': full,
+                'slot_details': changed
+            }
+            try:
+                response = self.post(path, payload)
+            except requests.RequestException as e:
+                logger.error(f"백엔드 전송 중 오류: {e}")
+                return False
+
+            if response.status_code == 200:
+                self.acknowledge(parking_lot_id, changed, full, **OCCUPANCY_DELTA_KEYS)
+                logger.info(f"백엔드 전송 성공: {occupancy_info['occupancy_ratio']} ({occupancy_info['occupancy_rate']}%) - "
+                            f"슬롯 {len(changed)}개 {'전체' if full else '변경분'}")
+                return True
+            logger.error(f"백엔드 전송 실패: {response.status_code} - {response.text}")
+            return False
+
+
+def spool_namespace(backend_url: str, owner: str) -> str:
+    """spool 하위 디렉토리 (백엔드 호스트 + URL 해시 / 큐 소유자)"""
+    host = re.sub(r"[^\w.-]", "_", urlsplit(backend_url).netloc or backend_url)
+    digest = hashlib.sha1(backend_url.encode()).hexdigest()[:8]
+    return os.path.join(f"{host}_{digest}", re.sub(r"[^\w.-]", "_", owner))
+
+
+class PublishQueue:
+    def __init__(self,
+                 publisher: SlotStatusPublisher,
+                 maxsize: int = 64,
+                 backoff_base: float = 1.0,
+                 backoff_max: float = 60.0,
+                 spool_dir: Optional[str] = "runs/publish_spool",
+                 owner: str = "default"):
+        """
+        비동기 전송 큐 (백그라운드 스레드 1개)
+
+        submit()은 네트워크를 기다리지 않고 바로 반환. 같은 (전송 메서드, 주차장) 작업은 최신 상태로 합쳐지고
+        (대기 중인 이전 스냅샷은 버림), 실패한 작업은 지수 백오프로 재시도하며 디스크 spool에 기록해
+        프로세스가 재시작되어도 장애 후 복구 시 다시 전송
+
+        Args:
+            publisher: 실제 전송을 수행할 퍼블리셔
+            maxsize: 메모리에 대기시킬 최대 작업 수 (초과 시 가장 오래된 작업을 spool로 내림)
+            backoff_base: 첫 재시도 대기 시간 (초)
+            backoff_max: 최대 재시도 대기 시간 (초)
+            spool_dir: spool 기본 디렉토리 (실제 작업은 <spool_dir>/<백엔드>/<owner>에 저장, None이면 디스크 spool 사용 안 함)
+            owner: 큐 소유자 이름 (같은 백엔드로 보내는 큐마다 달라야 서로의 spool 작업을 가져가지 않음)
+        """
+        self.publisher = publisher
+        self.maxsize = maxsize
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.spool_dir = os.path.join(spool_dir, spool_namespace(publisher.backend_url, owner)) if spool_dir else None
+        if self.spool_dir:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            self.release_claims()
+
+        self.cond = threading.Condition()
+        self.pending: "OrderedDict[str, Dict]" = OrderedDict()  # 작업 키 -> 작업 (제출 순서)
+        self.inflight = None  # 전송 중인 작업 키
+        self.closed = False
+        self.stats = {'submitted': 0, 'coalesced': 0, 'sent': 0, 'retries': 0, 'spooled': 0, 'restored': 0}
+
+        self.thread = threading.Thread(target=self.worker, name="publish-queue", daemon=True)
+        self.thread.start()
+
+    @staticmethod
+    def job_key(method: str, parking_lot_id) -> str:
+        return f"{method}_{parking_lot_id}"
+
+    def spool_path(self, key: str) -> str:
+        return os.path.join(self.spool_dir, f"{key}.json")
+
+    def claim_path(self, key: str) -> str:
+        return os.path.join(self.spool_dir, f"{key}.claimed")
+
+    def release_claims(self):
+        """이전 실행이 전송 도중 종료되어 남은 claim을 spool 작업으로 되돌림 (더 새 작업이 spool에 있으면 버림)"""
+        for name in os.listdir(self.spool_dir):
+            if not name.endswith(".claimed"):
+                continue
+            claimed = os.path.join(self.spool_dir, name)
+            path = self.spool_path(name[:-8])
+            if os.path.exists(path):
+                os.remove(claimed)
+            else:
+                os.replace(claimed, path)
+
+    def discard_claim(self, key: str):
+        """전송을 마친 claim 파일 삭제 (실패한 작업은 spool()로 다시 기록됨)"""
+        try:
+            os.remove(self.claim_path(key))
+        except FileNotFoundError:
+            pass
+
+    def submit(self, method: str, parking_lot_id, *args) -> bool:
+        """
+        전송 작업 등록 (블로킹 없음)
+
+        Args:
+            method: 퍼블리셔 메서드 이름 ('publish' | 'publish_occupancy')
+            parking_lot_id: 주차장 ID (합치기 단위)
+            args: 메서드의 나머지 인자 (JSON 직렬화 가능해야 함)
+        """
+        key = self.job_key(method, parking_lot_id)
+        job = {'key': key, 'method': method, 'args': [parking_lot_id, *args], 'attempts': 0, 'not_before': 0.0}
+        with self.cond:
+            if self.closed:
+                logger.error("전송 큐가 닫혀 있어 작업을 spool에 기록")
+                self.spool(job)
+                return False
+            self.stats['submitted'] += 1
+            old = self.pending.pop(key, None)
+            if old is not None:
+                # 이전 스냅샷은 최신 상태에 포함되므로 버리고, 백오프 상태만 이어받음
+                self.stats['coalesced'] += 1
+                job['attempts'], job['not_before'] = old['attempts'], old['not_before']
+            self.pending[key] = job
+            while len(self.pending) > self.maxsize:
+                _, evicted = self.pending.popitem(last=False)
+                logger.warning(f"전송 큐 가득 참, 가장 오래된 작업을 spool로 이동: {evicted['key']}")
+                self.spool(evicted)
+            self.cond.notify()
+        return True
+
+    def spool(self, job: Dict):
+        """작업을 디스크에 기록 (같은 키는 덮어써서 최신 상태만 유지)"""
+        if not self.spool_dir:
+            return
+        path = self.spool_path(job['key'])
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({k: job[k] for k in ('key', 'method', 'args', 'attempts')}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        self.stats['spooled'] += 1
+
+    def restore_spooled(self) -> bool:
+        """메모리에 없는 spool 작업을 대기열로 복원 (cond 보유 상태에서 호출)"""
+        if not self.spool_dir:
+            return False
+        restored = False
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not name.endswith(".json") or len(self.pending) >= self.maxsize:
+                continue
+            key = name[:-5]
+            if key in self.pending or key == self.inflight:
+                continue
+            try:
+                os.replace(os.path.join(self.spool_dir, name), self.claim_path(key))  # 원자적으로 가져가 같은 작업을 두 번 보내지 않음
+            except FileNotFoundError:
+                continue
+            try:
+                with open(self.claim_path(key), 'r', encoding='utf-8') as f:
+                    job = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"spool 작업 읽기 실패 {name}: {e}")
+                continue
+            job['not_before'] = 0.0
+            self.pending[key] = job
+            self.stats['restored'] += 1
+            restored = True
+        return restored
+
+    def next_job(self) -> Optional[Dict]:
+        """재시도 대기 시간이 지난 가장 오래된 작업 (없으면 대기, 닫히고 비면 None)"""
+        with self.cond:
+            while True:
+                if not self.pending and not self.closed:
+                    self.restore_spooled()
+                if not self.pending:
+                    if self.closed:
+                        return None
+                    self.cond.wait(timeout=self.backoff_max)
+                    continue
+                now = time.monotonic()
+                key, job = min(self.pending.items(), key=lambda kv: kv[1]['not_before'])
+                if job['not_before'] <= now:
+                    del self.pending[key]
+                    self.inflight = key
+                    return job
+                if self.closed:
+                    return None
+                self.cond.wait(timeout=job['not_before'] - now)
+
+    def worker(self):
+        """전송 루프 (백그라운드 스레드)"""
+        while True:
+            job = self.next_job()
+            if job is None:
+                return
+            try:
+                ok = getattr(self.publisher, job['method'])(*job['args'])
+            except Exception as e:
+                logger.error(f"전송 작업 오류 {job['key']}: {e}")
+                ok = False
+
+            with self.cond:
+                self.inflight = None
+                if self.spool_dir:
+                    self.discard_claim(job['key'])
+                if ok:
+                    self.stats['sent'] += 1
+                    if self.spool_dir:
+                        try:
+                            os.remove(self.spool_path(job['key']))
+                        except FileNotFoundError:
+                            pass
+                    continue
+
+                job['attempts'] += 1
+                self.stats['retries'] += 1
+                delay = min(self.backoff_base * 2 ** (job['attempts'] - 1), self.backoff_max)
+                job['not_before'] = time.monotonic() + delay * random.uniform(0.5, 1.0)  # jitter
+                logger.warning(f"전송 실패, {delay:.1f}초 후 재시도 ({job['key']}, {job['attempts']}회 실패)")
+
+                newer = self.pending.get(job['key'])
+                if newer is not None:
+                    # 재시도 중 새 스냅샷이 들어왔으면 새 작업이 백오프 상태를 이어받음
+                    newer['attempts'], newer['not_before'] = job['attempts'], job['not_before']
+                    self.spool(newer)
+                else:
+                    self.pending[job['key']] = job
+                    self.pending.move_to_end(job['key'], last=False)
+                    self.spool(job)
+
+    def qsize(self) -> int:
+        with self.cond:
+            return len(self.pending) + (self.inflight is not None)
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """대기 중인 작업이 모두 전송될 때까지 최대 timeout초 대기"""
+        deadline = time.monotonic() + timeout
+        while self.qsize():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def close(self, timeout: float = 10.0):
+        """남은 작업을 timeout초 동안 전송 시도 후, 못 보낸 작업은 spool에 기록하고 종료"""
+        self.flush(timeout)
+        with self.cond:
+            self.closed = True
+            for job in self.pending.values():
+                self.spool(job)
+            if self.pending:
+                logger.warning(f"미전송 작업 {len(self.pending)}개를 spool에 기록: {self.spool_dir}")
+            self.pending.clear()
+            self.cond.notify_all()
+        self.thread.join(timeout=self.publisher.timeout + 1)
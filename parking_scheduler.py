@@ -1,16 +1,18 @@
 #!/usr/bin/env python3
 """
 주차장 점유 현황 분석 스케줄러
-3분마다 자동으로 차량 인식 및 점유 현황 분석을 실행 (IoU 기반)
+3분마다 자동으로 차량 인식 및 점유 현황 분석을 실행 (IoU 기반, monotonic deadline으로 drift 없이)
 """
 
 import time
-import schedule
 import logging
+from collections import deque
 from datetime import datetime
+from typing import Optional
+import numpy as np
 from parking_occupancy_analyzer import ParkingOccupancyAnalyzer
-import subprocess
-import os
+from deadline_scheduler import DeadlineScheduler
+from video_sampler import VideoFrameSampler
 
 # 로깅 설정
 logging.basicConfig(
@@ -46,43 +48,56 @@ class ParkingScheduler:
         self.backend_url = backend_url
         self.interval_minutes = interval_minutes
         
+        # 영상은 한 번 열어 두고 주기마다 재사용 (ffmpeg 실행 + JPEG 인코딩/디코딩 왕복 제거)
+        self.sampler = None
+        self.frame_latencies_ms = deque(maxlen=100)  # 최근 주기별 프레임 추출 지연 시간
+        self.scheduler = DeadlineScheduler(max_workers=1)
+        
         # 분석기 초기화
         self.analyzer = ParkingOccupancyAnalyzer(
             roi_path=roi_path,
             model_path=model_path,
-            backend_url=backend_url
+            backend_url=backend_url,
+            change_gate=True,  # 장면이 그대로면 추론 생략 (야간/안정 구간 CPU 절감)
+            temporal_smoothing=True,  # 깜빡이는 탐지로 슬롯 상태가 뒤집히지 않도록 평활화
+            result_store="occupancy_history.db",  # 주기마다 JSON 파일 대신 시계열 저장소에 append
+            shift_detection=True  # 카메라가 밀리면 ROI를 자동 재투영 (첫 프레임 기준)
         )
         
         logger.info(f"주차장 분석 스케줄러 초기화 완료 - {interval_minutes}분 간격 (IoU 기반)")
     
-    def extract_frame_from_video(self, target_minutes: int) -> str:
-        """영상에서 특정 시간의 프레임 추출"""
+    def extract_frame_from_video(self, target_minutes: int) -> Optional[np.ndarray]:
+        """영상에서 특정 시간의 프레임 추출 (열려 있는 디코더에서 numpy 프레임으로 바로 반환)"""
         try:
-            # 프레임 추출 명령어
-            target_seconds = target_minutes * 60
-            output_path = f"frame_{target_minutes}min.jpg"
+            start = time.perf_counter()
             
-            cmd = [
-                "ffmpeg", "-i", self.video_path,
-                "-ss", str(target_seconds),
-                "-vframes", "1",
-                "-q:v", "2",
-                output_path,
-                "-y"  # 기존 파일 덮어쓰기
-            ]
+            if self.sampler is None:
+                self.sampler = VideoFrameSampler(self.video_path)
             
             logger.info(f"프레임 추출: {target_minutes}분 지점")
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            frame = self.sampler.read_at(target_minutes * 60)
+            if frame is None:
+                # 영상 파일이 교체되었을 수 있으므로 한 번 다시 열어서 재시도
+                self.sampler.release()
+                self.sampler = VideoFrameSampler(self.video_path)
+                frame = self.sampler.read_at(target_minutes * 60)
+            
+            latency_ms = (time.perf_counter() - start) * 1000
+            self.frame_latencies_ms.append(latency_ms)
             
-            if result.returncode == 0 and os.path.exists(output_path):
-                logger.info(f"프레임 추출 완료: {output_path}")
-                return output_path
-            else:
-                logger.error(f"프레임 추출 실패: {result.stderr}")
+            if frame is None:
+                logger.error(f"프레임 추출 실패: {target_minutes}분 지점")
                 return None
+            
+            logger.info(f"프레임 추출 완료: {latency_ms:.1f} ms "
+                        f"(최근 {len(self.frame_latencies_ms)}회 평균 {np.mean(self.frame_latencies_ms):.1f} ms)")
+            return frame
                 
         except Exception as e:
             logger.error(f"프레임 추출 중 오류: {e}")
+            if self.sampler is not None:
+                self.sampler.release()  # 다음 주기에 다시 열기 전에 디코더 핸들 반환
+            self.sampler = None
             return None
     
     def run_analysis_job(self):
@@ -95,44 +110,49 @@ class ParkingScheduler:
             minutes_from_start = (current_time.hour * 60 + current_time.minute) % self.interval_minutes
             
             # 프레임 추출
-            frame_path = self.extract_frame_from_video(minutes_from_start)
-            if not frame_path:
+            frame = self.extract_frame_from_video(minutes_from_start)
+            if frame is None:
                 logger.error("프레임 추출 실패")
                 return
             
-            # 분석기 업데이트
-            self.analyzer.image_path = frame_path
+            # 분석기 업데이트 (subprocess 모드에서만 이 경로에 프레임을 기록)
+            self.analyzer.image_path = f"frame_{minutes_from_start}min.jpg"
             
-            # 분석 실행
-            self.analyzer.run_analysis()
+            # 분석 실행 (프레임을 디스크를 거치지 않고 바로 전달)
+            self.analyzer.run_analysis(frame=frame)
             
             logger.info("=== 주차장 점유 현황 분석 완료 (IoU 기반) ===")
+            if self.analyzer.gate is not None:
+                logger.info(f"변화 감지 게이트: {self.analyzer.gate.summary()}")
+            if self.analyzer.slot_tracker is not None:
+                logger.info(f"슬롯 상태 평활화: {self.analyzer.slot_tracker.summary()}")
+            if self.analyzer.shift_monitor is not None:
+                logger.info(f"카메라 이동 감지: {self.analyzer.shift_monitor.summary()}")
             
         except Exception as e:
             logger.error(f"분석 작업 실행 중 오류: {e}")
     
     def start_scheduler(self):
-        """스케줄러 시작"""
+        """스케줄러 시작 (monotonic deadline 기반, 첫 번째 분석은 즉시 실행)"""
         logger.info("주차장 분석 스케줄러 시작 (IoU 기반)")
         
-        # 3분마다 실행
-        schedule.every(self.interval_minutes).minutes.do(self.run_analysis_job)
+        # 3분마다 실행 (이전 분석이 주기를 넘기면 밀린 주기를 합쳐 끝나는 즉시 한 번 실행)
+        self.scheduler.add_job("parking_analysis", self.run_analysis_job, self.interval_minutes * 60,
+                               overrun_policy="coalesce")
         
-        # 즉시 첫 번째 실행
-        logger.info("첫 번째 분석 작업 실행")
-        self.run_analysis_job()
-        
-        # 스케줄러 루프
-        while True:
-            try:
-                schedule.run_pending()
-                time.sleep(60)  # 1분마다 스케줄 확인
-            except KeyboardInterrupt:
-                logger.info("스케줄러 중단됨")
-                break
-            except Exception as e:
-                logger.error(f"스케줄러 실행 중 오류: {e}")
-                time.sleep(60)
+        # 스케줄러 루프 (10분마다 지연/실행 시간 지표 로그)
+        try:
+            self.scheduler.run_forever(metrics_interval=600)
+        finally:
+            self.stop()
+
+    def stop(self):
+        """영상 디코더와 분석기 정리 (남은 전송 작업 전송/spool, 저장소 닫기)"""
+        if self.sampler is not None:
+            self.sampler.release()
+            self.sampler = None
+        self.analyzer.close()
+        logger.info("주차장 분석 스케줄러 종료")
 
 def main():
     """메인 함수"""
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+다중 카메라 / 다중 주차장 점유 현황 서비스
+모델을 한 번만 로드해 N개 카메라가 공유하고, 같은 시점에 들어온 여러 카메라 프레임을 하나의 배치로 추론
+
+- 카메라마다 자체 주기(DeadlineScheduler 작업, 워커 풀에서 병렬 실행)로 프레임을 읽어 공유 배치 추론기에 제출
+- 배치 추론기는 max_batch개가 모이거나 batch_wait_ms가 지나면 한 번에 추론
+- 슬롯 매칭/전송/저장은 카메라별 ParkingOccupancyAnalyzer(ROI 파일, ROI 키, 주차장 ID)가 수행하고 전송 큐는 공유
+
+Usage:
+    $ python parking_service.py --config parking_cameras.example.json
+
+설정 파일 형식:
+    {
+      "model_path": "best_macos.pt",
+      "backend_url": "http://localhost:8080",
+      "max_batch": 8,
+      "batch_wait_ms": 50,
+      "result_store": "occupancy_history.db",
+      "cameras": [
+        {"camera_id": "camera1", "source": "IMG_8344.MOV", "roi_path": "roi_full_rect_coords.json",
+         "roi_key": "frame_30min.jpg", "parking_lot_id": "sanggyeonggwan", "interval_seconds": 180,
+         "change_gate": true, "temporal_smoothing": true, "shift_detection": true},
+        {"camera_id": "camera2", "source": "rtsp://...", "roi_path": "roi_camera2.json", "roi_key": "camera2.jpg",
+         "slot_classifier": "runs/train-cls/exp/weights/best.pt"}
+      ]
+    }
+    source는 영상 파일(서비스 경과 시간에 맞춰 재생 위치를 샘플링, 끝나면 처음부터) 또는 rtsp/http URL, 장치 번호
+    slot_classifier를 지정한 카메라는 전체 프레임 탐지 대신 슬롯 패치 분류 모드로 동작 (같은 모델은 카메라 간 공유)
+    parking_lot_id(기본: camera_id)는 카메라마다 달라야 함 - 전송 큐와 결과 저장소가 주차장 ID 기준이므로 중복이면 시작 시 거부
+    결과는 모든 카메라가 공유하는 시계열 저장소(result_store, SQLite)에 주차장 ID별로 append하고 시간별/일별 집계도 함께 갱신
+    (occupancy_analytics.py로 조회, null이면 주기마다 JSON 파일)
+    shift_detection(기본 true)은 카메라별로 낮은 주기의 ORB 특징점 매칭으로 카메라 이동을 감지해 ROI를 자동 재투영
+    (shift_reference: ROI를 그린 기준 프레임, 없으면 첫 프레임 기준)
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import partial
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from deadline_scheduler import DeadlineScheduler
+from occupancy_store import OccupancyStore
+from parking_detector import VehicleDetector
+from parking_occupancy_analyzer import ParkingOccupancyAnalyzer
+from parking_publisher import PublishQueue, SlotStatusPublisher
+from slot_classifier import SlotClassifier
+from video_sampler import VideoFrameSampler
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler('parking_service.log'),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger(__name__)
+
+
+class CameraSource:
+    def __init__(self, source: str, start_seconds: float = 0.0):
+        """
+        카메라 프레임 소스
+
+        Args:
+            source: 영상 파일 경로, 스트림 URL 또는 장치 번호 문자열
+            start_seconds: 영상 파일의 시작 재생 위치 (초)
+        """
+        self.source = source
+        self.is_stream = not os.path.isfile(source)
+        self.start_seconds = start_seconds
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.latest = None
+        self.stopped = False
+
+        if self.is_stream:
+            self.cap = cv2.VideoCapture(int(source) if source.isdigit() else source)
+            if not self.cap.isOpened():
+                raise ValueError(f"스트림을 열 수 없습니다: {source}")
+            # 스트림은 버퍼에 밀린 과거 프레임 대신 최신 프레임을 쓰도록 계속 읽어 둠
+            self.thread = threading.Thread(target=self.reader, name=f"reader-{source}", daemon=True)
+            self.thread.start()
+        else:
+            self.sampler = VideoFrameSampler(source)
+
+    def reader(self):
+        """스트림 최신 프레임 유지 (백그라운드 스레드)"""
+        while not self.stopped:
+            ret, frame = self.cap.read()
+            if not ret:
+                time.sleep(0.1)
+                continue
+            with self.lock:
+                self.latest = frame
+
+    def read(self) -> Optional[np.ndarray]:
+        """현재 시점의 프레임 (파일은 경과 시간 위치, 스트림은 최신 프레임)"""
+        if self.is_stream:
+            with self.lock:
+                return None if self.latest is None else self.latest.copy()
+        position = (self.start_seconds + time.monotonic() - self.started) % max(self.sampler.duration_seconds, 1e-6)
+        return self.sampler.read_at(position)
+
+    def release(self):
+        """소스 닫기"""
+        self.stopped = True
+        if self.is_stream:
+            self.thread.join(timeout=1)
+            self.cap.release()
+        else:
+            self.sampler.release()
+
+
+class InferenceBatcher:
+    def __init__(self, detector: VehicleDetector, max_batch: int = 8, batch_wait_ms: float = 50):
+        """
+        여러 카메라의 추론 요청을 모아 배치로 실행
+
+        Args:
+            detector: 공유 상주 탐지기
+            max_batch: 한 번에 추론할 최대 프레임 수
+            batch_wait_ms: 첫 요청 이후 다른 카메라 요청을 기다리는 최대 시간 (ms)
+        """
+        self.detector = detector
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait_ms / 1000
+        self.requests: "queue.Queue" = queue.Queue()
+        self.stats = {'batches': 0, 'frames': 0, 'max_batch': 0}
+        self.thread = threading.Thread(target=self.worker, name="inference-batcher", daemon=True)
+        self.thread.start()
+
+    def submit(self, frame: np.ndarray) -> Future:
+        """추론 요청 등록 (결과: (N, 6) 탐지 배열)"""
+        future = Future()
+        self.requests.put((frame, future))
+        return future
+
+    def detect(self, frame: np.ndarray) -> np.ndarray:
+        """추론 요청 후 결과 대기"""
+        return self.submit(frame).result()
+
+    def worker(self):
+        """배치 수집 및 추론 루프 (백그라운드 스레드)"""
+        while True:
+            item = self.requests.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self.requests.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.requests.put(None)  # 남은 배치를 처리한 뒤 종료
+                    break
+                batch.append(item)
+
+            frames = [frame for frame, _ in batch]
+            try:
+                start = time.perf_counter()
+                results = self.detector.detect_batch(frames)
+                logger.info(f"배치 추론 완료 - {len(frames)}개 프레임, {(time.perf_counter() - start) * 1000:.0f} ms")
+            except Exception as e:
+                logger.error(f"배치 추론 실패: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), det in zip(batch, results):
+                future.set_result(det)
+            self.stats['batches'] += 1
+            self.stats['frames'] += len(batch)
+            self.stats['max_batch'] = max(self.stats['max_batch'], len(batch))
+
+    def close(self):
+        """추론 루프 종료"""
+        self.requests.put(None)
+        self.thread.join(timeout=30)
+
+
+class ParkingService:
+    def __init__(self,
+                 cameras: List[Dict],
+                 model_path: str = "best_macos.pt",
+                 backend_url: str = "http://localhost:8080",
+                 max_batch: int = 8,
+                 batch_wait_ms: float = 50,
+                 device: str = "",
+                 result_store: Optional[str] = "occupancy_history.db"):
+        """
+        다중 카메라 서비스 초기화 (모델 1회 로드, 전송 큐 공유)
+
+        Args:
+            cameras: 카메라 설정 목록 (camera_id, source, roi_path, roi_key, parking_lot_id, interval_seconds,
+                     slot_classifier)
+            model_path: YOLO 모델 파일 경로
+            backend_url: 백엔드 서버 URL
+            max_batch: 한 번에 추론할 최대 프레임 수
+            batch_wait_ms: 배치를 모으는 최대 대기 시간 (ms)
+            device: 추론 장치
+            result_store: 카메라가 공유할 결과 시계열 저장소 경로 (None이면 주기마다 JSON 파일 저장)
+
+        Raises:
+            ValueError: 두 카메라의 parking_lot_id가 같을 때 (공유 전송 큐/저장소에서 서로의 스냅샷을 덮어씀)
+        """
+        lot_cameras = {}
+        for config in cameras:
+            lot_id = config.get('parking_lot_id', config['camera_id'])
+            if lot_id in lot_cameras:
+                raise ValueError(f"parking_lot_id '{lot_id}'가 카메라 {lot_cameras[lot_id]}, {config['camera_id']}에서 중복됩니다 "
+                                 f"(카메라마다 다른 주차장 ID 필요)")
+            lot_cameras[lot_id] = config['camera_id']
+
+        self.detector = VehicleDetector(model_path, device=device)
+        self.batcher = InferenceBatcher(self.detector, max_batch=max_batch, batch_wait_ms=batch_wait_ms)
+        self.publisher = SlotStatusPublisher(backend_url, headers={'Authorization': 'Bearer yolo_token'})  # YOLO 서비스 토큰
+        self.publish_queue = PublishQueue(self.publisher, owner="parking_service")
+        self.scheduler = DeadlineScheduler(max_workers=max(len(cameras), 1))
+        self.result_store = OccupancyStore(result_store, analytics=True) if result_store else None
+
+        self.classifiers = {}  # 분류 모델 경로 -> 공유 SlotClassifier
+        self.cameras = []
+        for config in cameras:
+            camera_id = config['camera_id']
+            classifier = None
+            if config.get('slot_classifier'):
+                weights = config['slot_classifier']
+                if weights not in self.classifiers:
+                    self.classifiers[weights] = SlotClassifier(weights, device=device)
+                classifier = self.classifiers[weights]
+            self.cameras.append({
+                'camera_id': camera_id,
+                'interval_seconds': float(config.get('interval_seconds', 180)),
+                'source': CameraSource(config['source'], config.get('start_seconds', 0.0)),
+                'analyzer': ParkingOccupancyAnalyzer(
+                    roi_path=config['roi_path'],
+                    roi_key=config['roi_key'],
+                    parking_lot_id=config.get('parking_lot_id', camera_id),
+                    detector=self.detector,
+                    publish_queue=self.publish_queue,
+                    camera_id=camera_id,
+                    overlap_method=config.get('overlap_method', "polygon"),
+                    change_gate=config.get('change_gate', True),
+                    slot_classifier=classifier,
+                    temporal_smoothing=config.get('temporal_smoothing', True),
+                    result_store=self.result_store,
+                    shift_detection=config.get('shift_detection', True),
+                    shift_reference=config.get('shift_reference')
+                )
+            })
+
+        logger.info(f"다중 카메라 서비스 초기화 완료 - 카메라 {len(self.cameras)}대, 최대 배치 {max_batch}")
+
+    def run_camera_cycle(self, camera: Dict):
+        """카메라 한 주기: 프레임 읽기 → 공유 배치 추론 → 슬롯 매칭/전송/저장"""
+        camera_id = camera['camera_id']
+        frame = camera['source'].read()
+        if frame is None:
+            logger.error(f"[{camera_id}] 프레임 읽기 실패")
+            return
+        if camera['analyzer'].slot_classifier is not None:
+            camera['analyzer'].run_analysis(frame=frame)  # 슬롯 패치 분류 모드 (게이트 판단 포함, 배치 추론기 사용 안 함)
+            return
+        if camera['analyzer'].frame_unchanged(frame):
+            return  # 슬롯 영역 변화 없음: 배치 추론에 넣지 않고 이전 상태 유지
+        detections = self.batcher.detect(frame)
+        camera['analyzer'].run_analysis(frame=frame, detections=detections)
+
+    def start(self):
+        """카메라별 주기 작업을 deadline 스케줄러에 등록 (카메라 작업은 워커 풀에서 병렬 실행)"""
+        for camera in self.cameras:
+            self.scheduler.add_job(camera['camera_id'], partial(self.run_camera_cycle, camera),
+                                   camera['interval_seconds'], overrun_policy="skip")
+        self.scheduler.start()
+        logger.info("다중 카메라 서비스 시작")
+
+    def stop(self):
+        """스케줄러, 배치 추론기, 전송 큐 정리"""
+        self.scheduler.stop()
+        self.scheduler.log_metrics()
+        for camera in self.cameras:
+            gate, tracker = camera['analyzer'].gate, camera['analyzer'].slot_tracker
+            if gate is not None:
+                logger.info(f"[{camera['camera_id']}] 변화 감지 게이트: {gate.summary()}")
+            if tracker is not None:
+                logger.info(f"[{camera['camera_id']}] 슬롯 상태 평활화: {tracker.summary()}")
+            if camera['analyzer'].shift_monitor is not None:
+                logger.info(f"[{camera['camera_id']}] 카메라 이동 감지: {camera['analyzer'].shift_monitor.summary()}")
+        self.batcher.close()
+        self.publish_queue.close()
+        self.publisher.close()
+        if self.result_store is not None:
+            self.result_store.close()
+        for camera in self.cameras:
+            camera['source'].release()
+        logger.info(f"다중 카메라 서비스 종료 - 배치 통계: {self.batcher.stats}")
+
+    def run_forever(self, metrics_interval: float = 600):
+        """Ctrl+C까지 실행 (metrics_interval초마다 카메라별 지연/실행 시간 지표 로그)"""
+        self.start()
+        try:
+            while True:
+                time.sleep(metrics_interval)
+                self.scheduler.log_metrics()
+        except KeyboardInterrupt:
+            logger.info("서비스 중단됨")
+        finally:
+            self.stop()
+
+
+def load_config(path: str) -> Dict:
+    """서비스 설정 JSON 로드"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    """메인 함수"""
+    parser = argparse.ArgumentParser(description="다중 카메라 주차장 점유 현황 서비스")
+    parser.add_argument("--config", type=str, default="parking_cameras.json", help="서비스 설정 JSON 경로")
+    parser.add_argument("--device", type=str, default="", help="추론 장치 ('', 'cpu', '0', 'mps')")
+    opt = parser.parse_args()
+
+    config = load_config(opt.config)
+    service = ParkingService(
+        cameras=config['cameras'],
+        model_path=config.get('model_path', "best_macos.pt"),
+        backend_url=config.get('backend_url', "http://localhost:8080"),
+        max_batch=config.get('max_batch', 8),
+        batch_wait_ms=config.get('batch_wait_ms', 50),
+        device=opt.device,
+        result_store=config.get('result_store', "occupancy_history.db")
+    )
+    service.run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,8 @@ import json
 import cv2
 import numpy as np
 
+from roi_transform import resize_matrix, transform_roi, translation
+
 def precise_roi_conversion():
     """정확한 크기 정보로 ROI 좌표 변환"""
     
@@ -30,33 +32,10 @@ def precise_roi_conversion():
     print(f"너비 비율: {width_ratio:.3f}")
     print(f"높이 비율: {height_ratio:.3f}")
     
-    adjusted_roi_data = {}
-    
-    for image_key, slots in roi_data.items():
-        adjusted_slots = []
-        
-        for slot in slots:
-            adjusted_coords = []
-            
-            for coord in slot['coords']:
-                x, y = coord
-                
-                # 정확한 비율로 변환
-                new_x = int(x * width_ratio)
-                new_y = int(y * height_ratio)
-                
-                # 좌표가 이미지 범위 내에 있는지 확인
-                new_x = max(0, min(new_x, video_width - 1))
-                new_y = max(0, min(new_y, video_height - 1))
-                
-                adjusted_coords.append([new_x, new_y])
-            
-            adjusted_slots.append({
-                'slot_id': slot['slot_id'],
-                'coords': adjusted_coords
-            })
-        
-        adjusted_roi_data[image_key] = adjusted_slots
+    # 정확한 비율로 모든 슬롯을 한 번에 변환 (이미지 범위로 자름)
+    adjusted_roi_data = transform_roi(roi_data, resize_matrix((original_width, original_height), (video_width, video_height)),
+                                      clip_size=(video_width, video_height), rounding="trunc")
+    adjusted_slots = adjusted_roi_data[next(iter(adjusted_roi_data))]
     
     # 저장
     with open("roi_precise_coords.json", 'w', encoding='utf-8') as f:
@@ -113,29 +92,8 @@ def test_with_offset():
     offsets = [0, 50, 100, 150, 200]
     
     for offset in offsets:
-        adjusted_data = {}
-        
-        for image_key, slots in precise_data.items():
-            adjusted_slots = []
-            
-            for slot in slots:
-                adjusted_coords = []
-                
-                for coord in slot['coords']:
-                    x, y = coord
-                    new_y = y - offset
-                    
-                    # 좌표가 이미지 범위 내에 있는지 확인
-                    new_y = max(0, min(new_y, 1080 - 1))
-                    
-                    adjusted_coords.append([x, new_y])
-                
-                adjusted_slots.append({
-                    'slot_id': slot['slot_id'],
-                    'coords': adjusted_coords
-                })
-            
-            adjusted_data[image_key] = adjusted_slots
+        adjusted_data = transform_roi(precise_data, translation(0, -offset), clip_size=(1920, 1080), rounding="trunc")
+        adjusted_slots = adjusted_data[next(iter(adjusted_data))]
         
         # 저장
         output_path = f"roi_precise_offset_{offset}.json"
@@ -2,16 +2,24 @@
 """
 ROI 좌표 찍기 도구
 마우스로 4개 점을 찍어서 사각형을 만들고, 확대/축소 및 미세 조정 가능
+roi_suggest.py가 제안한 ROI 파일을 불러와(L) 검토/수정 후 저장(S)할 수 있음
+
+Usage:
+    $ python roi_coordinate_tool.py
+    $ python roi_coordinate_tool.py --image roi_suggested_frame.jpg --roi roi_suggested.json
 """
 
+import argparse
 import cv2
 import numpy as np
 import json
 import os
 
 class ROICoordinateTool:
-    def __init__(self, image_path="frame_30min.jpg"):
+    def __init__(self, image_path="frame_30min.jpg", roi_path="roi_manual_coords.json", roi_key="frame_30min.jpg"):
         self.image_path = image_path
+        self.roi_path = roi_path
+        self.roi_key = roi_key
         self.original_image = None
         self.display_image = None
         self.scale = 1.0
@@ -256,16 +264,16 @@ class ROICoordinateTool:
         
         # JSON 형식으로 저장
         roi_data = {
-            "frame_30min.jpg": []
+            self.roi_key: []
         }
         
         for rect in self.current_rectangles:
-            roi_data["frame_30min.jpg"].append({
+            roi_data[self.roi_key].append({
                 "slot_id": rect['slot_id'],
                 "coords": rect['points']
             })
         
-        output_path = "roi_manual_coords.json"
+        output_path = self.roi_path
         with open(output_path, 'w', encoding='utf-8') as f:
             json.dump(roi_data, f, ensure_ascii=False, indent=4)
         
@@ -287,18 +295,19 @@ class ROICoordinateTool:
             cv2.putText(preview_image, slot_id, (center_x-20, center_y), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
         
-        cv2.imwrite("roi_manual_preview.jpg", preview_image)
-        print(f"✅ 미리보기 저장: roi_manual_preview.jpg")
+        preview_path = output_path.rsplit('.', 1)[0].replace('_coords', '') + "_preview.jpg"
+        cv2.imwrite(preview_path, preview_image)
+        print(f"✅ 미리보기 저장: {preview_path}")
     
     def load_rectangles(self):
         """저장된 사각형 불러오기"""
-        if os.path.exists("roi_manual_coords.json"):
-            with open("roi_manual_coords.json", 'r', encoding='utf-8') as f:
+        if os.path.exists(self.roi_path):
+            with open(self.roi_path, 'r', encoding='utf-8') as f:
                 roi_data = json.load(f)
             
-            if "frame_30min.jpg" in roi_data:
+            if self.roi_key in roi_data:
                 self.current_rectangles = []
-                for slot_data in roi_data["frame_30min.jpg"]:
+                for slot_data in roi_data[self.roi_key]:
                     self.current_rectangles.append({
                         'slot_id': slot_data['slot_id'],
                         'points': slot_data['coords']
@@ -352,5 +361,10 @@ class ROICoordinateTool:
         print("\n✅ ROI 좌표 찍기 완료!")
 
 if __name__ == "__main__":
-    tool = ROICoordinateTool()
+    parser = argparse.ArgumentParser(description="ROI 좌표 찍기 도구")
+    parser.add_argument("--image", type=str, default="frame_30min.jpg", help="ROI를 그릴 프레임 이미지")
+    parser.add_argument("--roi", type=str, default="roi_manual_coords.json", help="불러오기(L)/저장(S)할 ROI 좌표 JSON")
+    parser.add_argument("--roi-key", type=str, default="frame_30min.jpg", help="ROI 키")
+    opt = parser.parse_args()
+    tool = ROICoordinateTool(opt.image, opt.roi, opt.roi_key)
     tool.run() 
\ No newline at end of file
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+공유 ROI 레지스트리
+ROI JSON을 파일당 한 번만 파싱/검증해 ROI 키별 SlotGeometry(연속 numpy 배열: 꼭짓점, 오프셋, 외접 사각형, 면적)로
+컴파일해 두고, 같은 파일을 쓰는 모든 분석기/카메라가 같은 컴파일 결과를 공유
+
+- 잘못된 슬롯(형식 오류, 꼭짓점 3개 미만, NaN/inf 좌표, 면적 0, 자기 교차, 중복 slot_id)은 경고 후 제외
+- 파일 mtime/크기를 check_interval초마다 확인해 바뀌면 다시 컴파일 (서비스 재시작 없이 ROI 수정 반영)
+- 새 파일을 읽을 수 없으면(저장 중, JSON 오류 등) 이전 컴파일 결과를 그대로 유지
+- version은 다시 컴파일할 때마다 증가 (파생 캐시 무효화용), SlotGeometry 객체도 새로 생성되므로 id 기반 캐시도 갱신됨
+
+Usage:
+    $ python roi_registry.py --roi roi_full_rect_coords.json  # 검증 결과 출력 (잘못된 슬롯이 있으면 종료 코드 1)
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from shapely.geometry import Polygon
+
+from slot_occupancy import SlotGeometry, SlotRasterIndex
+
+logger = logging.getLogger(__name__)
+
+# 이보다 작은 면적(픽셀^2)의 슬롯은 잘못 찍은 것으로 보고 제외
+MIN_SLOT_AREA = 1.0
+
+
+def validate_slots(key: str, slots) -> Tuple[List[Dict], List[str]]:
+    """
+    ROI 키 하나의 슬롯 목록 검증
+
+    Returns:
+        (유효한 슬롯 목록, 제외한 슬롯별 사유 목록)
+    """
+    if not isinstance(slots, list):
+        return [], [f"{key}: 슬롯 목록이 리스트가 아닙니다"]
+
+    valid, issues, seen = [], [], set()
+    for i, slot in enumerate(slots):
+        try:
+            slot_id = slot['slot_id']
+            coords = np.asarray(slot['coords'], dtype=np.float64).reshape(-1, 2)
+            duplicate = slot_id in seen
+        except (KeyError, TypeError, ValueError) as e:
+            issues.append(f"{key}[{i}]: 슬롯 형식 오류 ({e})")
+            continue
+
+        name = f"{key}/{slot_id}"
+        if duplicate:
+            issues.append(f"{name}: 중복 slot_id")
+        elif len(coords) < 3:
+            issues.append(f"{name}: 꼭짓점 {len(coords)}개 (3개 이상 필요)")
+        elif not np.isfinite(coords).all():
+            issues.append(f"{name}: 유한하지 않은 좌표")
+        else:
+            polygon = Polygon(coords)
+            if polygon.area < MIN_SLOT_AREA:
+                issues.append(f"{name}: 면적 {polygon.area:.1f} (퇴화 다각형)")
+            elif not polygon.is_valid:
+                issues.append(f"{name}: 자기 교차 다각형")
+            else:
+                seen.add(slot_id)
+                valid.append(slot)
+    return valid, issues
+
+
+class RoiRegistry:
+    # 절대 경로 -> 공유 레지스트리 (같은 ROI 파일을 쓰는 분석기는 같은 인스턴스 사용)
+    _shared: Dict[str, "RoiRegistry"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: str, check_interval: float = 1.0):
+        """
+        ROI 파일을 읽어 컴파일
+
+        Args:
+            path: ROI 좌표 JSON 경로 ({ROI 키: [{'slot_id': ..., 'coords': [[x, y], ...]}, ...]})
+            check_interval: refresh()가 실제로 파일을 확인하는 최소 간격 (초, 0이면 매번)
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.signature = None  # 마지막으로 읽은 파일의 (mtime_ns, 크기)
+        self.checked_at = 0.0
+        self.version = 0
+        self.data: Dict[str, List[Dict]] = {}  # ROI 키 -> 검증된 슬롯 목록
+        self.geometries: Dict[str, SlotGeometry] = {}  # ROI 키 -> 컴파일된 슬롯 배열
+        self.rasters: Dict[tuple, SlotRasterIndex] = {}  # (ROI 키, 프레임 크기) -> 래스터 인덱스
+        self.issues: List[str] = []
+        self.empty = SlotGeometry([])  # 없는 ROI 키용 (항상 같은 객체를 돌려줘야 geometry 기반 캐시가 유지됨)
+        self.load()
+
+    @classmethod
+    def shared(cls, path: str, check_interval: float = 1.0) -> "RoiRegistry":
+        """경로별 공유 레지스트리 (처음 요청할 때 한 번만 로드)"""
+        key = os.path.abspath(path)
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(path, check_interval)
+            return cls._shared[key]
+
+    def file_signature(self) -> Optional[Tuple[int, int]]:
+        """파일 (mtime_ns, 크기) (파일이 없으면 None)"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def load(self) -> bool:
+        """파일을 읽어 검증/컴파일 (성공하면 True, 실패하면 이전 결과 유지)"""
+        signature = self.file_signature()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+            if not isinstance(raw, dict):
+                raise ValueError("최상위가 {ROI 키: 슬롯 목록} 객체가 아닙니다")
+        except Exception as e:
+            self.signature = signature  # 같은 깨진 파일을 매번 다시 읽지 않도록 (다시 저장되면 재시도)
+            logger.error(f"ROI 데이터 로드 실패: {e}" + (" - 이전 ROI 유지" if self.version else ""))
+            return False
+
+        data, geometries, issues = {}, {}, []
+        for key, slots in raw.items():
+            data[key], key_issues = validate_slots(key, slots)
+            geometries[key] = SlotGeometry(data[key])
+            issues.extend(key_issues)
+        for issue in issues:
+            logger.warning(f"잘못된 ROI 슬롯 제외 - {issue}")
+
+        # 조회 쪽은 잠금 없이 읽으므로 geometry -> data 순서로 교체
+        self.geometries, self.rasters, self.issues = geometries, {}, issues
+        self.data = data
+        self.signature = signature
+        self.version += 1
+        logger.info(f"ROI 데이터 로드 완료 - {len(data)}개 이미지의 슬롯 정보 "
+                    f"(슬롯 {sum(len(g) for g in geometries.values())}개, 제외 {len(issues)}개, v{self.version})")
+        return True
+
+    def refresh(self) -> bool:
+        """파일 mtime/크기가 바뀌었으면 다시 컴파일 (다시 로드했으면 True)"""
+        now = time.monotonic()
+        if now - self.checked_at < self.check_interval:
+            return False
+        with self.lock:
+            if now - self.checked_at < self.check_interval:  # 다른 스레드가 방금 확인함
+                return False
+            self.checked_at = now
+            signature = self.file_signature()
+            if signature is None or signature == self.signature:
+                return False
+            logger.info(f"ROI 파일 변경 감지, 다시 로드: {self.path}")
+            return self.load()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.data
+
+    def __len__(self):
+        return len(self.data)
+
+    def keys(self) -> List[str]:
+        """ROI 키 목록 (파일 순서)"""
+        return list(self.data)
+
+    def first_key(self) -> Optional[str]:
+        """첫 번째 ROI 키 (없으면 None)"""
+        return next(iter(self.data), None)
+
+    def slots(self, key: str) -> List[Dict]:
+        """ROI 키의 검증된 슬롯 목록 (없는 키면 빈 목록)"""
+        return self.data.get(key, [])
+
+    def geometry(self, key: str) -> SlotGeometry:
+        """ROI 키의 컴파일된 슬롯 배열 (없는 키면 빈 geometry)"""
+        return self.geometries.get(key, self.empty)
+
+    def raster(self, key: str, image_shape: Sequence[int]) -> SlotRasterIndex:
+        """ROI 키와 프레임 크기별 슬롯 래스터 인덱스 (디스크 캐시 재사용, ROI가 바뀌면 다시 생성)"""
+        rasters = self.rasters
+        cache_key = (key, tuple(image_shape[:2]))
+        if cache_key not in rasters:
+            rasters[cache_key] = SlotRasterIndex.cached(self.slots(key), image_shape)
+        return rasters[cache_key]
+
+
+def main():
+    """메인 함수"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="ROI 좌표 파일 검증")
+    parser.add_argument("--roi", type=str, default="roi_full_rect_coords.json", help="ROI 좌표 JSON 경로")
+    opt = parser.parse_args()
+
+    registry = RoiRegistry(opt.roi)
+    for key in registry.keys():
+        geometry = registry.geometry(key)
+        logger.info(f"{key}: 슬롯 {len(geometry)}개, 꼭짓점 {len(geometry.points)}개, "
+                    f"평균 면적 {geometry.areas.mean() if len(geometry) else 0:.0f}px")
+    if registry.version == 0 or registry.issues:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
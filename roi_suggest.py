@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+누적 차량 탐지 기반 ROI 슬롯 자동 제안
+여러 샘플 프레임의 차량 탐지 박스를 모아 박스 중심을 격자 밀도 지도로 만들고, 지역 최대점(mode)을 슬롯 후보로 삼아
+각 박스를 가장 가까운 후보에 배정한 뒤 후보별 박스 중앙값으로 슬롯 사각형을 제안 (기존 ROI JSON 형식)
+
+- 전부 numpy 벡터 연산 (bincount 밀도 지도 + dilate 지역 최대점 + KD-tree 최근접 배정 + 정렬 기반 그룹 중앙값)
+  탐지 수만 개도 수십 ms 안에 처리
+- 지지도(support) = 후보 위치에 차량이 있었던 프레임 비율, min_support 미만(지나가는 차량, 오탐)은 제외
+- 겹치는 후보는 지지도가 높은 쪽만 남김 (NMS), 슬롯 ID는 위 -> 아래, 왼쪽 -> 오른쪽 순서
+- 관찰 기간 내내 비어 있던 슬롯은 제안되지 않으므로, 결과는 roi_coordinate_tool.py로 불러와(L) 검토/추가 후 저장
+
+Usage:
+    $ python roi_suggest.py --video parking_lot.mp4 --weights best_macos.pt --interval 60 --out roi_suggested.json
+    $ python roi_suggest.py --detections roi_suggested_detections.npz --min-support 0.2 --out roi_suggested.json
+    $ python detect.py --weights best_macos.pt --source frames/ --save-txt --save-conf
+    $ python roi_suggest.py --labels runs/detect/exp/labels --size 1920 1080 --out roi_suggested.json
+    $ python roi_coordinate_tool.py --image roi_suggested_frame.jpg --roi roi_suggested.json  # 검토 (L: 불러오기, S: 저장)
+"""
+
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+from scipy.spatial import cKDTree
+
+logger = logging.getLogger(__name__)
+
+
+def group_median(values: np.ndarray, labels: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    그룹별 중앙값 (정렬 한 번으로 모든 그룹 동시 계산)
+
+    Args:
+        values: (N, D) 값
+        labels: (N,) 0..n_groups-1 그룹 번호 (모든 그룹에 원소가 1개 이상 있어야 함)
+    Returns:
+        (n_groups, D) 그룹별 중앙값
+    """
+    counts = np.bincount(labels, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    lo, hi = starts + (counts - 1) // 2, starts + counts // 2
+    result = np.empty((n_groups, values.shape[1]))
+    for d in range(values.shape[1]):
+        v = values[np.lexsort((values[:, d], labels)), d]
+        result[:, d] = (v[lo] + v[hi]) / 2
+    return result
+
+
+def box_nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """점수 내림차순 greedy NMS (남길 인덱스)"""
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    order = np.argsort(-scores, kind="stable")
+    keep = []
+    while len(order):
+        i, rest = order[0], order[1:]
+        keep.append(i)
+        wh = np.clip(np.minimum(boxes[i, 2:], boxes[rest, 2:]) - np.maximum(boxes[i, :2], boxes[rest, :2]), 0, None)
+        inter = wh[:, 0] * wh[:, 1]
+        order = rest[inter / (areas[i] + areas[rest] - inter) <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+def reading_order(boxes: np.ndarray) -> np.ndarray:
+    """위 -> 아래 줄 단위, 줄 안에서는 왼쪽 -> 오른쪽 순서 (중심 y 차이가 박스 높이 중앙값의 절반 이내면 같은 줄)"""
+    if not len(boxes):
+        return np.zeros(0, dtype=np.int64)
+    cx, cy = (boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2
+    by_y = np.argsort(cy, kind="stable")
+    gap = np.median(boxes[:, 3] - boxes[:, 1]) / 2
+    row = np.concatenate(([0], np.cumsum(np.diff(cy[by_y]) > gap)))
+    rows = np.empty(len(boxes), dtype=np.int64)
+    rows[by_y] = row
+    return np.lexsort((cx, rows))
+
+
+def suggest_slots(boxes: np.ndarray,
+                  frame_ids: np.ndarray,
+                  image_size: Tuple[int, int],
+                  cell: Optional[float] = None,
+                  radius: float = 0.5,
+                  min_support: float = 0.1,
+                  min_frames: int = 3,
+                  nms_iou: float = 0.3,
+                  n_frames: Optional[int] = None) -> List[Dict]:
+    """
+    누적 탐지 박스에서 슬롯 사각형 제안
+
+    Args:
+        boxes: (N, 4) 픽셀 xyxy 탐지 박스 (모든 프레임)
+        frame_ids: (N,) 박스가 나온 프레임 번호 (0..F-1, 탐지가 없는 프레임도 번호를 차지해야 지지도가 정확함)
+        image_size: 프레임 크기 (w, h)
+        cell: 밀도 지도 격자 크기 (픽셀, None이면 박스 짧은 변 중앙값의 1/4)
+        radius: 박스 중심이 후보에서 (박스 짧은 변 x radius) 안에 있어야 그 후보에 배정
+        min_support: 후보 위치에 차량이 있었던 프레임 비율 하한
+        min_frames: 후보를 믿기 위한 최소 프레임 수
+        nms_iou: 제안 사각형끼리 이 IoU를 넘으면 지지도 낮은 쪽 제외
+        n_frames: 샘플 프레임 수 (None이면 frame_ids 최댓값 + 1)
+    Returns:
+        [{'slot_id': 'slot_1', 'coords': [[x, y] x 4], 'support': 비율}, ...] (읽기 순서)
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    frame_ids = np.asarray(frame_ids).reshape(-1)
+    if not len(boxes):
+        return []
+    n_frames = n_frames or int(frame_ids.max()) + 1
+    width, height = image_size
+    centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+    short = np.minimum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1])
+    size = float(np.median(short))
+    cell = cell or max(2.0, size / 4)
+
+    # 1. 박스 중심 밀도 지도 -> 박스 반경 안의 지역 최대점 = 슬롯 후보
+    cols, rows = int(np.ceil(width / cell)), int(np.ceil(height / cell))
+    gx = np.clip((centers[:, 0] / cell).astype(np.int64), 0, cols - 1)
+    gy = np.clip((centers[:, 1] / cell).astype(np.int64), 0, rows - 1)
+    density = np.bincount(gy * cols + gx, minlength=rows * cols).reshape(rows, cols).astype(np.float32)
+    density = cv2.GaussianBlur(density, (0, 0), 1.0)
+    k = 2 * max(1, int(round(radius * size / cell))) + 1
+    peak_mask = (density >= cv2.dilate(density, np.ones((k, k), np.uint8))) & (density > 0)
+    py, px = np.nonzero(peak_mask)
+    if not len(px):
+        return []
+    seeds = (np.stack((px, py), axis=1) + 0.5) * cell
+
+    # 2. 최근접 후보 배정 (한 번 중앙값으로 후보 위치를 다듬고 다시 배정)
+    for _ in range(2):
+        dist, label = cKDTree(seeds).query(centers)
+        member = dist <= radius * short
+        used, label = np.unique(label[member], return_inverse=True)
+        if not len(used):
+            return []
+        seeds = group_median(centers[member], label, len(used))
+    members = boxes[member]
+
+    # 3. 후보별 지지도(차량이 있었던 프레임 수)와 박스 중앙값
+    frames_per_seed = np.bincount(np.unique(label * n_frames + frame_ids[member]) // n_frames, minlength=len(used))
+    support = frames_per_seed / n_frames
+    rects = group_median(members, label, len(used))
+    ok = (frames_per_seed >= min_frames) & (support >= min_support)
+    rects, support = rects[ok], support[ok]
+    keep = box_nms(rects, support, nms_iou)
+    rects, support = rects[keep], support[keep]
+
+    rects = np.clip(np.round(rects), 0, [width - 1, height - 1, width - 1, height - 1]).astype(int)
+    slots = []
+    for i, j in enumerate(reading_order(rects)):
+        x1, y1, x2, y2 = rects[j].tolist()
+        slots.append({'slot_id': f"slot_{i + 1}", 'coords': [[x1, y1], [x2, y1], [x2, y2], [x1, y2]],
+                      'support': round(float(support[j]), 3)})
+    return slots
+
+
+def video_detections(opt) -> Tuple[np.ndarray, np.ndarray, int, Tuple[int, int], np.ndarray]:
+    """영상을 interval초 간격으로 샘플링해 배치 추론 -> (박스, 프레임 번호, 프레임 수, 프레임 크기, 첫 프레임)"""
+    from parking_detector import VEHICLE_CLASSES, VehicleDetector
+    from video_sampler import VideoFrameSampler
+
+    detector = VehicleDetector(opt.weights, imgsz=opt.imgsz, conf_thres=opt.conf, classes=VEHICLE_CLASSES)
+    boxes, frame_ids, first, batch = [], [], None, []
+
+    def flush():
+        for det in detector.detect_batch(batch):
+            boxes.append(det[:, :4])
+            frame_ids.append(np.full(len(det), len(frame_ids)))
+        batch.clear()
+
+    with VideoFrameSampler(opt.video) as sampler:
+        for t, frame in sampler.iter_interval(opt.interval, opt.start, opt.end):
+            first = frame if first is None else first
+            batch.append(frame)
+            if len(batch) == opt.batch_size:
+                flush()
+                logger.info(f"탐지 누적 - {t:.0f}초, 프레임 {len(frame_ids)}개, 박스 {sum(map(len, boxes))}개")
+        if batch:
+            flush()
+    if first is None:
+        raise ValueError(f"영상에서 프레임을 읽지 못했습니다: {opt.video}")
+    return np.concatenate(boxes), np.concatenate(frame_ids), len(frame_ids), (first.shape[1], first.shape[0]), first
+
+
+def label_detections(labels_dir: str, size: Sequence[int], conf: float) -> Tuple[np.ndarray, np.ndarray, int]:
+    """detect.py --save-txt 라벨 폴더 (파일 하나 = 프레임 하나) -> (박스, 프레임 번호, 프레임 수)"""
+    from calibrate_occupancy import load_boxes
+    from parking_detector import VEHICLE_CLASSES
+
+    boxes, frame_ids = [], []
+    for i, path in enumerate(sorted(Path(labels_dir).glob("*.txt"))):
+        b = load_boxes(str(path), size[0], size[1], VEHICLE_CLASSES, conf)
+        boxes.append(b)
+        frame_ids.append(np.full(len(b), i))
+    if not boxes:
+        raise ValueError(f"라벨 파일이 없습니다: {labels_dir}")
+    return np.concatenate(boxes), np.concatenate(frame_ids), len(frame_ids)
+
+
+def main():
+    """메인 함수"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="누적 차량 탐지 기반 ROI 슬롯 자동 제안")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--video", type=str, help="샘플링할 주차장 영상")
+    source.add_argument("--labels", type=str, help="detect.py --save-txt 라벨 폴더 (--size 필요)")
+    source.add_argument("--detections", type=str, help="이전 실행에서 저장한 누적 탐지 .npz")
+    parser.add_argument("--weights", type=str, default="best_macos.pt", help="모델 경로 (--video)")
+    parser.add_argument("--imgsz", type=int, default=640, help="추론 입력 크기")
+    parser.add_argument("--conf", type=float, default=0.4, help="탐지 신뢰도 하한")
+    parser.add_argument("--interval", type=float, default=60, help="샘플링 간격 (초)")
+    parser.add_argument("--start", type=float, default=0.0, help="샘플링 시작 (초)")
+    parser.add_argument("--end", type=float, default=None, help="샘플링 끝 (초, 기본: 영상 끝)")
+    parser.add_argument("--batch-size", type=int, default=4, help="배치 추론 크기")
+    parser.add_argument("--size", type=int, nargs=2, default=None, metavar=("W", "H"), help="프레임 크기 (--labels)")
+    parser.add_argument("--out", type=str, default="roi_suggested.json", help="제안 ROI 좌표 JSON")
+    parser.add_argument("--roi-key", type=str, default="frame_30min.jpg", help="출력 ROI 키 (roi_coordinate_tool.py 기본 키)")
+    parser.add_argument("--cell", type=float, default=None, help="밀도 지도 격자 크기 (픽셀, 기본: 박스 크기의 1/4)")
+    parser.add_argument("--radius", type=float, default=0.5, help="후보 배정 반경 (박스 짧은 변 비율)")
+    parser.add_argument("--min-support", type=float, default=0.1, help="차량이 있었던 프레임 비율 하한")
+    parser.add_argument("--min-frames", type=int, default=3, help="최소 프레임 수")
+    parser.add_argument("--nms-iou", type=float, default=0.3, help="겹치는 제안 제거 IoU")
+    parser.add_argument("--preview", type=str, default=None, help="제안 ROI를 그릴 프레임 이미지 (--video면 첫 프레임)")
+    opt = parser.parse_args()
+
+    stem = opt.out.rsplit('.', 1)[0]
+    frame = None
+    if opt.video:
+        boxes, frame_ids, n_frames, size, frame = video_detections(opt)
+        np.savez_compressed(f"{stem}_detections.npz", boxes=boxes, frame_ids=frame_ids, n_frames=n_frames, size=size)
+        cv2.imwrite(f"{stem}_frame.jpg", frame)
+        logger.info(f"누적 탐지 저장: {stem}_detections.npz, 기준 프레임: {stem}_frame.jpg")
+    elif opt.labels:
+        if opt.size is None:
+            parser.error("--labels에는 --size W H가 필요합니다")
+        size = tuple(opt.size)
+        boxes, frame_ids, n_frames = label_detections(opt.labels, size, opt.conf)
+    else:
+        cache = np.load(opt.detections)
+        boxes, frame_ids, n_frames = cache['boxes'], cache['frame_ids'], int(cache['n_frames'])
+        size = tuple(int(v) for v in cache['size'])
+
+    t = time.perf_counter()
+    slots = suggest_slots(boxes, frame_ids, size, opt.cell, opt.radius, opt.min_support, opt.min_frames, opt.nms_iou,
+                          n_frames)
+    elapsed = time.perf_counter() - t
+    with open(opt.out, 'w', encoding='utf-8') as f:
+        json.dump({opt.roi_key: slots}, f, ensure_ascii=False, indent=4)
+    logger.info(f"프레임 {n_frames}개, 탐지 {len(boxes)}개 -> 슬롯 {len(slots)}개 제안 "
+                f"({elapsed * 1000:.1f}ms) -> {opt.out}")
+
+    if opt.preview:
+        frame = cv2.imread(opt.preview)
+        if frame is None:
+            logger.error(f"미리보기 이미지를 로드할 수 없습니다: {opt.preview}")
+            return
+    if frame is not None:
+        from roi_transform import draw_roi
+
+        preview_path = f"{stem}_preview.jpg"
+        cv2.imwrite(preview_path, draw_roi(frame.copy(), {opt.roi_key: slots}, opt.roi_key))
+        logger.info(f"미리보기 저장: {preview_path}")
+
+
+if __name__ == "__main__":
+    main()
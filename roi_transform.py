@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+ROI 좌표 일괄 변환 엔진
+모든 카메라(ROI 키)의 모든 슬롯 꼭짓점을 하나의 (N, 2) 배열로 모아 3x3 변환 행렬(평행 이동, 스케일, 회전,
+해상도 변환, affine, homography)을 한 번의 행렬 연산으로 적용하고 다시 슬롯별로 나눔
+
+- 변환은 3x3 동차 좌표 행렬로 통일하고 compose()로 합성 (오른쪽부터가 아니라 인자 순서대로 적용)
+- fit_transform(): 기준점 쌍(원래 ROI 위치 -> 현재 프레임 위치)에서 변환 추정
+  점 개수에 따라 translation(1쌍) / similarity(2쌍) / affine(3쌍) / homography(4쌍 이상, RANSAC) 자동 선택
+- 기존 fine_tune_roi.py, precise_roi_adjustment.py, adjust_roi_*.py의 슬롯별 오프셋/스케일 루프를 대체
+
+Usage:
+    $ python roi_transform.py --roi roi_full_rect_coords.json --out roi_precise_coords.json --resize 2556 1179 1920 1080 --clip 1920 1080
+    $ python roi_transform.py --roi roi_precise_coords.json --out roi_shifted.json --offset 0 -150 --scale 0.95 1.0
+    $ python roi_transform.py --roi roi_full_rect_coords.json --out roi_recalibrated.json \
+        --src 102 640 1810 655 1795 1020 130 1005 --dst 98 610 1801 632 1790 992 121 979 --preview frame.jpg
+"""
+
+import argparse
+import json
+import logging
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from slot_occupancy import SlotGeometry
+
+logger = logging.getLogger(__name__)
+
+MODELS = ("auto", "translation", "similarity", "affine", "homography")
+
+
+def translation(dx: float, dy: float) -> np.ndarray:
+    """평행 이동 행렬"""
+    return np.array([[1, 0, dx], [0, 1, dy], [0, 0, 1]], dtype=np.float64)
+
+
+def scaling(sx: float, sy: Optional[float] = None, center: Sequence[float] = (0, 0)) -> np.ndarray:
+    """center 기준 스케일 행렬 (sy가 없으면 sx와 같음)"""
+    sy = sx if sy is None else sy
+    cx, cy = center
+    return np.array([[sx, 0, cx * (1 - sx)], [0, sy, cy * (1 - sy)], [0, 0, 1]], dtype=np.float64)
+
+
+def rotation(degrees: float, center: Sequence[float] = (0, 0)) -> np.ndarray:
+    """center 기준 회전 행렬 (이미지 좌표계에서 시계 방향이 양수)"""
+    return np.vstack((cv2.getRotationMatrix2D(tuple(map(float, center)), -degrees, 1.0), [0, 0, 1]))
+
+
+def resize_matrix(src_size: Sequence[float], dst_size: Sequence[float]) -> np.ndarray:
+    """(width, height) 해상도 변환 행렬 (예: 2556x1179 ROI -> 1920x1080 영상)"""
+    return scaling(dst_size[0] / src_size[0], dst_size[1] / src_size[1])
+
+
+def compose(*matrices: np.ndarray) -> np.ndarray:
+    """인자 순서대로 적용하는 변환 합성 (compose(A, B)는 A를 먼저 적용)"""
+    result = np.eye(3)
+    for m in matrices:
+        result = np.asarray(m, dtype=np.float64) @ result
+    return result
+
+
+def apply_transform(points: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """(N, 2) 점 배열에 3x3 변환 적용 (homography는 원근 나눗셈 포함)"""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    out = points @ matrix[:2, :2].T + matrix[:2, 2]
+    if np.any(matrix[2] != (0, 0, 1)):
+        w = points @ matrix[2, :2] + matrix[2, 2]
+        out /= w[:, None]
+    return out
+
+
+def fit_transform(src: np.ndarray, dst: np.ndarray, model: str = "auto",
+                  ransac_threshold: float = 3.0) -> Tuple[np.ndarray, float]:
+    """
+    기준점 쌍에서 src -> dst 변환 추정
+
+    Args:
+        src: (N, 2) 원래 ROI 기준 위치 (예: 주차선 모서리)
+        dst: (N, 2) 현재 프레임에서의 같은 지점
+        model: 'auto' (점 개수로 선택), 'translation', 'similarity', 'affine', 'homography'
+        ransac_threshold: RANSAC 재투영 허용 오차 (픽셀, 점이 최소 개수보다 많을 때만 사용)
+
+    Returns:
+        (3x3 변환 행렬, 기준점 재투영 RMSE 픽셀)
+    """
+    src = np.asarray(src, dtype=np.float64).reshape(-1, 2)
+    dst = np.asarray(dst, dtype=np.float64).reshape(-1, 2)
+    n = len(src)
+    if n == 0 or n != len(dst):
+        raise ValueError(f"기준점 쌍 개수가 맞지 않습니다 (src {len(src)}, dst {len(dst)})")
+    if model == "auto":
+        model = MODELS[min(n, 4)]
+    required = {"translation": 1, "similarity": 2, "affine": 3, "homography": 4}[model]
+    if n < required:
+        raise ValueError(f"{model} 변환에는 기준점이 {required}쌍 이상 필요합니다 ({n}쌍)")
+
+    method = cv2.RANSAC if n > required else 0
+    if model == "translation":
+        matrix = translation(*np.median(dst - src, axis=0))
+    elif model == "similarity":
+        m, _ = cv2.estimateAffinePartial2D(src, dst, method=cv2.RANSAC if n > 2 else cv2.LMEDS,
+                                           ransacReprojThreshold=ransac_threshold)
+        matrix = None if m is None else np.vstack((m, [0, 0, 1]))
+    elif model == "affine":
+        m, _ = cv2.estimateAffine2D(src, dst, method=cv2.RANSAC if n > 3 else cv2.LMEDS,
+                                    ransacReprojThreshold=ransac_threshold)
+        matrix = None if m is None else np.vstack((m, [0, 0, 1]))
+    else:
+        matrix, _ = cv2.findHomography(src, dst, method, ransac_threshold)
+    if matrix is None:
+        raise ValueError(f"{model} 변환을 추정할 수 없습니다 (기준점이 한 직선 위에 있는지 확인)")
+    if model == "homography":
+        matrix = matrix / matrix[2, 2]
+
+    rmse = float(np.sqrt(np.mean(np.sum((apply_transform(src, matrix) - dst) ** 2, axis=1))))
+    return matrix, rmse
+
+
+def roi_extent(roi_data: Dict, keys: Optional[Sequence[str]] = None) -> Tuple[float, float]:
+    """ROI 꼭짓점의 최대 (x, y) - 원본 이미지 크기를 모를 때의 추정치"""
+    points = flatten_roi(roi_data, keys)[0]
+    if not len(points):
+        return 0, 0
+    return tuple(int(v) if v.is_integer() else float(v) for v in points.max(0))
+
+
+def flatten_roi(roi_data: Dict, keys: Optional[Sequence[str]] = None) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """선택한 ROI 키의 모든 꼭짓점을 (N, 2) 배열 하나로 (슬롯별 꼭짓점 수 (S,), 키 목록 함께 반환)"""
+    keys = list(roi_data) if keys is None else [k for k in keys if k in roi_data]
+    coords = [slot['coords'] for key in keys for slot in roi_data[key]]
+    counts = np.fromiter((len(c) for c in coords), dtype=np.int64, count=len(coords))
+    if len(counts) and (counts == counts[0]).all():
+        points = np.asarray(coords, dtype=np.float64).reshape(-1, 2)  # 꼭짓점 수가 모두 같으면(보통 사각형) 한 번에 변환
+    else:
+        points = np.asarray([xy for c in coords for xy in c], dtype=np.float64).reshape(-1, 2)
+    return points, counts, keys
+
+
+def transform_roi(roi_data: Dict, matrix: np.ndarray, keys: Optional[Sequence[str]] = None,
+                  clip_size: Optional[Sequence[int]] = None, rounding: Optional[str] = "round") -> Dict:
+    """
+    ROI JSON 전체(또는 선택한 키)의 모든 슬롯에 변환을 한 번에 적용
+
+    Args:
+        roi_data: {ROI 키: [{'slot_id': ..., 'coords': [[x, y], ...], ...}, ...]}
+        matrix: 3x3 변환 행렬
+        keys: 변환할 ROI 키 (None이면 전체, 나머지 키는 그대로 복사)
+        clip_size: (width, height)가 있으면 좌표를 [0, width-1] x [0, height-1]로 자름
+        rounding: 'round' (반올림 정수), 'trunc' (기존 스크립트처럼 int() 버림), None (실수 그대로)
+
+    Returns:
+        변환된 ROI dict (슬롯의 다른 필드는 유지)
+    """
+    points, counts, keys = flatten_roi(roi_data, keys)
+    out = apply_transform(points, matrix)
+    if clip_size is not None:
+        out = out.clip(0, (clip_size[0] - 1, clip_size[1] - 1))
+    if rounding == "round":
+        out = np.rint(out).astype(np.int64)
+    elif rounding == "trunc":
+        out = np.trunc(out).astype(np.int64)
+
+    if len(counts) and (counts == counts[0]).all():
+        polygons = iter(out.reshape(len(counts), -1, 2).tolist())
+    else:
+        polygons = (p.tolist() for p in np.split(out, np.cumsum(counts)[:-1]))
+    result = dict(roi_data)
+    for key in keys:
+        result[key] = [dict(slot, coords=next(polygons)) for slot in roi_data[key]]
+    return result
+
+
+def transform_geometry(geometry: SlotGeometry, matrix: np.ndarray) -> SlotGeometry:
+    """컴파일된 슬롯 배열(연속 꼭짓점 + 오프셋)에 변환을 적용한 새 SlotGeometry"""
+    points = apply_transform(geometry.points, matrix)
+    polygons = np.split(points, geometry.offsets[1:-1]) if len(geometry) else []
+    return SlotGeometry([{'slot_id': slot_id, 'coords': np.round(p, 1).tolist()}
+                         for slot_id, p in zip(geometry.slot_ids, polygons)])
+
+
+def draw_roi(frame: np.ndarray, roi_data: Dict, key: str, color=(0, 255, 0)) -> np.ndarray:
+    """프레임에 ROI 슬롯 다각형과 ID 표시"""
+    for slot in roi_data.get(key, []):
+        pts = np.asarray(slot['coords'], dtype=np.int32).reshape(-1, 1, 2)
+        cv2.polylines(frame, [pts], True, color, 2)
+        cx, cy = pts.reshape(-1, 2).mean(0).astype(int)
+        cv2.putText(frame, str(slot['slot_id']), (cx - 20, cy), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+    return frame
+
+
+def build_matrix(opt) -> np.ndarray:
+    """CLI 인자 순서대로 합성: resize -> scale -> rotate -> offset -> 기준점 변환"""
+    steps = []
+    if opt.resize:
+        steps.append(resize_matrix(opt.resize[:2], opt.resize[2:]))
+    if opt.scale:
+        steps.append(scaling(*opt.scale))
+    if opt.rotate:
+        steps.append(rotation(opt.rotate, opt.rotate_center))
+    if opt.offset:
+        steps.append(translation(*opt.offset))
+    if opt.pairs or opt.src:
+        if opt.pairs:
+            with open(opt.pairs, 'r', encoding='utf-8') as f:
+                pairs = json.load(f)
+            src, dst = pairs['src'], pairs['dst']
+        else:
+            src, dst = opt.src, opt.dst or []
+        matrix, rmse = fit_transform(src, dst, opt.model, opt.ransac_threshold)
+        logger.info(f"기준점 {len(np.reshape(src, (-1, 2)))}쌍으로 변환 추정 - 재투영 RMSE {rmse:.2f}px")
+        steps.append(matrix)
+    return compose(*steps)
+
+
+def main():
+    """메인 함수"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="ROI 좌표 일괄 변환 (affine / homography)")
+    parser.add_argument("--roi", type=str, default="roi_full_rect_coords.json", help="입력 ROI 좌표 JSON")
+    parser.add_argument("--out", type=str, required=True, help="출력 ROI 좌표 JSON")
+    parser.add_argument("--keys", type=str, nargs="+", default=None, help="변환할 ROI 키 (기본: 전체)")
+    parser.add_argument("--resize", type=float, nargs=4, default=None, metavar=("SRC_W", "SRC_H", "DST_W", "DST_H"),
+                        help="해상도 변환")
+    parser.add_argument("--scale", type=float, nargs=2, default=None, metavar=("SX", "SY"), help="원점 기준 스케일")
+    parser.add_argument("--rotate", type=float, default=0.0, help="회전 각도 (도, 시계 방향)")
+    parser.add_argument("--rotate-center", type=float, nargs=2, default=(0.0, 0.0), metavar=("X", "Y"), help="회전 중심")
+    parser.add_argument("--offset", type=float, nargs=2, default=None, metavar=("DX", "DY"),
+                        help="평행 이동 (픽셀, 위로 이동은 DY 음수)")
+    parser.add_argument("--src", type=float, nargs="+", default=None, help="기준점 원래 위치 x1 y1 x2 y2 ...")
+    parser.add_argument("--dst", type=float, nargs="+", default=None, help="기준점 현재 위치 x1 y1 x2 y2 ...")
+    parser.add_argument("--pairs", type=str, default=None, help='기준점 쌍 JSON ({"src": [[x, y], ...], "dst": [...]})')
+    parser.add_argument("--model", type=str, default="auto", choices=MODELS, help="기준점 변환 모델")
+    parser.add_argument("--ransac-threshold", type=float, default=3.0, help="RANSAC 재투영 허용 오차 (픽셀)")
+    parser.add_argument("--clip", type=int, nargs=2, default=None, metavar=("W", "H"), help="좌표를 프레임 범위로 자름")
+    parser.add_argument("--float", action="store_true", help="좌표를 정수로 반올림하지 않음")
+    parser.add_argument("--preview", type=str, default=None, help="변환 전(빨강)/후(초록) ROI를 그릴 프레임 이미지")
+    opt = parser.parse_args()
+
+    with open(opt.roi, 'r', encoding='utf-8') as f:
+        roi_data = json.load(f)
+    matrix = build_matrix(opt)
+
+    t = time.perf_counter()
+    result = transform_roi(roi_data, matrix, opt.keys, opt.clip, None if opt.float else "round")
+    elapsed = time.perf_counter() - t
+    with open(opt.out, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=4)
+    n_slots = sum(len(result[k]) for k in (opt.keys or result) if k in result)
+    logger.info(f"슬롯 {n_slots}개 변환 ({elapsed * 1000:.1f}ms) -> {opt.out}")
+    logger.info("변환 행렬:\n" + np.array2string(matrix, precision=5, suppress_small=True))
+
+    if opt.preview:
+        frame = cv2.imread(opt.preview)
+        if frame is None:
+            logger.error(f"미리보기 이미지를 로드할 수 없습니다: {opt.preview}")
+            return
+        for key in opt.keys or list(result):
+            draw_roi(frame, roi_data, key, (0, 0, 255))
+            draw_roi(frame, result, key, (0, 255, 0))
+        preview_path = opt.out.rsplit('.', 1)[0] + "_preview.jpg"
+        cv2.imwrite(preview_path, frame)
+        logger.info(f"미리보기 저장: {preview_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ import time
 import logging
 from datetime import datetime
 from parking_analysis_system import ParkingAnalysisSystem
+from video_sampler import VideoFrameSampler
 
 # 로깅 설정
 logging.basicConfig(
@@ -55,45 +56,36 @@ def run_full_analysis():
         logger.info("전체 영상 분석 시작")
         start_time = time.time()
         
-        # 영상 시작부터 끝까지 3분 간격으로 분석
-        current_time = 0.0
+        # 영상 시작부터 끝까지 3분 간격으로 분석 (영상을 한 번만 열고 순차적으로 건너뛰며 추출)
         analysis_count = 0
         total_vehicles = 0
         
-        while current_time <= system.video_info['duration_seconds']:
-            logger.info(f"분석 진행률: {current_time/system.video_info['duration_seconds']*100:.1f}%")
-            
-            # 현재 시간에 해당하는 프레임 추출
-            frame = system.extract_frame_at_time(current_time)
-            if frame is None:
-                current_time += system.interval_seconds
-                continue
-            
-            # 차량 탐지
-            detections = system.detect_vehicles(frame)
-            total_vehicles += len(detections)
-            
-            # 주차 슬롯 상태 확인
-            slot_status = system.check_parking_slots(frame, detections)
-            
-            # 현재 시간 계산
-            timestamp = datetime.now()
-            
-            # 결과 저장
-            system.save_analysis_result(slot_status, timestamp, frame)
-            
-            # 통계 출력
-            available_slots = sum(1 for s in slot_status if s['is_available'])
-            total_slots = len(slot_status)
-            occupancy_rate = (total_slots - available_slots) / total_slots * 100
-            
-            analysis_count += 1
-            logger.info(f"분석 완료 #{analysis_count} - 시간: {current_time/60:.1f}분")
-            logger.info(f"  🚗 차량: {len(detections)}대 탐지")
-            logger.info(f"  🅿️  슬롯: {available_slots}/{total_slots} 사용가능 ({occupancy_rate:.1f}% 점유)")
-            
-            # 다음 분석 시간으로 이동
-            current_time += system.interval_seconds
+        with VideoFrameSampler(system.video_path) as sampler:
+            for current_time, frame in sampler.iter_interval(system.interval_seconds):
+                logger.info(f"분석 진행률: {current_time/system.video_info['duration_seconds']*100:.1f}%")
+                
+                # 차량 탐지
+                detections = system.detect_vehicles(frame)
+                total_vehicles += len(detections)
+                
+                # 주차 슬롯 상태 확인
+                slot_status = system.check_parking_slots(frame, detections)
+                
+                # 현재 시간 계산
+                timestamp = datetime.now()
+                
+                # 결과 저장
+                system.save_analysis_result(slot_status, timestamp, frame)
+                
+                # 통계 출력
+                available_slots = sum(1 for s in slot_status if s['is_available'])
+                total_slots = len(slot_status)
+                occupancy_rate = (total_slots - available_slots) / total_slots * 100
+                
+                analysis_count += 1
+                logger.info(f"분석 완료 #{analysis_count} - 시간: {current_time/60:.1f}분")
+                logger.info(f"  🚗 차량: {len(detections)}대 탐지")
+                logger.info(f"  🅿️  슬롯: {available_slots}/{total_slots} 사용가능 ({occupancy_rate:.1f}% 점유)")
         
         # 최종 통계
         end_time = time.time()
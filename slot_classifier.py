@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+슬롯 패치 분류 모드 (고정 카메라용, 전체 프레임 탐지의 대안)
+ROI JSON의 슬롯 다각형마다 원근 변환으로 작은 정사각형 패치를 펴서 한 배치로 occupied/free 분류
+
+- 슬롯별 원근 변환 맵을 한 번만 계산해 (슬롯 수 x size, size) remap 맵으로 쌓아 두고, 프레임마다 cv2.remap으로 전체 패치 추출
+  (remap 출력 크기 제한 SHRT_MAX 때문에 슬롯 수가 많으면 청크 단위로 나눠 호출)
+- 비용은 슬롯 수에 선형이며 640px 전체 프레임 탐지보다 CPU에서 훨씬 가벼움
+- 분류 모델은 classify/train.py로 학습 (데이터셋은 이 파일의 빌더로 생성)
+
+Usage:
+    $ python slot_classifier.py --roi roi_full_rect_coords.json --images custom_dataset/images/train --out runs/slot_patches
+    $ python classify/train.py --model yolov5n.pt --data runs/slot_patches --imgsz 64 --epochs 30
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+import torch
+
+from models.common import DetectMultiBackend
+from parking_detector import VEHICLE_CLASSES
+from roi_registry import RoiRegistry
+from slot_occupancy import SlotGeometry
+from utils.augmentations import IMAGENET_MEAN, IMAGENET_STD
+from utils.dataloaders import IMG_FORMATS, img2label_paths
+from utils.torch_utils import select_device
+
+logger = logging.getLogger(__name__)
+
+SLOT_CLASSES = ("free", "occupied")  # ImageFolder 클래스 순서 (폴더 이름 알파벳 순)
+REMAP_MAX_ROWS = 32766  # cv2.remap 입출력 크기 제한 (SHRT_MAX 미만)
+
+
+def slot_quad(coords) -> np.ndarray:
+    """슬롯 다각형을 (4, 2) 사각형으로 (꼭짓점 4개면 그대로, 아니면 최소 면적 회전 사각형) 좌상-우상-우하-좌하 순서로 정렬"""
+    pts = np.asarray(coords, dtype=np.float32).reshape(-1, 2)
+    if len(pts) != 4:
+        pts = cv2.boxPoints(cv2.minAreaRect(pts)).astype(np.float32)
+    center = pts.mean(0)
+    pts = pts[np.argsort(np.arctan2(pts[:, 1] - center[1], pts[:, 0] - center[0]))]  # 화면 좌표에서 시계 방향
+    start = int(np.argmin(pts.sum(1)))  # x + y가 가장 작은 점 = 좌상단
+    return np.roll(pts, -start, axis=0)
+
+
+class SlotPatchExtractor:
+    def __init__(self, geometry: SlotGeometry, size: int = 64):
+        """
+        슬롯 다각형 → 정사각형 패치 원근 변환 추출기
+
+        Args:
+            geometry: 슬롯 다각형 배열
+            size: 패치 한 변 크기 (픽셀)
+        """
+        self.geometry = geometry
+        self.size = size
+        dst = np.float32([[0, 0], [size - 1, 0], [size - 1, size - 1], [0, size - 1]])
+        gx, gy = np.meshgrid(np.arange(size, dtype=np.float64), np.arange(size, dtype=np.float64))
+        grid = np.stack((gx.ravel(), gy.ravel(), np.ones(size * size)))  # (3, size * size) 패치 좌표
+
+        # 패치 픽셀 → 프레임 좌표 (역변환)를 모든 슬롯에 대해 한 번에 계산
+        inverse = np.stack([cv2.getPerspectiveTransform(dst, slot_quad(c)) for c in geometry.coords]) \
+            if len(geometry) else np.zeros((0, 3, 3))
+        src = inverse @ grid  # (S, 3, size * size)
+        src = src[:, :2] / src[:, 2:]
+        self.map_x = src[:, 0].reshape(-1, size).astype(np.float32)  # (S * size, size)
+        self.map_y = src[:, 1].reshape(-1, size).astype(np.float32)
+        self.chunk = max((REMAP_MAX_ROWS // size), 1)  # remap 한 번에 처리할 슬롯 수
+        self.fixed_maps = [cv2.convertMaps(self.map_x[i:i + self.chunk * size], self.map_y[i:i + self.chunk * size],
+                                           cv2.CV_16SC2) for i in range(0, len(self.map_x), self.chunk * size)]
+
+    def __call__(self, frame: np.ndarray, indices: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        BGR 프레임에서 슬롯 패치 추출
+
+        Args:
+            indices: 추출할 슬롯 번호 (None이면 전체)
+
+        Returns:
+            (N, size, size, 3) uint8 BGR 패치
+        """
+        n = len(self.geometry) if indices is None else len(indices)
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        patches = np.empty((n * self.size, self.size, channels), dtype=frame.dtype)
+        rows = self.chunk * self.size
+        if indices is None:
+            for i, maps in enumerate(self.fixed_maps):
+                cv2.remap(frame, *maps, cv2.INTER_LINEAR, dst=patches[i * rows:(i + 1) * rows],
+                          borderMode=cv2.BORDER_CONSTANT)
+        else:
+            idx = (np.asarray(indices)[:, None] * self.size + np.arange(self.size)).ravel()
+            for i in range(0, len(idx), rows):
+                cv2.remap(frame, self.map_x[idx[i:i + rows]], self.map_y[idx[i:i + rows]], cv2.INTER_LINEAR,
+                          dst=patches[i:i + rows], borderMode=cv2.BORDER_CONSTANT)
+        return patches.reshape(n, self.size, self.size, channels)
+
+
+class SlotClassifier:
+    def __init__(self, weights: str, device: str = "", imgsz: int = 64, threshold: float = 0.5, half: bool = False):
+        """
+        슬롯 패치 occupied/free 분류기 (classify/train.py 학습 모델, DetectMultiBackend 지원 형식)
+
+        Args:
+            weights: 분류 모델 경로
+            device: 추론 장치 ('' 자동 선택, 'cpu', '0', 'mps' 등)
+            imgsz: 패치 크기 (학습 시 --imgsz와 동일)
+            threshold: occupied 확률이 이 값 이상이면 점유로 판단
+            half: FP16 추론 사용 여부
+        """
+        self.weights = weights
+        self.imgsz = imgsz
+        self.threshold = threshold
+        self.device = select_device(device)
+        self.model = DetectMultiBackend(weights, device=self.device, fp16=half)
+        names = self.model.names
+        names = list(names.values()) if isinstance(names, dict) else list(names)
+        self.occupied_index = names.index("occupied") if "occupied" in names else 1
+        self.mean = torch.tensor(IMAGENET_MEAN, device=self.model.device).view(1, 3, 1, 1)
+        self.std = torch.tensor(IMAGENET_STD, device=self.model.device).view(1, 3, 1, 1)
+        self.extractors = {}  # id(geometry) -> (geometry, SlotPatchExtractor)
+        self.model.warmup(imgsz=(1, 3, imgsz, imgsz))
+        logger.info(f"슬롯 분류 모델 로드 완료 - {weights} (장치: {self.device}, 패치 {imgsz}px)")
+
+    def get_extractor(self, geometry: SlotGeometry) -> SlotPatchExtractor:
+        """geometry별 패치 추출기 (remap 맵은 처음 한 번만 계산)"""
+        cached = self.extractors.get(id(geometry))
+        if cached is None or cached[0] is not geometry:
+            cached = self.extractors[id(geometry)] = (geometry, SlotPatchExtractor(geometry, self.imgsz))
+        return cached[1]
+
+    @torch.no_grad()
+    def classify(self, patches: np.ndarray) -> np.ndarray:
+        """(N, size, size, 3) BGR 패치의 occupied 확률 (N,) - classify_transforms와 같은 정규화"""
+        if not len(patches):
+            return np.zeros(0, dtype=np.float32)
+        im = torch.from_numpy(patches).to(self.model.device).permute(0, 3, 1, 2).flip(1)  # BGR -> RGB, NCHW
+        im = ((im.float() / 255 - self.mean) / self.std).contiguous()
+        im = im.half() if self.model.fp16 else im
+        logits = self.model(im)
+        if isinstance(logits, (list, tuple)):
+            logits = logits[0]
+        return logits.float().softmax(1)[:, self.occupied_index].cpu().numpy()
+
+    def predict(self, frame: np.ndarray, geometry: SlotGeometry, indices: Optional[np.ndarray] = None) -> np.ndarray:
+        """프레임의 슬롯별 occupied 확률 (indices가 있으면 해당 슬롯만)"""
+        return self.classify(self.get_extractor(geometry)(frame, indices))
+
+
+def slot_labels_from_boxes(geometry: SlotGeometry, boxes: np.ndarray, occupied_iou: float = 0.17,
+                           free_iou: float = 0.05) -> np.ndarray:
+    """
+    차량 박스로 슬롯별 라벨 결정 (1: occupied, 0: free, -1: 애매해서 제외)
+
+    occupied 기준은 check_parking_slots_iou와 같은 최대 IoU 0.17, free는 최대 IoU가 free_iou 미만일 때만
+    """
+    max_iou, _ = geometry.max_iou(boxes)
+    return np.where(max_iou >= occupied_iou, 1, np.where(max_iou < free_iou, 0, -1))
+
+
+def build_slot_dataset(roi_path: str, images: str, out_dir: str, roi_key: Optional[str] = None, size: int = 64,
+                       val_fraction: float = 0.2, occupied_iou: float = 0.17, free_iou: float = 0.05) -> Dict:
+    """
+    ROI 파일과 라벨링된 프레임(YOLO 형식 images/ + labels/)으로 슬롯 패치 분류 데이터셋 생성
+
+    출력: out_dir/{train,val}/{free,occupied}/<프레임>_<슬롯>.jpg (classify/train.py --data out_dir)
+    같은 프레임의 패치는 모두 같은 분할에 들어감 (프레임 이름 해시로 결정)
+
+    Args:
+        roi_path: ROI 좌표 JSON 경로
+        images: 프레임 이미지 디렉터리
+        roi_key: 프레임 이름이 ROI 키에 없을 때 사용할 키 (None이면 해당 프레임 건너뜀)
+        size: 패치 크기 (픽셀)
+        val_fraction: 검증 분할 비율
+    """
+    roi = RoiRegistry(roi_path)
+    files = sorted(p for p in Path(images).rglob("*") if p.suffix[1:].lower() in IMG_FORMATS)
+    extractors = {}
+    counts = {split: dict.fromkeys(SLOT_CLASSES, 0) for split in ("train", "val")}
+    counts['skipped_frames'] = counts['ambiguous'] = 0
+
+    for file, label_file in zip(files, img2label_paths([str(f) for f in files])):
+        key = file.name if file.name in roi else roi_key
+        frame = cv2.imread(str(file))
+        if key not in roi or frame is None or not os.path.isfile(label_file):
+            counts['skipped_frames'] += 1
+            continue
+        if key not in extractors:
+            extractors[key] = SlotPatchExtractor(roi.geometry(key), size)
+        extractor = extractors[key]
+
+        height, width = frame.shape[:2]
+        labels = np.loadtxt(label_file, ndmin=2).reshape(-1, 5)
+        labels = labels[np.isin(labels[:, 0], VEHICLE_CLASSES)]
+        xc, yc, w, h = labels[:, 1] * width, labels[:, 2] * height, labels[:, 3] * width, labels[:, 4] * height
+        boxes = np.stack((xc - w / 2, yc - h / 2, xc + w / 2, yc + h / 2), axis=1)
+        slot_labels = slot_labels_from_boxes(extractor.geometry, boxes, occupied_iou, free_iou)
+
+        bucket = int(hashlib.md5(file.stem.encode()).hexdigest()[:8], 16) / 0xFFFFFFFF
+        split = "val" if bucket < val_fraction else "train"
+        patches = extractor(frame)
+        for slot_id, label, patch in zip(extractor.geometry.slot_ids, slot_labels, patches):
+            if label < 0:
+                counts['ambiguous'] += 1
+                continue
+            cls = SLOT_CLASSES[label]
+            target = Path(out_dir) / split / cls
+            target.mkdir(parents=True, exist_ok=True)
+            cv2.imwrite(str(target / f"{file.stem}_{slot_id}.jpg"), patch)
+            counts[split][cls] += 1
+
+    logger.info(f"슬롯 패치 데이터셋 생성 완료 - {out_dir}: {counts}")
+    return counts
+
+
+def main():
+    """메인 함수 (데이터셋 생성)"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="슬롯 패치 분류 데이터셋 생성")
+    parser.add_argument("--roi", type=str, default="roi_full_rect_coords.json", help="ROI 좌표 JSON 경로")
+    parser.add_argument("--images", type=str, default="custom_dataset/images/train", help="라벨링된 프레임 디렉터리")
+    parser.add_argument("--roi-key", type=str, default=None, help="프레임 이름이 ROI 키에 없을 때 사용할 키")
+    parser.add_argument("--out", type=str, default="runs/slot_patches", help="출력 데이터셋 디렉터리")
+    parser.add_argument("--size", type=int, default=64, help="패치 크기 (픽셀)")
+    parser.add_argument("--val-fraction", type=float, default=0.2, help="검증 분할 비율")
+    parser.add_argument("--occupied-iou", type=float, default=0.17, help="occupied 라벨 최소 IoU")
+    parser.add_argument("--free-iou", type=float, default=0.05, help="free 라벨 최대 IoU (사이 값은 제외)")
+    opt = parser.parse_args()
+    build_slot_dataset(opt.roi, opt.images, opt.out, opt.roi_key, opt.size, opt.val_fraction,
+                       opt.occupied_iou, opt.free_iou)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+벡터화된 주차 슬롯 점유 판단 엔진
+슬롯 다각형을 한 번만 numpy 배열로 패킹해 두고, 탐지 박스 x 슬롯 IoU 행렬을 한 번의 배치 연산으로 계산
+(박스-다각형 교집합은 Sutherland-Hodgman 클리핑을 모든 쌍에 대해 동시에 수행)
+
+고정 카메라의 경우 SlotRasterIndex로 슬롯을 한 번만 래스터화해 두고 integral image로 O(1) 조회 가능
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import cv2
+import numpy as np
+
+# 한 번에 클리핑하는 (박스, 슬롯) 쌍의 최대 개수 (메모리 사용량 제한)
+MAX_PAIRS_PER_CHUNK = 200_000
+
+
+def polygon_areas(vertices: np.ndarray) -> np.ndarray:
+    """(M, K, 2) 다각형 배열의 면적 (shoelace 공식, 중복 꼭짓점은 면적에 영향 없음)"""
+    x, y = vertices[..., 0], vertices[..., 1]
+    xn, yn = np.roll(x, -1, axis=1), np.roll(y, -1, axis=1)
+    return 0.5 * np.abs((x * yn - xn * y).sum(1))
+
+
+def _clip_half_plane(pts: np.ndarray, axis: int, bound: np.ndarray, sign: float) -> np.ndarray:
+    """
+    (M, K, 2) 다각형들을 반평면 sign * (p[axis] - bound) >= 0 으로 동시에 클리핑
+
+    출력 꼭짓점 수가 다각형마다 달라지므로 유효 꼭짓점을 앞으로 모은 뒤 남는 자리는 첫 꼭짓점으로 채움
+    (같은 점이 반복되면 면적과 이후 클리핑 결과에 영향이 없음)
+    """
+    nxt = np.roll(pts, -1, axis=1)
+    d_cur = sign * (pts[..., axis] - bound[:, None])
+    d_nxt = sign * (nxt[..., axis] - bound[:, None])
+    in_cur, in_nxt = d_cur >= 0, d_nxt >= 0
+    cross = in_cur != in_nxt
+
+    denom = np.where(cross, d_cur - d_nxt, 1.0)
+    t = np.where(cross, d_cur / denom, 0.0)[..., None]
+    inter = pts + t * (nxt - pts)
+
+    # 각 변(cur -> nxt)마다 [교점(경계를 지날 때), 끝점(안쪽일 때)] 순서로 출력
+    out = np.stack((inter, nxt), axis=2).reshape(len(pts), -1, 2)
+    keep = np.stack((cross, in_nxt), axis=2).reshape(len(pts), -1)
+
+    count = keep.sum(1)
+    k = int(count.max()) if len(count) else 0
+    if k == 0:
+        return np.zeros((len(pts), 1, 2), dtype=pts.dtype)
+    order = np.argsort(~keep, axis=1, kind="stable")[:, :k]
+    out = np.take_along_axis(out, order[..., None], axis=1)
+    pad = np.arange(k)[None] >= count[:, None]
+    out = np.where(pad[..., None], out[:, :1], out)
+    return out
+
+
+def clip_polygons_to_boxes(vertices: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """(M, K, 2) 다각형과 (M, 4) xyxy 박스를 쌍별로 클리핑한 교집합 면적 (M,)"""
+    pts = vertices
+    for axis, col, sign in ((0, 0, 1.0), (0, 2, -1.0), (1, 1, 1.0), (1, 3, -1.0)):
+        pts = _clip_half_plane(pts, axis, boxes[:, col], sign)
+    return polygon_areas(pts)
+
+
+def points_in_polygons(points: np.ndarray, vertices: np.ndarray) -> np.ndarray:
+    """점 (M, 2)이 쌍을 이루는 다각형 (M, K, 2) 내부에 있는지 (M,) - ray casting"""
+    x, y = points[:, None, 0], points[:, None, 1]
+    v2 = np.roll(vertices, -1, axis=1)
+    x1, y1, x2, y2 = vertices[..., 0], vertices[..., 1], v2[..., 0], v2[..., 1]
+    straddle = (y1 > y) != (y2 > y)
+    dy = np.where(straddle, y2 - y1, 1.0)
+    xinters = x1 + (y - y1) * (x2 - x1) / dy
+    return ((straddle & (x < xinters)).sum(-1) % 2).astype(bool)
+
+
+def slot_max(di: np.ndarray, si: np.ndarray, values: np.ndarray, n_slots: int):
+    """(박스, 슬롯) 쌍 값에서 슬롯별 최대값 (S,)과 그 박스 인덱스 (S,, 쌍이 없으면 -1)"""
+    best_value, best_idx = np.zeros(n_slots), np.full(n_slots, -1)
+    if len(si):
+        order = np.lexsort((values, si))
+        last = np.r_[si[order][1:] != si[order][:-1], True]  # 슬롯 그룹별 마지막(최대값) 위치
+        best_value[si[order][last]] = values[order][last]
+        best_idx[si[order][last]] = di[order][last]
+    return best_value, best_idx
+
+
+def _expand_ranges(starts: np.ndarray, counts: np.ndarray) -> tuple:
+    """각 구간 [start, start + count)을 펼친 (소유자 인덱스, 값) 배열"""
+    owner = np.repeat(np.arange(len(counts)), counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owner, np.repeat(starts, counts) + local
+
+
+class SlotGridIndex:
+    def __init__(self, bounds: np.ndarray, cell_size: float = None):
+        """
+        슬롯 외접 사각형에 대한 정적 균일 격자 인덱스 (CSR 형태: 셀별 슬롯 목록)
+        각 탐지는 자신의 박스가 걸치는 셀의 슬롯들과만 비교되므로 매칭 비용이 슬롯 수에 대해 거의 선형
+
+        Args:
+            bounds: (S, 4) xyxy 슬롯 외접 사각형
+            cell_size: 격자 셀 크기 (픽셀, None이면 슬롯 크기의 중앙값)
+        """
+        self.bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+        n = len(self.bounds)
+        if cell_size is None:
+            sizes = self.bounds[:, 2:] - self.bounds[:, :2]
+            cell_size = float(np.median(sizes)) if n else 1.0
+        self.cell_size = max(cell_size, 1.0)
+        self.origin = self.bounds[:, :2].min(0) if n else np.zeros(2)
+        extent = self.bounds[:, 2:].max(0) - self.origin if n else np.zeros(2)
+        self.shape = (np.floor(extent / self.cell_size) + 1).astype(np.int64)  # (nx, ny)
+
+        slots, cells = self._covered_cells(self.bounds)
+        order = np.argsort(cells, kind="stable")
+        self.cell_slots = slots[order]
+        self.cell_start = np.searchsorted(cells[order], np.arange(self.shape.prod() + 1))
+
+    def _covered_cells(self, boxes: np.ndarray) -> tuple:
+        """각 박스가 걸치는 모든 셀의 (박스 인덱스, 셀 번호)"""
+        c0 = np.floor((boxes[:, :2] - self.origin) / self.cell_size).clip(0, self.shape - 1).astype(np.int64)
+        c1 = np.floor((boxes[:, 2:] - self.origin) / self.cell_size).clip(0, self.shape - 1).astype(np.int64)
+        span = c1 - c0 + 1
+        owner, local = _expand_ranges(np.zeros(len(boxes), dtype=np.int64), span.prod(1))
+        cx = c0[owner, 0] + local % span[owner, 0]
+        cy = c0[owner, 1] + local // span[owner, 0]
+        return owner, cy * self.shape[0] + cx
+
+    def query(self, boxes: np.ndarray, inclusive: bool = False) -> tuple:
+        """
+        외접 사각형이 겹치는 (박스 인덱스, 슬롯 인덱스) 후보 쌍
+
+        Args:
+            boxes: (D, 4) xyxy 박스 (점 질의는 x1 == x2, y1 == y2)
+            inclusive: 경계에 닿는 경우도 겹침으로 볼지 여부 (점 질의용)
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        n = len(self.bounds)
+        if not len(boxes) or not n:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        di, cells = self._covered_cells(boxes)
+        start = self.cell_start[cells]
+        pair_owner, pos = _expand_ranges(start, self.cell_start[cells + 1] - start)
+        key = np.unique(di[pair_owner] * n + self.cell_slots[pos])  # 여러 셀에 걸친 중복 제거
+        di, si = key // n, key % n
+
+        b, s = self.bounds[si], boxes[di]
+        if inclusive:
+            keep = (s[:, 0] <= b[:, 2]) & (s[:, 2] >= b[:, 0]) & (s[:, 1] <= b[:, 3]) & (s[:, 3] >= b[:, 1])
+        else:
+            keep = (s[:, 0] < b[:, 2]) & (s[:, 2] > b[:, 0]) & (s[:, 1] < b[:, 3]) & (s[:, 3] > b[:, 1])
+        return di[keep], si[keep]
+
+
+class SlotGeometry:
+    def __init__(self, slots: List[Dict]):
+        """
+        ROI 슬롯 목록을 연속 numpy 배열로 패킹
+
+        Args:
+            slots: ROI JSON의 슬롯 목록 ([{'slot_id': ..., 'coords': [[x, y], ...]}, ...])
+        """
+        self.slot_ids = [slot['slot_id'] for slot in slots]
+        self.coords = [slot['coords'] for slot in slots]
+
+        polygons = [np.asarray(c, dtype=np.float64).reshape(-1, 2) for c in self.coords]
+        counts = np.array([len(c) for c in polygons], dtype=np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)  # (n+1,) 슬롯 i의 꼭짓점 = points[offsets[i]:offsets[i+1]]
+        self.points = np.concatenate(polygons) if polygons else np.zeros((0, 2), dtype=np.float64)  # (전체 꼭짓점 수, 2)
+
+        n = len(polygons)
+        k = int(counts.max(initial=1))
+        self.vertices = np.zeros((n, k, 2), dtype=np.float64)  # 남는 자리는 첫 꼭짓점으로 채움
+        for i, c in enumerate(polygons):
+            self.vertices[i, :len(c)] = c
+            self.vertices[i, len(c):] = c[0]
+
+        self.areas = polygon_areas(self.vertices)
+        self.bounds = np.concatenate((self.vertices.min(1), self.vertices.max(1)), axis=1)  # (n, 4) xyxy
+        self.grid = SlotGridIndex(self.bounds)
+
+    def __len__(self):
+        return len(self.slot_ids)
+
+    def intersection_pairs(self, boxes: np.ndarray) -> tuple:
+        """격자 인덱스로 고른 후보 쌍의 (박스 인덱스, 슬롯 인덱스, 교집합 면적)"""
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        di, si = self.grid.query(boxes)
+        inter = np.zeros(len(di), dtype=np.float64)
+        for i in range(0, len(di), MAX_PAIRS_PER_CHUNK):
+            d, j = di[i:i + MAX_PAIRS_PER_CHUNK], si[i:i + MAX_PAIRS_PER_CHUNK]
+            inter[i:i + MAX_PAIRS_PER_CHUNK] = clip_polygons_to_boxes(self.vertices[j], boxes[d])
+        return di, si, inter
+
+    def iou_pairs(self, boxes: np.ndarray) -> tuple:
+        """외접 사각형이 겹치는 쌍에 대해서만 계산한 (박스 인덱스, 슬롯 인덱스, IoU)"""
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        di, si, inter = self.intersection_pairs(boxes)
+        box_areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        union = box_areas[di] + self.areas[si] - inter
+        return di, si, np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+    def intersection_matrix(self, boxes: np.ndarray) -> np.ndarray:
+        """(D, 4) xyxy 박스와 모든 슬롯의 교집합 면적 행렬 (D, S)"""
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        inter = np.zeros((len(boxes), len(self)), dtype=np.float64)
+        di, si, values = self.intersection_pairs(boxes)
+        inter[di, si] = values
+        return inter
+
+    def iou_matrix(self, boxes: np.ndarray) -> np.ndarray:
+        """(D, 4) xyxy 박스와 모든 슬롯의 IoU 행렬 (D, S)"""
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        iou = np.zeros((len(boxes), len(self)), dtype=np.float64)
+        di, si, values = self.iou_pairs(boxes)
+        iou[di, si] = values
+        return iou
+
+    def max_iou(self, boxes: np.ndarray):
+        """슬롯별 최대 IoU (S,)와 해당 박스 인덱스 (S,, 겹치는 박스가 없으면 -1)"""
+        di, si, iou = self.iou_pairs(boxes)
+        return slot_max(di, si, iou, len(self))
+
+    def point_pairs(self, points: np.ndarray) -> tuple:
+        """슬롯 다각형 내부에 있는 (점 인덱스, 슬롯 인덱스) 쌍"""
+        p = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        pi, si = self.grid.query(np.concatenate((p, p), axis=1), inclusive=True)
+        inside = points_in_polygons(p[pi], self.vertices[si])
+        return pi[inside], si[inside]
+
+    def centers_in_bounds(self, points: np.ndarray) -> np.ndarray:
+        """점 (P, 2)이 각 슬롯의 외접 사각형 안에 있는지 (P, S)"""
+        p = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        b = self.bounds
+        return ((p[:, None, 0] >= b[None, :, 0]) & (p[:, None, 0] <= b[None, :, 2]) &
+                (p[:, None, 1] >= b[None, :, 1]) & (p[:, None, 1] <= b[None, :, 3]))
+
+    def centers_in_polygons(self, points: np.ndarray) -> np.ndarray:
+        """점 (P, 2)이 각 슬롯 다각형 내부에 있는지 (P, S) - ray casting"""
+        p = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        inside = np.zeros((len(p), len(self)), dtype=bool)
+        inside[self.point_pairs(p)] = True
+        return inside
+
+
+class SlotRasterIndex:
+    def __init__(self, geometry: SlotGeometry, image_shape: Sequence[int]):
+        """
+        슬롯 다각형을 한 번만 래스터화하여 슬롯별 summed-area table(integral image)로 보관
+        각 슬롯은 자신의 외접 사각형 크기만큼만 저장하고, 전체를 하나의 연속 버퍼에 이어 붙임
+
+        Args:
+            geometry: 슬롯 다각형 배열
+            image_shape: 카메라 프레임 크기 (height, width[, channels])
+        """
+        self.slot_ids = geometry.slot_ids
+        self.image_shape = tuple(int(v) for v in image_shape[:2])
+        height, width = self.image_shape
+
+        # 이미지 범위로 자른 슬롯별 외접 사각형 (정수 픽셀)
+        b = geometry.bounds
+        self.origins = np.stack((np.floor(b[:, 0]), np.floor(b[:, 1])), 1).clip(0, (width, height)).astype(np.int64)
+        ends = np.stack((np.ceil(b[:, 2]) + 1, np.ceil(b[:, 3]) + 1), 1).clip(0, (width, height)).astype(np.int64)
+        self.sizes = ends - self.origins  # (S, 2) w, h
+        table_sizes = (self.sizes[:, 0] + 1) * (self.sizes[:, 1] + 1)
+        self.offsets = np.concatenate(([0], np.cumsum(table_sizes)[:-1])).astype(np.int64)
+
+        self.tables = np.zeros(int(table_sizes.sum()), dtype=np.int32)
+        for i, coords in enumerate(geometry.coords):
+            w, h = self.sizes[i]
+            if w == 0 or h == 0:
+                continue
+            mask = np.zeros((h, w), dtype=np.uint8)
+            pts = np.asarray(coords, dtype=np.int32).reshape(-1, 1, 2) - self.origins[i].astype(np.int32)
+            cv2.fillPoly(mask, [pts], 1)
+            n = (w + 1) * (h + 1)
+            self.tables[self.offsets[i]:self.offsets[i] + n] = cv2.integral(mask).ravel()
+
+        self._build_lookups()
+
+    def _build_lookups(self):
+        """저장된 배열로부터 행 간격, 슬롯 픽셀 면적, 후보 쌍 격자 인덱스 구성"""
+        self.strides = self.sizes[:, 0] + 1
+        slots = np.arange(len(self))
+        self.areas = self._lookup(slots, 0, 0, self.sizes[:, 0], self.sizes[:, 1])
+        self.grid = SlotGridIndex(np.concatenate((self.origins, self.origins + self.sizes), axis=1))
+
+    def __len__(self):
+        return len(self.slot_ids)
+
+    def _lookup(self, slot, x0, y0, x1, y1):
+        """슬롯 로컬 좌표 [x0, x1) x [y0, y1) 영역의 슬롯 픽셀 수 (브로드캐스트 가능)"""
+        base, stride, t = self.offsets[slot], self.strides[slot], self.tables
+        return (t[base + y1 * stride + x1] - t[base + y0 * stride + x1] -
+                t[base + y1 * stride + x0] + t[base + y0 * stride + x0])
+
+    def intersection_pairs(self, boxes: np.ndarray) -> tuple:
+        """격자 인덱스로 고른 후보 쌍의 (박스 인덱스, 슬롯 인덱스, 교집합 픽셀 수) - 쌍당 O(1)"""
+        boxes = np.round(np.asarray(boxes, dtype=np.float64).reshape(-1, 4)).astype(np.int64)
+        di, si = self.grid.query(boxes)
+        o, w, h = self.origins[si], self.sizes[si, 0], self.sizes[si, 1]
+        x0 = (boxes[di, 0] - o[:, 0]).clip(0, w)
+        x1 = (boxes[di, 2] - o[:, 0]).clip(0, w)
+        y0 = (boxes[di, 1] - o[:, 1]).clip(0, h)
+        y1 = (boxes[di, 3] - o[:, 1]).clip(0, h)
+        return di, si, self._lookup(si, x0, y0, x1, y1).astype(np.float64)
+
+    def iou_pairs(self, boxes: np.ndarray) -> tuple:
+        """외접 사각형이 겹치는 쌍에 대해서만 계산한 (박스 인덱스, 슬롯 인덱스, IoU) - 픽셀 단위 근사"""
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        di, si, inter = self.intersection_pairs(boxes)
+        r = np.round(boxes)
+        box_areas = (r[:, 2] - r[:, 0]).clip(0) * (r[:, 3] - r[:, 1]).clip(0)
+        union = box_areas[di] + self.areas[si] - inter
+        return di, si, np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+    def intersection_matrix(self, boxes: np.ndarray) -> np.ndarray:
+        """(D, 4) xyxy 박스와 모든 슬롯의 교집합 픽셀 수 (D, S)"""
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        inter = np.zeros((len(boxes), len(self)), dtype=np.float64)
+        di, si, values = self.intersection_pairs(boxes)
+        inter[di, si] = values
+        return inter
+
+    def iou_matrix(self, boxes: np.ndarray) -> np.ndarray:
+        """(D, 4) xyxy 박스와 모든 슬롯의 IoU 행렬 (D, S) - 픽셀 단위 근사"""
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        iou = np.zeros((len(boxes), len(self)), dtype=np.float64)
+        di, si, values = self.iou_pairs(boxes)
+        iou[di, si] = values
+        return iou
+
+    def max_iou(self, boxes: np.ndarray):
+        """슬롯별 최대 IoU (S,)와 해당 박스 인덱스 (S,, 겹치는 박스가 없으면 -1)"""
+        di, si, iou = self.iou_pairs(boxes)
+        return slot_max(di, si, iou, len(self))
+
+    def point_pairs(self, points: np.ndarray) -> tuple:
+        """슬롯 래스터 내부에 있는 (점 인덱스, 슬롯 인덱스) 쌍"""
+        p = np.floor(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+        pi, si = self.grid.query(np.concatenate((p, p), axis=1), inclusive=True)
+        x = (p[pi, 0] - self.origins[si, 0]).astype(np.int64)
+        y = (p[pi, 1] - self.origins[si, 1]).astype(np.int64)
+        inside = (x >= 0) & (y >= 0) & (x < self.sizes[si, 0]) & (y < self.sizes[si, 1])
+        pi, si, x, y = pi[inside], si[inside], x[inside], y[inside]
+        inside = self._lookup(si, x, y, x + 1, y + 1) > 0
+        return pi[inside], si[inside]
+
+    def contains_points(self, points: np.ndarray) -> np.ndarray:
+        """점 (P, 2)이 각 슬롯 래스터 내부에 있는지 (P, S)"""
+        p = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        inside = np.zeros((len(p), len(self)), dtype=bool)
+        inside[self.point_pairs(p)] = True
+        return inside
+
+    def save(self, path):
+        """인덱스를 .npz 파일로 저장"""
+        np.savez_compressed(path, slot_ids=np.array(self.slot_ids), image_shape=np.array(self.image_shape),
+                            origins=self.origins, sizes=self.sizes, offsets=self.offsets, tables=self.tables)
+
+    @classmethod
+    def load(cls, path) -> "SlotRasterIndex":
+        """save()로 저장한 인덱스 불러오기"""
+        data = np.load(path)
+        index = cls.__new__(cls)
+        index.slot_ids = data['slot_ids'].tolist()
+        index.image_shape = tuple(int(v) for v in data['image_shape'])
+        index.origins, index.sizes, index.offsets, index.tables = (
+            data['origins'], data['sizes'], data['offsets'], data['tables'])
+        index._build_lookups()
+        return index
+
+    @classmethod
+    def cached(cls, slots: List[Dict], image_shape: Sequence[int], cache_dir="runs/roi_cache") -> "SlotRasterIndex":
+        """슬롯 좌표와 프레임 크기로 캐시 파일을 찾아 재사용하고, 없으면 만들어 저장"""
+        key = json.dumps([slots, list(image_shape[:2])], sort_keys=True, default=str).encode()
+        path = Path(cache_dir) / f"slot_raster_{hashlib.sha1(key).hexdigest()[:16]}.npz"
+        if path.exists():
+            return cls.load(path)
+        index = cls(SlotGeometry(slots), image_shape)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        index.save(path)
+        return index
+
+
+def boxes_from_detections(detections: Sequence[Dict], key: str = 'bbox') -> np.ndarray:
+    """탐지 dict 목록에서 (D, 4) xyxy 배열 생성"""
+    return np.asarray([det[key] for det in detections], dtype=np.float64).reshape(-1, 4)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+슬롯 점유 상태 시간 평활화 (EWMA + hysteresis + 연속 확인)
+프레임마다 max_iou >= 0.17로 바로 판단하면 탐지 하나가 깜빡일 때마다 슬롯 상태가 뒤집히고 백엔드 쓰기가 발생하므로,
+슬롯별 IoU 지수 이동 평균에 켜짐/꺼짐 임계값을 따로 두고 반대 판정이 confirm 횟수만큼 연속될 때만 상태를 바꿈
+
+- 상태는 슬롯 수 길이의 numpy 배열 (EWMA float32, 상태 bool, 연속 횟수 uint8)로 보관해 수천 개 슬롯도 한 번의 벡터 연산으로 갱신
+- 첫 관측은 평활화 없이 (on + off) / 2 임계값(기본 0.17)으로 바로 상태 결정
+- 변화 감지 게이트와 함께 쓸 때는 settled()가 False인 동안(확인 대기 중) 같은 프레임이어도 추론해야 상태가 제때 바뀜
+"""
+
+from typing import Dict, Sequence
+
+import numpy as np
+
+
+class SlotStateTracker:
+    def __init__(self,
+                 slot_ids: Sequence[str],
+                 on_threshold: float = 0.20,
+                 off_threshold: float = 0.14,
+                 alpha: float = 0.5,
+                 confirm_on: int = 2,
+                 confirm_off: int = 2):
+        """
+        슬롯 상태 추적기 초기화
+
+        Args:
+            slot_ids: 슬롯 ID 목록 (ROI가 바뀌었는지 확인용)
+            on_threshold: EWMA IoU가 이 값 이상이면 free → occupied 후보
+            off_threshold: EWMA IoU가 이 값 미만이면 occupied → free 후보
+            alpha: EWMA 가중치 (1이면 평활화 없음)
+            confirm_on: occupied로 바꾸기 전에 필요한 연속 후보 횟수
+            confirm_off: free로 바꾸기 전에 필요한 연속 후보 횟수
+        """
+        if off_threshold > on_threshold:
+            raise ValueError(f"off_threshold({off_threshold})는 on_threshold({on_threshold}) 이하여야 합니다")
+        self.slot_ids = list(slot_ids)
+        self.on_threshold = on_threshold
+        self.off_threshold = off_threshold
+        self.alpha = alpha
+        self.confirm = np.array([confirm_on, confirm_off], dtype=np.uint8)  # 현재 상태 free(0) / occupied(1) 기준
+
+        n = len(self.slot_ids)
+        self.ewma = np.zeros(n, dtype=np.float32)
+        self.occupied = np.zeros(n, dtype=bool)
+        self.streak = np.zeros(n, dtype=np.uint8)  # 현재 상태와 반대 판정이 연속된 횟수
+        self.raw = np.zeros(n, dtype=bool)  # 평활화 없이 판단한 마지막 상태
+        self.scores = np.zeros(n, dtype=np.float32)  # 마지막 관측 IoU
+        self.changed = np.zeros(n, dtype=bool)  # 마지막 갱신에서 상태가 바뀐 슬롯
+        self.initialized = False
+        self.stats = {'updates': 0, 'raw_changes': 0, 'state_changes': 0}
+
+    def __len__(self):
+        return len(self.slot_ids)
+
+    def update(self, scores: np.ndarray) -> np.ndarray:
+        """
+        슬롯별 이번 주기 IoU (S,)로 상태 갱신
+
+        Returns:
+            슬롯별 점유 상태 (S,) bool (내부 배열이므로 수정하지 말 것)
+        """
+        scores = np.asarray(scores, dtype=np.float32)
+        raw = scores >= (self.on_threshold + self.off_threshold) / 2
+        self.scores[:] = scores
+        self.stats['updates'] += 1
+        if not self.initialized:
+            self.ewma[:] = scores
+            self.occupied[:] = raw
+            self.raw[:] = raw
+            self.changed[:] = False
+            self.initialized = True
+            return self.occupied
+
+        self.stats['raw_changes'] += int(np.count_nonzero(raw != self.raw))
+        self.raw[:] = raw
+        self.ewma += self.alpha * (scores - self.ewma)
+
+        # hysteresis: free는 on 임계값 이상, occupied는 off 임계값 미만일 때만 반대 상태 후보
+        candidate = np.where(self.occupied, self.ewma < self.off_threshold, self.ewma >= self.on_threshold)
+        self.streak = np.where(candidate, np.minimum(self.streak, 254) + 1, 0).astype(np.uint8)
+        np.greater_equal(self.streak, self.confirm[self.occupied.view(np.uint8)], out=self.changed)
+        self.occupied ^= self.changed
+        self.streak[self.changed] = 0
+        self.stats['state_changes'] += int(np.count_nonzero(self.changed))
+        return self.occupied
+
+    def settled(self) -> bool:
+        """
+        마지막 관측과 같은 IoU가 계속 들어와도 더 이상 상태가 바뀌지 않으면 True
+        (연속 확인 대기 중이거나, EWMA가 수렴하면 반대 상태 후보가 되는 슬롯이 있으면 False)
+        """
+        if not self.initialized:
+            return True
+        limit = np.where(self.occupied, self.scores < self.off_threshold, self.scores >= self.on_threshold)
+        return not (self.streak.any() or limit.any())
+
+    def reset(self):
+        """상태 초기화 (다음 관측으로 바로 상태 결정)"""
+        self.initialized = False
+        self.streak.fill(0)
+        self.changed.fill(False)
+
+    def summary(self) -> Dict:
+        """평활화 없이 판단했을 때와 실제 상태 변경 횟수 비교"""
+        suppressed = self.stats['raw_changes'] - self.stats['state_changes']
+        return {**self.stats, 'suppressed': max(suppressed, 0)}
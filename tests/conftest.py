@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 주차장 모듈은 저장소 최상위에 있음
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
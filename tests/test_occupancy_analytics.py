@@ -0,0 +1,60 @@
+"""점유 이력 집계: 같은 샘플을 다시 append해도 (재실행, 새 프로세스) 집계가 두 번 더해지지 않는지"""
+
+import numpy as np
+
+from occupancy_store import OccupancyStore
+
+START = 1748736000.0  # 2025-06-01 00:00 UTC
+SLOT_IDS = ["slot_1", "slot_2", "slot_3"]
+
+
+def timeline(n=40, step=60.0):
+    rng = np.random.default_rng(0)
+    occupied = rng.random((n, len(SLOT_IDS))) < 0.5
+    return START + step * np.arange(n), occupied
+
+
+def append_all(path, timestamps, occupied):
+    store = OccupancyStore(str(path), analytics=True)
+    for ts, row in zip(timestamps, occupied):
+        store.append("lot", float(ts), SLOT_IDS, row)
+    return store
+
+
+def totals(store):
+    stats = store.analytics.lot_stats("lot", "hour")
+    summary = store.analytics.slot_summary("lot", period="hour")
+    count = store.conn.execute("SELECT COUNT(*) FROM samples").fetchone()[0]
+    return (count, stats['turnover'].tolist(), stats['samples'].tolist(), summary)
+
+
+def test_reappend_in_new_store_does_not_double_count(tmp_path):
+    path = tmp_path / "history.db"
+    timestamps, occupied = timeline()
+    store = append_all(path, timestamps, occupied)
+    expected = totals(store)
+    store.close()
+
+    store = append_all(path, timestamps, occupied)  # 재시작 후 같은 이력을 다시 넣음
+    assert "lot" in store.analytics.stale
+    store.close()  # 남은 rebuild 수행
+
+    store = OccupancyStore(str(path), analytics=True)
+    assert totals(store) == expected
+    store.close()
+
+
+def test_out_of_order_sample_rebuilds_on_next_append(tmp_path):
+    timestamps, occupied = timeline()
+    reference = append_all(tmp_path / "reference.db", timestamps, occupied)
+
+    order = list(range(len(timestamps) - 1))
+    order[10], order[11] = order[11], order[10]  # 샘플 하나가 늦게 도착
+    store = OccupancyStore(str(tmp_path / "history.db"), analytics=True)
+    for i in order + [len(timestamps) - 1]:
+        store.append("lot", float(timestamps[i]), SLOT_IDS, occupied[i])
+
+    assert not store.analytics.stale  # 마지막 시간순 샘플에서 다시 집계
+    assert totals(store) == totals(reference)
+    store.close()
+    reference.close()
@@ -0,0 +1,44 @@
+"""백필 병합: 같은 출력 디렉터리로 다시 병합해도 저장소 집계가 두 번 더해지지 않는지"""
+
+import numpy as np
+
+from occupancy_store import OccupancyStore
+from parking_backfill import merge_timeline
+
+START = 1748736000.0  # 2025-06-01 00:00 UTC
+SLOT_IDS = np.array(["slot_1", "slot_2"])
+
+
+def write_segment(path, seconds, occupied):
+    np.savez(path, video_seconds=np.asarray(seconds, dtype=np.float64), occupied=np.asarray(occupied, dtype=bool),
+             slot_ids=SLOT_IDS)
+    return {'segment': f"{path.stem}#0", 'output': str(path)}
+
+
+def totals(store):
+    stats = store.analytics.lot_stats("lot", "hour")
+    return stats['turnover'].tolist(), stats['samples'].tolist(), store.analytics.slot_summary("lot", period="hour")
+
+
+def test_merge_twice_and_merge_earlier_video(tmp_path):
+    rng = np.random.default_rng(0)
+    seconds = np.arange(30) * 180.0
+    late = rng.random((30, 2)) < 0.5
+    early = rng.random((30, 2)) < 0.5
+    videos = {'late': {'start': START + 6 * 3600}, 'early': {'start': START}}
+    late_task = write_segment(tmp_path / "late.npz", seconds, late)
+    early_task = write_segment(tmp_path / "early.npz", seconds, early)
+
+    reference = OccupancyStore(str(tmp_path / "reference.db"), analytics=True)
+    merge_timeline(videos, [early_task, late_task], str(tmp_path), reference, "lot")
+
+    store = OccupancyStore(str(tmp_path / "history.db"), analytics=True)
+    merge_timeline(videos, [late_task], str(tmp_path), store, "lot")
+    merge_timeline(videos, [late_task], str(tmp_path), store, "lot")  # 재실행
+    merge_timeline(videos, [early_task, late_task], str(tmp_path), store, "lot")  # 기존 이력보다 앞선 영상 추가
+
+    assert not store.analytics.stale
+    assert store.conn.execute("SELECT COUNT(*) FROM samples").fetchone()[0] == 60
+    assert totals(store) == totals(reference)
+    store.close()
+    reference.close()
@@ -0,0 +1,78 @@
+"""전송 큐 spool: 다른 백엔드/다른 큐의 작업을 재전송하지 않고, 같은 작업을 한 번만 가져가는지"""
+
+import json
+import os
+import time
+
+from parking_publisher import PublishQueue
+
+SLOTS = [{'slotNumber': 1, 'isAvailable': True}]
+
+
+class FakePublisher:
+    """퍼블리셔 대역 (전송 내용만 기록)"""
+
+    def __init__(self, backend_url, ok=True):
+        self.backend_url = backend_url
+        self.timeout = 1.0
+        self.ok = ok
+        self.sent = []
+
+    def publish(self, parking_lot_id, slots):
+        self.sent.append((parking_lot_id, slots))
+        return self.ok
+
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def spool_failed_job(tmp_path, backend_url, owner):
+    queue = PublishQueue(FakePublisher(backend_url, ok=False), backoff_base=30, spool_dir=str(tmp_path), owner=owner)
+    queue.submit("publish", 1, SLOTS)
+    assert wait_for(lambda: queue.stats['retries'] >= 1)
+    queue.close(timeout=0)
+    return queue.spool_dir
+
+
+def test_spool_is_replayed_only_by_same_backend_and_owner(tmp_path):
+    spool_dir = spool_failed_job(tmp_path, "http://backend-a:8080", "analyzer_1")
+
+    others = [PublishQueue(FakePublisher("http://backend-b:8080"), spool_dir=str(tmp_path), owner="analyzer_1"),
+              PublishQueue(FakePublisher("http://backend-a:8080"), spool_dir=str(tmp_path), owner="service")]
+    time.sleep(0.2)
+    for queue in others:
+        queue.close()
+        assert queue.publisher.sent == []
+    assert os.listdir(spool_dir) == ["publish_1.json"]
+
+    queue = PublishQueue(FakePublisher("http://backend-a:8080"), spool_dir=str(tmp_path), owner="analyzer_1")
+    assert wait_for(lambda: queue.publisher.sent == [(1, SLOTS)] and not os.listdir(spool_dir))
+    queue.close()
+
+
+def write_spool(path, lot_id):
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump({'key': f"publish_{lot_id}", 'method': "publish", 'args': [lot_id, SLOTS], 'attempts': 1}, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def test_spooled_job_is_claimed_once_and_leftover_claim_is_recovered(tmp_path):
+    queues = [PublishQueue(FakePublisher("http://backend-a:8080"), backoff_max=0.02, spool_dir=str(tmp_path), owner="service")
+              for _ in range(4)]
+    spool_dir = queues[0].spool_dir
+    for lot_id in range(1, 21):  # 실행 중인 큐들이 같은 spool 작업을 동시에 복원
+        write_spool(os.path.join(spool_dir, f"publish_{lot_id}.json"), lot_id)
+    assert wait_for(lambda: not os.listdir(spool_dir))
+    for queue in queues:
+        queue.close()
+    sent = sorted(lot_id for queue in queues for lot_id, _ in queue.publisher.sent)
+    assert sent == list(range(1, 21))
+
+    write_spool(os.path.join(spool_dir, "publish_21.claimed"), 21)  # 전송 도중 종료된 이전 실행
+    queue = PublishQueue(FakePublisher("http://backend-a:8080"), spool_dir=str(tmp_path), owner="service")
+    assert wait_for(lambda: queue.publisher.sent == [(21, SLOTS)] and not os.listdir(spool_dir))
+    queue.close()
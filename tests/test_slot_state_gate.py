@@ -0,0 +1,93 @@
+"""변화 감지 게이트 + 슬롯 상태 평활화: 확인 대기 중에는 같은 프레임이어도 추론해 상태가 제때 바뀌는지"""
+
+import json
+
+import cv2
+import numpy as np
+
+from parking_occupancy_analyzer import ParkingOccupancyAnalyzer
+from slot_state import SlotStateTracker
+
+SLOT = [[100, 100], [300, 100], [300, 260], [100, 260]]
+
+
+class RecordingQueue:
+    """전송 큐 대역 (백엔드 없이 제출 내용만 기록)"""
+
+    def __init__(self):
+        self.publisher = None
+        self.jobs = []
+
+    def submit(self, method, parking_lot_id, *args):
+        self.jobs.append((method, parking_lot_id, args))
+        return True
+
+
+def make_analyzer(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # 결과 JSON 파일은 임시 폴더에
+    roi_path = tmp_path / "roi.json"
+    roi_path.write_text(json.dumps({"cam": [{"slot_id": "slot_1", "coords": SLOT},
+                                            {"slot_id": "slot_2", "coords": [[400, 100], [600, 100], [600, 260], [400, 260]]}]}))
+    return ParkingOccupancyAnalyzer(roi_path=str(roi_path), roi_key="cam", detector=object(), publish_queue=RecordingQueue(),
+                                    change_gate=True, temporal_smoothing=True)
+
+
+def run_cycles(analyzer, frames, detections):
+    """서비스 주기와 같은 순서 (게이트 판단 -> 추론 결과로 분석), 주기별 slot_1 점유 상태와 추론 여부"""
+    occupied, inferred = [], []
+    for frame, det in zip(frames, detections):
+        skipped = analyzer.frame_unchanged(frame)
+        if not skipped:
+            analyzer.run_analysis(frame=frame, detections=det)
+        inferred.append(not skipped)
+        occupied.append(analyzer.last_slot_status[0]['occupied'])
+    return occupied, inferred
+
+
+def test_arrival_and_departure_confirmed_without_waiting_for_forced_inference(tmp_path, monkeypatch):
+    analyzer = make_analyzer(tmp_path, monkeypatch)
+    empty = np.full((360, 640, 3), 120, dtype=np.uint8)
+    parked = empty.copy()
+    cv2.rectangle(parked, (110, 110), (290, 250), (30, 30, 200), -1)
+    none = np.zeros((0, 6), dtype=np.float32)
+    car = np.array([[110, 110, 290, 250, 0.9, 2]], dtype=np.float32)
+
+    # 0-2: 빈 슬롯, 3-12: 차량 도착 후 같은 장면, 13-24: 차량 출발 후 같은 장면
+    frames = [empty] * 3 + [parked] * 10 + [empty] * 12
+    detections = [none] * 3 + [car] * 10 + [none] * 12
+    occupied, inferred = run_cycles(analyzer, frames, detections)
+
+    assert occupied[:4] == [False] * 4
+    assert occupied[4:13] == [True] * 9  # confirm_on=2: 도착 다음 주기에 확정
+    assert occupied[13:] == [True] * 3 + [False] * 9  # EWMA가 off 아래로 내려간 뒤 confirm_off=2
+    assert analyzer.gate.stats['forced'] == 0  # max_skip_cycles 강제 추론 덕분이 아님
+    assert not all(inferred[6:13]) and not all(inferred[16:])  # 상태가 안정되면 다시 생략
+
+
+def test_settled_tracks_pending_confirmation_and_converging_ewma():
+    tracker = SlotStateTracker(["a", "b"])
+    assert tracker.settled()
+    tracker.update(np.array([0.0, 0.0]))
+    assert tracker.settled()
+
+    tracker.update(np.array([0.6, 0.0]))  # EWMA 0.3 >= on: 확인 1/2
+    assert tracker.streak[0] == 1 and not tracker.settled()
+    tracker.update(np.array([0.6, 0.0]))
+    assert tracker.occupied[0] and tracker.settled()
+
+    tracker.update(np.array([0.6, 0.25]))  # EWMA 0.125 < on이지만 같은 IoU가 계속되면 0.25로 수렴 -> 후보
+    assert tracker.streak[1] == 0 and not tracker.settled()
+
+    tracker.update(np.array([0.6, 0.18]))  # 0.18은 hysteresis 구간: 계속 들어와도 상태 유지
+    tracker.update(np.array([0.6, 0.18]))
+    tracker.update(np.array([0.6, 0.18]))
+    assert not tracker.occupied[1] and tracker.settled()
+
+
+def test_camera_shift_checked_once_per_cycle(tmp_path, monkeypatch):
+    analyzer = make_analyzer(tmp_path, monkeypatch)
+    checks = []
+    monkeypatch.setattr(analyzer, "check_camera_shift", checks.append)
+    frames = [np.full((360, 640, 3), 120, dtype=np.uint8)] * 5
+    run_cycles(analyzer, frames, [np.zeros((0, 6), dtype=np.float32)] * 5)
+    assert len(checks) == 5
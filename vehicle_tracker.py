@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+경량 다중 차량 추적기 (SORT 방식: 등속 Kalman 필터 + IoU 매칭)
+non_max_suppression 결과 (N, 6) [x1, y1, x2, y2, conf, cls]를 받아 샘플 프레임 사이에서 차량 ID를 유지
+
+- 트랙 상태는 미리 할당한 numpy 배열(용량이 차면 2배로 확장)에 보관하고, 예측/갱신은 모든 트랙에 대해 한 번의 배치 연산
+- 상태 [cx, cy, s(면적), r(가로세로비), vcx, vcy, vs], 관측 [cx, cy, s, r] (SORT와 동일한 모델/잡음 설정)
+- 매칭은 IoU 행렬에 대한 헝가리안 할당 (scipy), IoU가 iou_threshold 미만인 쌍은 버림
+  (IoU는 슬롯 매칭과 같은 균일 격자 인덱스로 고른 겹치는 쌍에 대해서만 계산)
+- propagate()로 탐지 없이 트랙만 예측해 N프레임마다 추론하고 사이 프레임은 예측 박스 사용 가능
+- 트랙별 처음/마지막 관측 시각으로 차량별 체류 시간 계산
+"""
+
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from slot_occupancy import SlotGridIndex
+
+# 등속 모델 상태 전이 / 관측 행렬
+F = np.eye(7)
+F[0, 4] = F[1, 5] = F[2, 6] = 1.0
+H = np.eye(4, 7)
+Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 0.0001])
+R = np.diag([1.0, 1.0, 10.0, 10.0])
+P0 = np.diag([10.0, 10.0, 10.0, 10.0, 10000.0, 10000.0, 10000.0])  # 속도는 관측되지 않으므로 불확실성 크게
+
+
+def xyxy_to_z(boxes: np.ndarray) -> np.ndarray:
+    """(N, 4) xyxy → (N, 4) [cx, cy, s, r]"""
+    w = boxes[:, 2] - boxes[:, 0]
+    h = boxes[:, 3] - boxes[:, 1]
+    return np.stack((boxes[:, 0] + w / 2, boxes[:, 1] + h / 2, w * h, w / np.maximum(h, 1e-6)), axis=1)
+
+
+def x_to_xyxy(x: np.ndarray) -> np.ndarray:
+    """(N, >=4) 상태 → (N, 4) xyxy"""
+    s = np.maximum(x[:, 2], 0)
+    w = np.sqrt(s * np.maximum(x[:, 3], 0))
+    h = np.divide(s, w, out=np.zeros_like(s), where=w > 0)
+    return np.stack((x[:, 0] - w / 2, x[:, 1] - h / 2, x[:, 0] + w / 2, x[:, 1] + h / 2), axis=1)
+
+
+def box_iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(N, 4) x (M, 4) xyxy 박스 IoU 행렬 (N, M) - 격자 인덱스로 외접 사각형이 겹치는 쌍만 계산"""
+    iou = np.zeros((len(a), len(b)))
+    if not len(a) or not len(b):
+        return iou
+    bi, ai = SlotGridIndex(a).query(b)
+    pa, pb = a[ai], b[bi]
+    inter = np.clip(np.minimum(pa[:, 2:], pb[:, 2:]) - np.maximum(pa[:, :2], pb[:, :2]), 0, None).prod(1)
+    union = (pa[:, 2:] - pa[:, :2]).prod(1) + (pb[:, 2:] - pb[:, :2]).prod(1) - inter
+    iou[ai, bi] = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+    return iou
+
+
+class VehicleTracker:
+    def __init__(self, max_age: int = 3, min_hits: int = 2, iou_threshold: float = 0.3, capacity: int = 256,
+                 history: int = 10000):
+        """
+        추적기 초기화
+
+        Args:
+            max_age: 탐지와 매칭되지 않은 채 유지할 최대 update 횟수 (넘으면 트랙 종료)
+            min_hits: 결과에 포함하기 위한 최소 매칭 횟수 (처음 min_hits번의 update에서는 바로 포함)
+            iou_threshold: 예측 박스와 탐지를 매칭할 최소 IoU
+            capacity: 처음 할당할 트랙 배열 크기 (부족하면 2배로 확장)
+            history: 보관할 종료된 트랙(체류 시간 기록) 수
+        """
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.iou_threshold = iou_threshold
+        self.next_id = 1
+        self.updates = 0
+        self.finished = deque(maxlen=history)  # 종료된 트랙 (track_id, cls, first_seen, last_seen)
+        self.last_det_ids = np.zeros(0, dtype=np.int64)  # 마지막 update의 탐지별 트랙 ID
+        self.allocate(capacity)
+
+    def allocate(self, capacity: int):
+        """트랙 배열 할당 (기존 트랙은 복사)"""
+        old = getattr(self, 'alive', None)
+        arrays = {
+            'x': np.zeros((capacity, 7)),
+            'P': np.zeros((capacity, 7, 7)),
+            'ids': np.zeros(capacity, dtype=np.int64),
+            'hits': np.zeros(capacity, dtype=np.int32),
+            'misses': np.zeros(capacity, dtype=np.int32),  # 연속으로 매칭되지 않은 update 횟수
+            'conf': np.zeros(capacity, dtype=np.float32),
+            'cls': np.zeros(capacity, dtype=np.int32),
+            'first_seen': np.zeros(capacity),
+            'last_seen': np.zeros(capacity),
+            'alive': np.zeros(capacity, dtype=bool),
+        }
+        if old is not None:
+            for name, array in arrays.items():
+                array[:len(old)] = getattr(self, name)
+        for name, array in arrays.items():
+            setattr(self, name, array)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.alive))
+
+    def predict(self, idx: np.ndarray):
+        """트랙 idx의 상태를 한 단계 예측 (배치 Kalman predict)"""
+        x = self.x[idx]
+        x[x[:, 2] + x[:, 6] <= 0, 6] = 0.0  # 면적이 음수가 되지 않도록
+        self.x[idx] = x @ F.T
+        self.P[idx] = F @ self.P[idx] @ F.T + Q
+
+    def correct(self, idx: np.ndarray, z: np.ndarray):
+        """트랙 idx를 관측 z (M, 4)로 갱신 (배치 Kalman update)"""
+        P = self.P[idx]
+        S = H @ P @ H.T + R  # (M, 4, 4)
+        K = np.linalg.solve(S, H @ P).transpose(0, 2, 1)  # P H^T S^-1 (S 대칭)
+        y = z - self.x[idx, :4]
+        self.x[idx] += (K @ y[..., None])[..., 0]
+        self.P[idx] = (np.eye(7) - K @ H) @ P
+
+    def spawn(self, dets: np.ndarray, timestamp: float) -> np.ndarray:
+        """매칭되지 않은 탐지로 새 트랙 생성, 트랙 ID 반환"""
+        free = np.flatnonzero(~self.alive)
+        if len(free) < len(dets):
+            capacity = len(self.alive)
+            self.allocate(max(capacity * 2, capacity + len(dets)))
+            free = np.flatnonzero(~self.alive)
+        idx = free[:len(dets)]
+        ids = np.arange(self.next_id, self.next_id + len(dets))
+        self.next_id += len(dets)
+        self.x[idx] = 0.0
+        self.x[idx, :4] = xyxy_to_z(dets[:, :4])
+        self.P[idx] = P0
+        self.ids[idx] = ids
+        self.hits[idx] = 1
+        self.misses[idx] = 0
+        self.conf[idx] = dets[:, 4]
+        self.cls[idx] = dets[:, 5]
+        self.first_seen[idx] = self.last_seen[idx] = timestamp
+        self.alive[idx] = True
+        return ids
+
+    def update(self, dets: np.ndarray, timestamp: float) -> np.ndarray:
+        """
+        탐지 결과로 트랙 갱신
+
+        Args:
+            dets: (N, 6) [x1, y1, x2, y2, conf, cls] (non_max_suppression 결과, 원본 좌표)
+            timestamp: 프레임 시각 (초, 체류 시간 계산용)
+
+        Returns:
+            (K, 7) [x1, y1, x2, y2, track_id, conf, cls] - 이번에 매칭/생성된 확정 트랙
+        """
+        dets = np.asarray(dets, dtype=np.float64).reshape(-1, 6)
+        self.updates += 1
+        tracks = np.flatnonzero(self.alive)
+        self.predict(tracks)
+
+        # 예측 박스 x 탐지 IoU 행렬에서 헝가리안 매칭
+        matched_t, matched_d = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        if len(tracks) and len(dets):
+            iou = box_iou_matrix(x_to_xyxy(self.x[tracks]), dets[:, :4])
+            rows, cols = linear_sum_assignment(-iou)
+            keep = iou[rows, cols] >= self.iou_threshold
+            matched_t, matched_d = tracks[rows[keep]], cols[keep]
+
+        det_ids = np.zeros(len(dets), dtype=np.int64)
+        if len(matched_t):
+            self.correct(matched_t, xyxy_to_z(dets[matched_d, :4]))
+            self.hits[matched_t] += 1
+            self.conf[matched_t] = dets[matched_d, 4]
+            self.cls[matched_t] = dets[matched_d, 5]
+            self.last_seen[matched_t] = timestamp
+            det_ids[matched_d] = self.ids[matched_t]
+
+        unmatched_t = np.setdiff1d(tracks, matched_t, assume_unique=True)
+        self.misses[unmatched_t] += 1
+        self.misses[matched_t] = 0
+        unmatched_d = np.setdiff1d(np.arange(len(dets)), matched_d, assume_unique=True)
+        det_ids[unmatched_d] = self.spawn(dets[unmatched_d], timestamp)
+        self.last_det_ids = det_ids
+
+        # 오래 매칭되지 않은 트랙 종료 (체류 시간 기록 보관)
+        dead = np.flatnonzero(self.alive & (self.misses > self.max_age))
+        for i in dead:
+            if self.hits[i] >= self.min_hits:
+                self.finished.append((int(self.ids[i]), int(self.cls[i]), float(self.first_seen[i]),
+                                      float(self.last_seen[i])))
+        self.alive[dead] = False
+        return self.output()
+
+    def propagate(self) -> np.ndarray:
+        """탐지 없이 트랙만 한 단계 예측 (추론을 건너뛴 프레임용, 매칭 실패로 세지 않음) - update()와 같은 형식"""
+        self.predict(np.flatnonzero(self.alive))
+        return self.output()
+
+    def output(self) -> np.ndarray:
+        """마지막 update에서 매칭된 확정 트랙 (K, 7) [x1, y1, x2, y2, track_id, conf, cls]"""
+        confirmed = self.alive & (self.misses == 0) & ((self.hits >= self.min_hits) | (self.updates <= self.min_hits))
+        idx = np.flatnonzero(confirmed)
+        return np.concatenate((x_to_xyxy(self.x[idx]), self.ids[idx, None], self.conf[idx, None],
+                               self.cls[idx, None]), axis=1)
+
+    def dwell_times(self, now: Optional[float] = None) -> Dict[int, float]:
+        """진행 중인 확정 트랙별 체류 시간 (초, now가 없으면 마지막 관측 시각 기준)"""
+        idx = np.flatnonzero(self.alive & (self.hits >= self.min_hits))
+        end = self.last_seen[idx] if now is None else np.full(len(idx), now)
+        return dict(zip(self.ids[idx].tolist(), (end - self.first_seen[idx]).tolist()))
+
+    def finished_tracks(self) -> List[Dict]:
+        """종료된 트랙의 체류 기록"""
+        return [{'track_id': tid, 'class': cls, 'first_seen': first, 'last_seen': last, 'dwell_seconds': last - first}
+                for tid, cls, first, last in self.finished]
+
+    def summary(self) -> Dict:
+        """추적 카운터 요약"""
+        dwell = list(self.dwell_times().values()) + [last - first for _, _, first, last in self.finished]
+        return {
+            'active_tracks': len(self),
+            'total_tracks': self.next_id - 1,
+            'finished_tracks': len(self.finished),
+            'max_dwell_seconds': round(max(dwell), 1) if dwell else 0.0
+        }
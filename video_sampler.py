@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+순차 디코딩 프레임 샘플러
+영상을 한 번만 열어 두고 가까운 목표는 grab()으로 건너뛴 뒤 필요한 프레임만 retrieve
+(샘플마다 VideoCapture를 새로 열고 컨테이너를 다시 파싱하는 비용을 제거)
+
+grab()도 인터 프레임 코덱(H.264/HEVC)에서는 프레임마다 디코딩을 하므로, 목표가 max_grab_frames보다 멀면
+열려 있는 캡처에서 seek하는 편이 더 빠름 (seek는 직전 키프레임부터 최대 GOP 길이만큼만 디코딩)
+"""
+
+import logging
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Generator, Iterable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class VideoFrameSampler:
+    def __init__(self, video_path: str, max_grab_frames: int = None):
+        """
+        프레임 샘플러 초기화 (영상을 열고 유지)
+
+        Args:
+            video_path: 영상 파일 경로 (또는 OpenCV가 여는 스트림 URL)
+            max_grab_frames: 이 프레임 수 이내의 목표는 grab()으로 건너뛰고, 더 멀면 seek (기본: 2초 분량)
+        """
+        self.video_path = video_path
+        self.cap = cv2.VideoCapture(video_path)
+        if not self.cap.isOpened():
+            raise ValueError(f"영상을 열 수 없습니다: {video_path}")
+
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.duration_seconds = self.total_frames / self.fps
+        self.max_grab_frames = int(2 * self.fps) if max_grab_frames is None else max_grab_frames
+        self.position = 0  # 다음에 grab()으로 얻을 프레임 번호
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+    def release(self):
+        """영상 닫기"""
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def frame_index(self, target_seconds: float) -> int:
+        """시각(초)에 해당하는 프레임 번호"""
+        return int(target_seconds * self.fps)
+
+    def read_frame(self, target_frame: int) -> Optional[np.ndarray]:
+        """
+        지정 프레임 읽기 (가까우면 grab()으로 건너뛰고, 뒤로 가거나 멀면 열린 캡처에서 seek)
+        """
+        if target_frame < self.position or target_frame - self.position > self.max_grab_frames:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, target_frame)
+            self.position = target_frame
+
+        while self.position < target_frame:
+            if not self.cap.grab():
+                return None
+            self.position += 1
+
+        ret, frame = self.cap.read()
+        if not ret:
+            return None
+        self.position += 1
+        return frame
+
+    def read_at(self, target_seconds: float) -> Optional[np.ndarray]:
+        """지정 시각(초)의 프레임 읽기"""
+        return self.read_frame(self.frame_index(target_seconds))
+
+    def iter_frames(self, timestamps: Iterable[float]) -> Generator[Tuple[float, np.ndarray], None, None]:
+        """지정 시각(초)들의 프레임을 (시각, 프레임) 형태로 순서대로 생성 (읽기 실패한 시각은 건너뜀)"""
+        for t in timestamps:
+            frame = self.read_at(t)
+            if frame is None:
+                logger.error(f"프레임 추출 실패 - 시간: {t:.1f}초")
+                continue
+            yield t, frame
+
+    def iter_interval(self, interval_seconds: float, start_seconds: float = 0.0,
+                      end_seconds: float = None) -> Generator[Tuple[float, np.ndarray], None, None]:
+        """start부터 end(기본: 영상 끝)까지 interval 간격으로 프레임 생성"""
+        end_seconds = self.duration_seconds if end_seconds is None else end_seconds
+        n = int(np.floor((end_seconds - start_seconds) / interval_seconds)) + 1
+        return self.iter_frames(start_seconds + i * interval_seconds for i in range(max(n, 0)))
+
+
+def recording_start(path: str, duration: float) -> float:
+    """영상 시작 시각 (epoch 초): 파일 이름의 YYYYMMDD_HHMMSS, 없으면 수정 시각 - 영상 길이"""
+    match = re.search(r"(\d{8})[_-]?(\d{6})", Path(path).stem)
+    if match:
+        try:
+            return datetime.strptime(match.group(1) + match.group(2), "%Y%m%d%H%M%S").timestamp()
+        except ValueError:
+            pass
+    return os.path.getmtime(path) - duration
@@ -5,7 +5,6 @@
 """
 
 import cv2
-import json
 import numpy as np
 from datetime import datetime
 import logging
@@ -13,6 +12,8 @@ from typing import List, Dict, Tuple, Optional
 import os
 import argparse
 from shapely.geometry import box, Polygon
+from roi_registry import RoiRegistry
+from slot_occupancy import boxes_from_detections
 
 # 로깅 설정
 logging.basicConfig(
@@ -38,7 +39,7 @@ class OccupancyVisualizer:
         self.iou_threshold = iou_threshold
         
         # 초기화
-        self.roi_data = self.load_roi_data()
+        self.roi = RoiRegistry.shared(roi_path)  # 검증/컴파일된 ROI 키별 슬롯 배열
         self.image = cv2.imread(self.image_path)
         
         if self.image is None:
@@ -48,17 +49,6 @@ class OccupancyVisualizer:
         logger.info(f"이미지 크기: {self.width}x{self.height}")
         logger.info(f"IoU 임계값: {self.iou_threshold}")
         
-    def load_roi_data(self) -> Dict:
-        """ROI 좌표 데이터 로드"""
-        try:
-            with open(self.roi_path, 'r', encoding='utf-8') as f:
-                roi_data = json.load(f)
-            logger.info(f"ROI 데이터 로드 완료 - {len(roi_data)}개 이미지의 슬롯 정보")
-            return roi_data
-        except Exception as e:
-            logger.error(f"ROI 데이터 로드 실패: {e}")
-            return {}
-    
     def load_yolo_detections(self) -> List[Dict]:
         """YOLO 인식 결과 로드"""
         # 최신 인식 결과 파일 찾기
@@ -146,38 +136,24 @@ class OccupancyVisualizer:
         
         # ROI 데이터에서 frame_30min.jpg의 슬롯 정보 사용
         image_key = "frame_30min.jpg"
-        slots = self.roi_data.get(image_key, [])
+        geometry = self.roi.geometry(image_key)
+        
+        # 각 차량과의 IoU를 슬롯 전체에 대해 한 번에 계산
+        max_iou, best_idx = geometry.max_iou(boxes_from_detections(normalized_detections))
         
         occupied_slots = []
         free_slots = []
         
-        for slot in slots:
-            slot_id = slot['slot_id']
-            coords = slot['coords']
-            
-            # ROI 면적 계산
-            roi_poly = Polygon(coords)
-            roi_area = roi_poly.area
-            
-            # 각 차량과의 IoU 계산
-            max_iou = 0.0
-            best_vehicle = None
-            
-            for det in normalized_detections:
-                iou = self.calculate_iou(det['bbox'], coords)
-                if iou > max_iou:
-                    max_iou = iou
-                    best_vehicle = det
-            
+        for i, (slot_id, coords) in enumerate(zip(geometry.slot_ids, geometry.coords)):
             # 점유 판단
-            occupied = max_iou >= self.iou_threshold
+            occupied = bool(max_iou[i] >= self.iou_threshold)
             
             slot_info = {
                 'slot_id': slot_id,
                 'occupied': occupied,
-                'max_iou': max_iou,
-                'roi_area': roi_area,
-                'best_vehicle': best_vehicle,
+                'max_iou': float(max_iou[i]),
+                'roi_area': float(geometry.areas[i]),
+                'best_vehicle': normalized_detections[best_idx[i]] if max_iou[i] > 0 else None,
                 'coords': coords
             }
             
@@ -247,27 +223,27 @@ class OccupancyVisualizer:
         return vis_image
     
     def find_optimal_iou(self, detections: List[Dict], target_occupancy: float = None):
-        """최적의 IoU 임계값 찾기"""
+        """
+        최적의 IoU 임계값 찾기
+        슬롯별 최대 IoU를 한 번만 계산하고 정렬 후 searchsorted로 모든 임계값의 점유 슬롯 수를 한 번에 구함
+        target_occupancy(%)가 있으면 점유율이 가장 가까운 임계값을 self.iou_threshold로 설정
+        """
         logger.info("최적 IoU 임계값 찾기 시작...")
         
         iou_values = np.arange(0.01, 0.51, 0.01)  # 0.01부터 0.5까지 0.01씩
-        results = []
-        
-        for iou_threshold in iou_values:
-            self.iou_threshold = iou_threshold
-            occupied_slots, free_slots = self.analyze_occupancy(detections)
-            
-            total_slots = len(occupied_slots) + len(free_slots)
-            occupancy_rate = len(occupied_slots) / total_slots * 100 if total_slots > 0 else 0
-            
-            results.append({
-                'iou_threshold': iou_threshold,
-                'occupied_slots': len(occupied_slots),
-                'total_slots': total_slots,
-                'occupancy_rate': occupancy_rate
-            })
-            
-            logger.info(f"IoU {iou_threshold:.2f}: {len(occupied_slots)}/{total_slots} ({occupancy_rate:.1f}%)")
+        geometry = self.roi.geometry("frame_30min.jpg")
+        max_iou, _ = geometry.max_iou(boxes_from_detections(self.normalize_coordinates(detections)))
+        
+        # 임계값 t에서 점유 슬롯 수 = 최대 IoU >= t인 슬롯 수
+        total_slots = len(max_iou)
+        occupied_counts = total_slots - np.searchsorted(np.sort(max_iou), iou_values, side='left')
+        occupancy_rates = occupied_counts / total_slots * 100 if total_slots > 0 else np.zeros(len(iou_values))
+        results = [{
+            'iou_threshold': float(iou_threshold),
+            'occupied_slots': int(occupied),
+            'total_slots': total_slots,
+            'occupancy_rate': float(rate)
+        } for iou_threshold, occupied, rate in zip(iou_values, occupied_counts, occupancy_rates)]
         
         # 결과 출력
         logger.info("\n=== IoU 임계값별 결과 ===")
@@ -276,6 +252,12 @@ class OccupancyVisualizer:
                        f"{result['occupied_slots']}/{result['total_slots']} "
                        f"({result['occupancy_rate']:.1f}%)")
         
+        if target_occupancy is not None and results:
+            best = results[int(np.argmin(np.abs(occupancy_rates - target_occupancy)))]
+            self.iou_threshold = best['iou_threshold']
+            logger.info(f"목표 점유율 {target_occupancy:.1f}%에 가장 가까운 IoU 임계값: {best['iou_threshold']:.2f} "
+                        f"({best['occupancy_rate']:.1f}%)")
+        
         return results
     
     def run_visualization(self, show_vehicles: bool = True, output_path: str = None):